@@ -2,9 +2,21 @@ import asyncio
 import logging
 import os
 from loader import dp, bot
-from utils.db_api import create_db, ensure_language_column
+from utils.db_api import migrate_db, close_db, flush_writes, db_stats, cache_stats, apply_db_profile
 from utils.set_bot_commands import set_only_start_everywhere
-from config import ADMIN_IDS
+from utils.i18n import watch_locales
+from keyboards.cache import keyboards
+from utils.media import media
+from utils.screen import screens
+from utils.assets import assets, watch_assets
+from utils.profile_cache import profiles
+from utils.outbound import outbound
+from utils.api_retry import api_retry
+from utils.broadcast import broadcasts
+from utils.admin_notify import admins
+from utils.webhook import run_webhook
+from utils.http import http
+from config import BOT_MODE
 
 log_path = os.path.join(os.path.dirname(__file__), 'bot.log')
 logging.basicConfig(
@@ -16,20 +28,51 @@ logging.basicConfig(
     ]
 )
 
+# фоновые задачи процесса (перезагрузка переводов и т.п.), гасим в on_shutdown
+background_tasks = set()
+
+
 async def on_startup():
     logging.info("Бот запускается...")
-    await create_db()
-    await ensure_language_column()
+    profile = await apply_db_profile()
+    logging.info(f"Хранилище: {profile}")
+    before, after = await migrate_db()
+    if before != after:
+        logging.info(f"Схема БД обновлена: v{before} → v{after}")
+    await assets.load()
+    background_tasks.add(asyncio.create_task(watch_locales()))
+    background_tasks.add(asyncio.create_task(watch_assets()))
     try:
-        await set_only_start_everywhere()
+        await set_only_start_everywhere(bot)
     except Exception as e:
         logging.error(f"Ошибка установки команд: {e}")
 
-    for admin_id in ADMIN_IDS:
-        try:
-            await bot.send_message(admin_id, "Бот запущен на Railway! Готов к работе")
-        except Exception as e:
-            logging.error(f"Не смог написать админу {admin_id}: {e}")
+    await admins.send("Бот запущен на Railway! Готов к работе")
+
+    # рассылки, прерванные остановкой/падением, продолжаются с сохранённого курсора
+    resumed = await broadcasts.resume()
+    if resumed:
+        logging.info(f"Продолжено рассылок: {resumed}")
+
+async def on_shutdown():
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    await broadcasts.shutdown()
+    await profiles.drain()
+    await admins.drain()
+    await flush_writes()
+    logging.info(f"Бот останавливается, статистика БД: {db_stats()}")
+    logging.info(f"Кэш пользователей: {cache_stats()}")
+    logging.info(f"Кэш клавиатур: {keyboards.stats()}")
+    logging.info(f"Картинки (file_id): {media.stats()}, каталог: {assets.stats()}")
+    logging.info(f"Экраны: {screens.stats()}")
+    logging.info(f"Кэш профилей: {profiles.stats()}")
+    logging.info(f"Исходящие запросы: {outbound.stats()}, админам: {admins.stats()}")
+    logging.info(f"HTTP-пул: {http.stats()}")
+    logging.info(f"Bot API: {api_retry.stats()}")
+    await close_db()
+    await http.close()
 
 async def main():
     # ←←←←←←←←←←←←←←←←←←←←←←←←←←←←←←←←←
@@ -37,8 +80,16 @@ async def main():
     import handlers  # ← теперь всё подключается через __init__.py
     # ↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑↑
     
+    if BOT_MODE == "webhook":
+        # апдейты приходят сами (utils/webhook.py), очередь Telegram при рестарте не теряется
+        await run_webhook(dp, bot, on_startup=on_startup, on_shutdown=on_shutdown)
+        return
+
     await on_startup()
-    await dp.start_polling(bot, skip_updates=True)
+    try:
+        await dp.start_polling(bot, skip_updates=True)
+    finally:
+        await on_shutdown()
 
 if __name__ == '__main__':
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,153 @@
+# benchmarks/assets.py
+# Проверка каталога картинок (utils/assets.py) в том виде, в каком его видят хендлеры:
+# при ASSETS_DIR, отличном от images/ (абсолютный путь, ./относительный), все картинки,
+# которые требуют хендлеры, должны находиться — иначе экраны уходят без картинок.
+# Прозрачные PNG/WebP при пережатии в JPEG ложатся на белый фон, а не на чёрный.
+# Затем — время подготовки каталога при старте.
+# Запуск из корня проекта:
+#   python -m benchmarks.assets --files 50
+#   python -m benchmarks.assets --check-only
+import argparse
+import asyncio
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    from PIL import Image
+except ImportError:   # без Pillow — минимальный JPEG, его пропускает проверка сигнатуры
+    Image = None
+
+
+def _expect(cond: bool, what: str):
+    if not cond:
+        raise AssertionError(what)
+
+
+def _jpeg(width: int = 64, height: int = 48) -> bytes:
+    if Image is None:
+        return b"\xff\xd8\xff\xe0" + b"\x00" * 64 + b"\xff\xd9"
+    out = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 80, 40)).save(out, "JPEG")
+    return out.getvalue()
+
+
+async def _probe():
+    """В дочернем процессе с нужным ASSETS_DIR: кладём требуемые хендлерами картинки и сканируем."""
+    import logging
+    logging.basicConfig(level=logging.WARNING)   # хендлеры не пишут bot.log при проверке
+
+    import handlers  # noqa: F401 — регистрирует assets.require(...) всех экранов
+    from config import ASSETS_DIR
+    from utils.assets import assets
+
+    required = assets.missing()
+    root = os.path.abspath(ASSETS_DIR)
+    for path in required:
+        _expect(os.path.abspath(path).startswith(root + os.sep), f"{path} is outside ASSETS_DIR={ASSETS_DIR}")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(_jpeg())
+    await assets.load()
+    print(json.dumps({
+        "required": len(required),
+        "missing": assets.missing(),
+        "found": sum(assets.exists(p) for p in required),
+    }))
+
+
+def check_assets_dir(assets_dir: str):
+    env = {**os.environ, "ASSETS_DIR": assets_dir, "ASSETS_RELOAD_INTERVAL": "0"}
+    env.setdefault("BOT_TOKEN", "1:assets-check")
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.assets", "--probe"],
+        env=env, capture_output=True, text=True, timeout=120,
+    )
+    _expect(result.returncode == 0, f"probe with ASSETS_DIR={assets_dir} failed:\n{result.stderr}")
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    _expect(report["required"] > 0, "handlers require images")
+    _expect(report["missing"] == [], f"ASSETS_DIR={assets_dir}: reported missing {report['missing']}")
+    _expect(report["found"] == report["required"], f"ASSETS_DIR={assets_dir}: handler keys do not resolve")
+
+
+def _transparent(fmt: str) -> bytes:
+    """Левая половина прозрачная, правая — непрозрачный красный."""
+    img = Image.new("RGBA", (64, 32), (0, 0, 0, 0))
+    img.paste((255, 0, 0, 255), (32, 0, 64, 32))
+    if fmt == "P":   # палитра с прозрачным цветом
+        img, fmt = img.convert("P"), "PNG"
+        img.info["transparency"] = img.getpixel((0, 0))
+    out = io.BytesIO()
+    img.save(out, fmt, **({"transparency": img.info["transparency"]} if "transparency" in img.info else {}))
+    return out.getvalue()
+
+
+def check_transparency():
+    from utils.assets import AssetStore
+
+    with tempfile.TemporaryDirectory() as tmp:
+        names = {"rgba.png": "PNG", "palette.png": "P", "rgba.webp": "WEBP"}
+        for name, fmt in names.items():
+            with open(os.path.join(tmp, name), "wb") as f:
+                f.write(_transparent(fmt))
+        store = AssetStore(root=tmp)
+        store.scan()
+        for name in names:
+            asset = store.get(os.path.join(tmp, name))
+            _expect(asset is not None and asset.optimized, f"{name} re-encoded to JPEG")
+            with Image.open(io.BytesIO(asset.data)) as img:
+                clear, solid = img.convert("RGB").getpixel((4, 16)), img.convert("RGB").getpixel((60, 16))
+            _expect(min(clear) > 240, f"{name}: transparent area is white, got {clear}")
+            _expect(solid[0] > 200 and solid[1] < 60 and solid[2] < 60, f"{name}: opaque area kept, got {solid}")
+
+
+def workload(files: int) -> float:
+    from utils.assets import AssetStore
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data = _jpeg(2400, 1600)
+        for i in range(files):
+            with open(os.path.join(tmp, f"screen{i}.jpg"), "wb") as f:
+                f.write(data)
+        store = AssetStore(root=tmp)
+        started = time.monotonic()
+        store.scan()
+        return time.monotonic() - started
+
+
+def _run(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        absolute = os.path.join(tmp, "assets")
+        relative = "./" + os.path.relpath(os.path.join(tmp, "screens"))
+        for assets_dir in (absolute, relative):
+            check_assets_dir(assets_dir)
+            print(f"ASSETS_DIR={assets_dir}: handler images found")
+    if Image is None:
+        print("transparency: skipped (Pillow is not installed)")
+    else:
+        check_transparency()
+        print("transparency: transparent areas flattened onto white")
+    if args.check_only:
+        return
+    elapsed = workload(args.files)
+    print(f"assets: {args.files} images prepared in {elapsed:.3f} s ({args.files / elapsed:,.1f} images/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.assets")
+    parser.add_argument("--files", type=int, default=50)
+    parser.add_argument("--check-only", action="store_true")
+    parser.add_argument("--probe", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.probe:
+        asyncio.run(_probe())
+    else:
+        _run(args)
+
+
+if __name__ == "__main__":
+    main()
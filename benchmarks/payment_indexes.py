@@ -0,0 +1,118 @@
+# benchmarks/payment_indexes.py
+# Планы запросов и время выборок из payment_requests до и после индексов
+# (миграция 4). Запуск из корня проекта:
+#   python -m benchmarks.payment_indexes --rows 1000000
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from utils import migrations
+from utils.sqlite_repository import PENDING_PAYMENTS_SQL, USER_PAYMENTS_SQL
+
+STATUS_WEIGHTS = (("confirmed", 90), ("rejected", 7), ("pending", 3))
+
+QUERIES = {
+    "pending queue": (
+        PENDING_PAYMENTS_SQL, lambda ctx: ("9999-12-31 23:59:59", 50)
+    ),
+    "expiry sweep (pending older than 1 day)": (
+        PENDING_PAYMENTS_SQL, lambda ctx: (ctx["day_ago"], 1000)
+    ),
+    "user history": (
+        USER_PAYMENTS_SQL, lambda ctx: (random.randint(1, ctx["users"]), 20)
+    ),
+    "created_at range count": (
+        "SELECT COUNT(*) FROM payment_requests WHERE status = 'confirmed' AND created_at BETWEEN ? AND ?",
+        lambda ctx: (ctx["week_ago"], ctx["now"])
+    ),
+}
+
+
+def _fill(conn, rows: int, users: int):
+    statuses = [s for s, _ in STATUS_WEIGHTS]
+    weights = [w for _, w in STATUS_WEIGHTS]
+    start = datetime.now() - timedelta(days=365)
+    chunk = 50_000
+    done = 0
+    while done < rows:
+        n = min(chunk, rows - done)
+        batch = []
+        for _ in range(n):
+            created = start + timedelta(seconds=random.randint(0, 365 * 24 * 3600))
+            batch.append((
+                str(uuid.uuid4()), random.randint(1, users), random.choice(("revolut", "crypto")),
+                round(random.uniform(5, 500), 2), None, None, None,
+                random.choices(statuses, weights)[0], created.strftime("%Y-%m-%d %H:%M:%S"),
+            ))
+        conn.executemany("""
+            INSERT INTO payment_requests
+                (payment_id, user_id, method, amount, crypto, crypto_amount, network, status, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, batch)
+        done += n
+    conn.commit()
+
+
+def _run(conn, ctx, repeat: int):
+    for name, (sql, params) in QUERIES.items():
+        plan = conn.execute("EXPLAIN QUERY PLAN " + sql, params(ctx)).fetchall()
+        timings = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            conn.execute(sql, params(ctx)).fetchall()
+            timings.append((time.perf_counter() - t0) * 1000)
+        print(f"  {name}: median {statistics.median(timings):.3f} ms, max {max(timings):.3f} ms")
+        for row in plan:
+            print(f"      plan: {row[-1]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.payment_indexes")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "bench.db"))
+        # схема до индексов: миграции 1..3
+        for version, _, fn in migrations.MIGRATIONS:
+            if version < 4:
+                fn(conn)
+
+        t0 = time.perf_counter()
+        _fill(conn, args.rows, args.users)
+        print(f"{args.rows} rows / {args.users} users generated in {time.perf_counter() - t0:.1f} s")
+
+        now = datetime.now()
+        ctx = {
+            "users": args.users,
+            "now": now.strftime("%Y-%m-%d %H:%M:%S"),
+            "day_ago": (now - timedelta(days=1)).strftime("%Y-%m-%d %H:%M:%S"),
+            "week_ago": (now - timedelta(days=7)).strftime("%Y-%m-%d %H:%M:%S"),
+        }
+
+        print("\nwithout indexes:")
+        _run(conn, ctx, args.repeat)
+
+        t0 = time.perf_counter()
+        migrations.migrate(conn)
+        conn.commit()
+        conn.execute("ANALYZE")
+        print(f"\nmigrations applied (indexes built) in {time.perf_counter() - t0:.1f} s")
+
+        print("\nwith indexes:")
+        _run(conn, ctx, args.repeat)
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
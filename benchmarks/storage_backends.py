@@ -0,0 +1,183 @@
+# benchmarks/storage_backends.py
+# Прогон соответствия для реализаций Repository (memory и sqlite ведут себя одинаково)
+# и сравнение стоимости хранилища на типовой нагрузке хендлеров.
+# Запуск из корня проекта:
+#   python -m benchmarks.storage_backends --users 2000
+#   python -m benchmarks.storage_backends --check-only
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from utils.repository import Repository, MemoryRepository
+from utils.sqlite_repository import SQLiteRepository
+
+
+def _expect(cond: bool, what: str):
+    if not cond:
+        raise AssertionError(what)
+
+
+async def check_repository(repo: Repository):
+    """Общий сценарий соответствия: одинаковые вызовы — одинаковые ответы."""
+    # неизвестный пользователь
+    _expect(await repo.get_user(1) is None, "unknown user -> None")
+    _expect(not await repo.user_exists(1), "unknown user does not exist")
+    _expect(await repo.get_user_language(1) is None, "unknown user has no language")
+
+    # регистрация не перезаписывает существующую запись
+    await repo.register_user(1, "alice", "en")
+    await repo.register_user(1, "bob", "pl")
+    user = await repo.get_user(1)
+    _expect(user["username"] == "alice" and user["language"] == "en", "register_user keeps first record")
+    _expect(user["balance"] == 0.0, "new user has zero balance")
+    await repo.register_user(3)
+    _expect(await repo.get_user_language(3) == "ru", "default language is ru")
+
+    # язык: обновление и создание записи
+    await repo.set_user_language(1, "de")
+    _expect(await repo.get_user_language(1) == "de", "set_user_language updates")
+    await repo.set_user_language(2, "pl")
+    user2 = await repo.get_user(2)
+    _expect(user2 and user2["language"] == "pl" and user2["username"] is None, "set_user_language creates user")
+
+    # username: только у существующих
+    _expect(await repo.set_username(2, "carol") is True, "set_username updates existing user")
+    _expect((await repo.get_user(2))["username"] == "carol", "username stored")
+    _expect(await repo.set_username(404, "ghost") is False, "set_username does not create users")
+    _expect(not await repo.user_exists(404), "no user after set_username on unknown id")
+
+    # баланс в центах, без дрейфа float
+    await repo.update_balance(1, 10.1)
+    await repo.update_balance(1, 0.2)
+    _expect((await repo.get_user(1))["balance"] == 10.3, "10.1 + 0.2 == 10.3")
+    await repo.update_balance(999, 5)
+    _expect(not await repo.user_exists(999), "update_balance does not create users")
+
+    # покупка
+    ok, balance, order_id = await repo.purchase(1, "1", 1, 10.31)
+    _expect((ok, balance, order_id) == (False, 10.3, None), "purchase refuses when funds are short")
+    ok, balance, order_id = await repo.purchase(1, "1", 1, 10.3)
+    _expect(ok and balance == 0.0 and order_id, "purchase debits exact balance")
+
+    # платежи
+    pid = await repo.record_payment_request(1, "revolut", 25.5)
+    pending = await repo.get_pending_payments()
+    _expect([p["payment_id"] for p in pending] == [pid], "new payment is pending")
+    _expect(await repo.confirm_payment(pid) == (1, 25.5, 25.5), "confirm returns new balance")
+    _expect(await repo.confirm_payment(pid) == (None, None, None), "confirm is one-shot")
+    _expect(await repo.reject_payment(pid) is False, "confirmed payment cannot be rejected")
+    pid2 = await repo.record_payment_request(1, "crypto", 7, "usdt", 7.0, "TRC20")
+    _expect(await repo.reject_payment(pid2) is True, "pending payment can be rejected")
+    _expect(await repo.confirm_payment(pid2) == (None, None, None), "rejected payment cannot be confirmed")
+    _expect(await repo.get_pending_payments() == [], "no pending payments left")
+    statuses = sorted(p["status"] for p in await repo.get_user_payments(1))
+    _expect(statuses == ["confirmed", "rejected"], "user payments history")
+
+    # журнал
+    kinds = [e["kind"] for e in await repo.get_balance_history(1)]
+    _expect(kinds == ["topup", "purchase", "adjustment", "adjustment"], "ledger newest first")
+    _expect(await repo.rebuild_balances(dry_run=True) == (3, 0), "snapshots match ledger")
+
+    # параллельные покупки не уводят баланс в минус
+    results = await asyncio.gather(*(repo.purchase(1, "2", 1, 10) for _ in range(5)))
+    _expect(sum(1 for ok, _, _ in results if ok) == 2, "only affordable purchases succeed")
+    _expect((await repo.get_user(1))["balance"] == 5.5, "balance after concurrent purchases")
+
+    # file_id картинок: действителен только для того же содержимого
+    _expect(await repo.get_media_file_id("images/a.jpg", "h1") is None, "unknown media -> None")
+    await repo.set_media_file_id("images/a.jpg", "h1", "F1")
+    _expect(await repo.get_media_file_id("images/a.jpg", "h1") == "F1", "media file_id stored")
+    await repo.set_media_file_id("images/a.jpg", "h2", "F2")
+    _expect(await repo.get_media_file_id("images/a.jpg", "h1") is None, "changed content drops old file_id")
+    _expect(await repo.get_media_file_id("images/a.jpg", "h2") == "F2", "new content has its file_id")
+    await repo.forget_media_file_id("images/a.jpg")
+    _expect(await repo.get_media_file_id("images/a.jpg", "h2") is None, "forgotten file_id")
+
+    # рассылки: keyset-порции без заблокировавших, курсор и счётчики
+    for uid in (100, 101, 102, 103):
+        await repo.register_user(uid)
+    total = await repo.count_broadcast_recipients()
+    _expect(await repo.set_user_blocked(101, True) is True, "set_user_blocked marks existing user")
+    _expect(await repo.set_user_blocked(4040, True) is False, "set_user_blocked does not create users")
+    _expect(await repo.count_broadcast_recipients() == total - 1, "blocked user is not a recipient")
+    _expect(await repo.get_broadcast_recipients(99, 2) == [100, 102], "first page skips blocked")
+    _expect(await repo.get_broadcast_recipients(102, 2) == [103], "next page after cursor")
+    await repo.set_user_blocked(101, False)
+    _expect(await repo.get_broadcast_recipients(100, 1) == [101], "unblocked user is a recipient again")
+    _expect(await repo.get_broadcast("nope") is None, "unknown broadcast -> None")
+    bid = await repo.create_broadcast(1, "<b>hi</b>", 4)
+    b = await repo.get_broadcast(bid)
+    _expect((b["status"], b["last_user_id"], b["total"], b["sent"]) == ("running", 0, 4, 0), "new broadcast")
+    _expect([r["broadcast_id"] for r in await repo.get_running_broadcasts()] == [bid], "running broadcasts")
+    await repo.save_broadcast_progress(bid, 101, 1, 0, 1)
+    b = await repo.get_broadcast(bid)
+    _expect((b["last_user_id"], b["sent"], b["blocked"], b["status"]) == (101, 1, 1, "running"), "progress saved")
+    await repo.save_broadcast_progress(bid, 103, 3, 0, 1, status="done")
+    b = await repo.get_broadcast(bid)
+    _expect(b["status"] == "done" and b["finished_at"] and b["text"] == "<b>hi</b>", "broadcast finished")
+    _expect(await repo.get_running_broadcasts() == [], "finished broadcast is not running")
+
+
+async def workload(repo: Repository, users: int) -> float:
+    """Типовая нагрузка хендлеров: /start, выбор языка, чтения профиля, пополнение, покупка."""
+    async def one_user(uid: int):
+        await repo.register_user(uid, f"user{uid}", "en")
+        await repo.set_user_language(uid, "de")
+        for _ in range(3):
+            await repo.get_user(uid)
+        pid = await repo.record_payment_request(uid, "revolut", 150)
+        await repo.confirm_payment(pid)
+        await repo.purchase(uid, "1", 1, 100.0)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one_user(uid) for uid in range(1, users + 1)))
+    await repo.flush()
+    return time.perf_counter() - started
+
+
+async def _run(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        factories = {
+            "memory": lambda name: MemoryRepository(),
+            "sqlite": lambda name: SQLiteRepository(
+                os.path.join(tmp, f"{name}.db"),
+                pragmas={"journal_mode": "WAL", "synchronous": "NORMAL"},
+                readers=2,
+                batch_max_ops=args.batch,
+                batch_max_delay=0.002,
+            ),
+        }
+        for backend, factory in factories.items():
+            repo = factory("check")
+            await repo.open()
+            await repo.migrate()
+            await check_repository(repo)
+            await repo.close()
+            print(f"{backend}: conformance OK")
+
+        if args.check_only:
+            return
+
+        ops_per_user = 8
+        for backend, factory in factories.items():
+            repo = factory("bench")
+            await repo.open()
+            await repo.migrate()
+            elapsed = await workload(repo, args.users)
+            ops = args.users * ops_per_user
+            print(f"{backend}: {ops} ops in {elapsed:.3f} s ({ops / elapsed:,.0f} ops/s)")
+            await repo.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.storage_backends")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=1, help="batch_max_ops для SQLite (group commit)")
+    parser.add_argument("--check-only", action="store_true")
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
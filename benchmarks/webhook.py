@@ -0,0 +1,183 @@
+# benchmarks/webhook.py
+# Прогон режима webhook (utils/webhook.py) против локального фейкового Bot API
+# (как с BOT_API_SERVER): сервер бота и «Telegram» — на 127.0.0.1, сеть не нужна.
+# Проверяется: 401 без верного секрета, быстрый 200 при медленных хендлерах, порядок
+# апдейтов каждого пользователя при нескольких обработчиках, 200 на неизвестный тип
+# апдейта, регистрация/снятие webhook. Затем — скорость приёма апдейтов.
+# Запуск из корня проекта:
+#   python -m benchmarks.webhook --updates 2000
+#   python -m benchmarks.webhook --check-only
+import argparse
+import asyncio
+import socket
+import time
+import warnings
+from collections import defaultdict
+
+from aiohttp import ClientSession, web
+from aiogram import Bot, Dispatcher, Router, types
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+
+from utils.webhook import WebhookServer, SECRET_HEADER
+
+TOKEN = "1:webhook-check"
+SECRET = "check-secret"
+PATH = "/webhook"
+
+
+def _expect(cond: bool, what: str):
+    if not cond:
+        raise AssertionError(what)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _message(update_id: int, user_id: int, text: str) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id, "date": 0, "text": text,
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "U"},
+        },
+    }
+
+
+async def _post(client: ClientSession, url: str, payload: dict, headers: dict = None) -> int:
+    async with client.post(url, json=payload, headers=headers) as response:
+        return response.status
+
+
+class FakeBotApi:
+    """Минимальный Bot API: запоминает вызовы, на всё отвечает ok."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        data = await request.json() if request.content_type == "application/json" else dict(await request.post())
+        self.calls.append((method, data))
+        return web.json_response({"ok": True, "result": True})
+
+    def methods(self) -> list:
+        return [method for method, _ in self.calls]
+
+
+def _dispatcher(delay: float, seen: dict) -> Dispatcher:
+    dp = Dispatcher()
+    router = Router()
+
+    @router.message()
+    async def record(message: types.Message):
+        # разная задержка по пользователям — перестановки внутри одного были бы видны
+        await asyncio.sleep(delay * (message.from_user.id % 3))
+        seen[message.from_user.id].append(int(message.text))
+
+    dp.include_router(router)
+    return dp
+
+
+async def _start(delay: float, workers: int, seen: dict):
+    api = FakeBotApi()
+    api_app = web.Application()
+    api_app.router.add_post("/bot{token}/{method}", api.handle)
+    api_runner = web.AppRunner(api_app)
+    await api_runner.setup()
+    api_port = _free_port()
+    await web.TCPSite(api_runner, "127.0.0.1", api_port).start()
+
+    bot = Bot(TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(f"http://127.0.0.1:{api_port}")))
+    port = _free_port()
+    server = WebhookServer(
+        _dispatcher(delay, seen), bot, url=f"http://127.0.0.1:{port}", path=PATH, secret=SECRET,
+        host="127.0.0.1", port=port, workers=workers, queue_size=100_000,
+    )
+    await server.start()
+    return api, api_runner, bot, server, f"http://127.0.0.1:{port}{PATH}"
+
+
+async def check_webhook(workers: int = 4):
+    seen = defaultdict(list)
+    api, api_runner, bot, server, url = await _start(0.05, workers, seen)
+    headers = {SECRET_HEADER: SECRET}
+    try:
+        _expect("setWebhook" in api.methods(), "webhook registered on start")
+        registered = dict(api.calls)["setWebhook"]
+        _expect(registered.get("secret_token") == SECRET, "setWebhook carries the secret")
+
+        async with ClientSession() as client:
+            _expect(await _post(client, url, _message(1, 1, "0")) == 401, "missing secret -> 401")
+            _expect(await _post(client, url, _message(2, 1, "0"), {SECRET_HEADER: "wrong"}) == 401,
+                    "wrong secret -> 401")
+
+            # хендлер спит до 0.1с, подтверждение не ждёт обработки
+            users, per_user = 12, 10
+            started = time.monotonic()
+            for n in range(per_user):
+                statuses = await asyncio.gather(*(
+                    _post(client, url, _message(1000 + n * users + u, 100 + u, str(n)), headers)
+                    for u in range(users)
+                ))
+                _expect(all(status == 200 for status in statuses), "valid updates -> 200")
+            acked = time.monotonic() - started
+            _expect(acked < per_user * 0.1, f"acks do not wait for handlers ({acked:.2f}s)")
+
+            _expect(await _post(client, url, {"update_id": 5, "future_update": {"x": 1}}, headers) == 200,
+                    "unknown update type -> 200")
+    finally:
+        await server.stop()
+        await bot.session.close()
+        await api_runner.cleanup()
+
+    _expect("deleteWebhook" in api.methods(), "webhook removed on stop")
+    _expect(server.pending() == 0 and server.failed == 0, "queues drained without errors")
+    _expect(len(seen) == users, "every user handled")
+    _expect(all(order == list(range(per_user)) for order in seen.values()), "per-user order kept across workers")
+
+
+async def workload(updates: int, workers: int) -> float:
+    seen = defaultdict(list)
+    api, api_runner, bot, server, url = await _start(0.0, workers, seen)
+    headers = {SECRET_HEADER: SECRET}
+    try:
+        async with ClientSession() as client:
+            started = time.monotonic()
+            for offset in range(0, updates, 100):
+                await asyncio.gather(*(
+                    _post(client, url, _message(i, 1 + i % 500, str(i)), headers)
+                    for i in range(offset, min(offset + 100, updates))
+                ))
+            return time.monotonic() - started
+    finally:
+        await server.stop()
+        await bot.session.close()
+        await api_runner.cleanup()
+
+
+async def _run(args):
+    # aiogram предупреждает о неизвестном типе апдейта — здесь он подсунут нарочно
+    warnings.filterwarnings("ignore", "Detected unknown update type", RuntimeWarning)
+    await check_webhook(args.workers)
+    print("webhook: checks OK")
+    if args.check_only:
+        return
+    elapsed = await workload(args.updates, args.workers)
+    print(f"webhook: {args.updates} updates acked in {elapsed:.3f} s ({args.updates / elapsed:,.0f} updates/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.webhook")
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--check-only", action="store_true")
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,14 @@ import os
 load_dotenv()
 
 BOT_TOKEN = os.getenv("BOT_TOKEN")
-ADMIN_IDS = list(map(int, os.getenv("ADMIN_IDS", "0").split(","))) if os.getenv("ADMIN_IDS") else []
+# множество: проверка «это админ?» — поиск в хэше, а не проход по списку
+ADMIN_IDS = frozenset(map(int, os.getenv("ADMIN_IDS", "0").split(","))) if os.getenv("ADMIN_IDS") else frozenset()
 CHANNEL_ID = int(os.getenv("CHANNEL_ID", "0")) if os.getenv("CHANNEL_ID") not in ("0", "") else None
 
 # Остальные переменные — как у тебя было
 REVOLUT_PAYMENT_LINK = os.getenv("REVOLUT_PAYMENT_LINK")
+# адрес по умолчанию, если для монеты/сети нет своего в CRYPTO_ADDRESSES
+CRYPTO_WALLET_ADDRESS = os.getenv("CRYPTO_WALLET_ADDRESS")
 CRYPTO_ADDRESSES = {
     "sol": os.getenv("SOL_ADDRESS"),
     "eth": os.getenv("ETH_ADDRESS"),
@@ -19,4 +22,122 @@ CRYPTO_ADDRESSES = {
     "usdt_sol": os.getenv("USDT_SOL"),
     "usdt_erc20": os.getenv("USDT_ERC20")
 }
-# + остальные, если есть
\ No newline at end of file
+# + остальные, если есть
+
+# Хранилище: "sqlite" (по умолчанию) или "memory" (тесты/бенчмарки, без диска)
+DB_BACKEND = os.getenv("DB_BACKEND", "sqlite").strip().lower()
+DB_PATH = os.getenv("DB_PATH", "shop.db")
+
+# База данных: лимит задач в очереди к потоку SQLite (backpressure)
+DB_QUEUE_LIMIT = int(os.getenv("DB_QUEUE_LIMIT", "1000"))
+# Сколько секунд ждать свободного слота в очереди; пусто — ждать без ограничения
+DB_QUEUE_TIMEOUT = float(os.getenv("DB_QUEUE_TIMEOUT")) if os.getenv("DB_QUEUE_TIMEOUT") else None
+
+# Профиль PRAGMA для SQLite (применяется один раз в on_startup).
+# WAL — читатели и писатель не блокируют друг друга; NORMAL в WAL безопасен при сбое процесса.
+DB_PRAGMAS = {
+    "journal_mode": os.getenv("DB_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("DB_SYNCHRONOUS", "NORMAL"),
+    "cache_size": int(os.getenv("DB_CACHE_SIZE", "-16000")),       # <0 — в КиБ (≈16 МБ)
+    "mmap_size": int(os.getenv("DB_MMAP_SIZE", str(128 * 1024 * 1024))),
+    "busy_timeout": int(os.getenv("DB_BUSY_TIMEOUT", "5000")),     # мс
+    "temp_store": os.getenv("DB_TEMP_STORE", "MEMORY"),
+}
+# Сколько читающих соединений поднимать в режиме WAL (0 — все запросы через писателя)
+DB_READERS = int(os.getenv("DB_READERS", "2"))
+
+# Group commit для записей (платежи, баланс, язык): сколько операций максимум
+# в одном COMMIT (1 — выключено) и сколько мс ждать попутчиков для пачки
+DB_BATCH_MAX_OPS = int(os.getenv("DB_BATCH_MAX_OPS", "1"))
+DB_BATCH_MAX_DELAY_MS = float(os.getenv("DB_BATCH_MAX_DELAY_MS", "5"))
+
+# Кэш записей пользователей в процессе (utils/db_api.py): сколько держать и сколько секунд.
+# Записи через db_api обновляют/сбрасывают кэш сами; TTL — страховка от правок в обход бота.
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "300"))
+
+# Переводы: каталог с locales/<язык>.json (или .mo), язык грузится при первом обращении.
+# Раз в I18N_RELOAD_INTERVAL секунд проверяем mtime файлов и перечитываем изменённые (0 — выключено).
+LOCALES_DIR = os.getenv("LOCALES_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "locales"))
+I18N_RELOAD_INTERVAL = float(os.getenv("I18N_RELOAD_INTERVAL", "10"))
+
+# Картинки экранов: каталог сканируется при старте (utils/assets.py). Большие картинки
+# ужимаются до ASSET_MAX_SIDE по длинной стороне и пережимаются в JPEG (нужен Pillow
+# из requirements.txt; без него файлы уходят как есть — об этом предупреждение при старте).
+# Готовые варианты до ASSET_MEMORY_LIMIT_KB держим в памяти; изменения на диске
+# подхватываются раз в ASSETS_RELOAD_INTERVAL секунд (0 — выключено).
+ASSETS_DIR = os.getenv("ASSETS_DIR", "images")
+ASSET_MAX_SIDE = int(os.getenv("ASSET_MAX_SIDE", "1280"))
+ASSET_JPEG_QUALITY = int(os.getenv("ASSET_JPEG_QUALITY", "85"))
+ASSET_MEMORY_LIMIT_KB = int(os.getenv("ASSET_MEMORY_LIMIT_KB", "2048"))
+ASSETS_RELOAD_INTERVAL = float(os.getenv("ASSETS_RELOAD_INTERVAL", "30"))
+
+# Профиль: username из get_chat и file_id верхней аватарки (utils/profile_cache.py).
+# Запись живёт PROFILE_CACHE_TTL секунд; старше PROFILE_REFRESH_AFTER — после ответа
+# обновляется в фоне (экран отдаётся из кэша без запросов к Bot API).
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", "10000"))
+PROFILE_CACHE_TTL = float(os.getenv("PROFILE_CACHE_TTL", "3600"))
+PROFILE_REFRESH_AFTER = float(os.getenv("PROFILE_REFRESH_AFTER", "300"))
+
+# Исходящие запросы к Bot API (utils/outbound.py): общий лимит отправок в секунду,
+# лимит на один личный чат и на группу/канал (в минуту), запас на короткие всплески.
+OUTBOUND_GLOBAL_RATE = float(os.getenv("OUTBOUND_GLOBAL_RATE", "30"))
+OUTBOUND_GLOBAL_BURST = int(os.getenv("OUTBOUND_GLOBAL_BURST", "30"))
+OUTBOUND_CHAT_RATE = float(os.getenv("OUTBOUND_CHAT_RATE", "1"))
+OUTBOUND_CHAT_BURST = int(os.getenv("OUTBOUND_CHAT_BURST", "3"))
+OUTBOUND_GROUP_RATE_PER_MIN = float(os.getenv("OUTBOUND_GROUP_RATE_PER_MIN", "20"))
+
+# Уведомления админам (utils/admin_notify.py): сколько отправок/правок идёт одновременно
+# и для скольких последних платежей помним message_id копий у каждого админа.
+ADMIN_FANOUT_CONCURRENCY = int(os.getenv("ADMIN_FANOUT_CONCURRENCY", "5"))
+ADMIN_MESSAGES_MAX = int(os.getenv("ADMIN_MESSAGES_MAX", "1000"))
+
+# Режим получения апдейтов: polling (по умолчанию) или webhook (utils/webhook.py).
+# WEBHOOK_URL — внешний https-адрес без пути; сервер слушает WEBAPP_HOST:WEBAPP_PORT.
+# WEBHOOK_SECRET — заголовок X-Telegram-Bot-Api-Secret-Token (пусто — выводится из токена).
+# Апдейты разбирают WEBHOOK_WORKERS обработчиков, очередь каждого — до WEBHOOK_QUEUE_SIZE.
+BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "").rstrip("/")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+WEBAPP_HOST = os.getenv("WEBAPP_HOST", "0.0.0.0")
+WEBAPP_PORT = int(os.getenv("WEBAPP_PORT") or os.getenv("PORT") or "8080")
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "8"))
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "1000"))
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))
+# Свой сервер Bot API (локальный telegram-bot-api или тестовый), пусто — api.telegram.org
+BOT_API_SERVER = os.getenv("BOT_API_SERVER", "").rstrip("/")
+
+# Общий пул HTTP-соединений (utils/http.py): всего и на один хост, кэш DNS (с),
+# сколько держать простаивающее соединение (с), таймауты подключения и запроса (с).
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", "100"))
+HTTP_POOL_PER_HOST = int(os.getenv("HTTP_POOL_PER_HOST", "40"))
+HTTP_DNS_TTL = int(os.getenv("HTTP_DNS_TTL", "3600"))
+HTTP_KEEPALIVE = float(os.getenv("HTTP_KEEPALIVE", "60"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "15"))
+
+# Повторы запросов к Bot API (utils/api_retry.py): попыток всего, задержка повтора
+# после сбоя сети/5xx (растёт вдвое, со случайным разбросом, не больше MAX), самое долгое
+# ожидание по 429. После API_BREAKER_THRESHOLD сбоев подряд запросы API_BREAKER_COOLDOWN
+# секунд не отправляются вовсе.
+API_RETRY_ATTEMPTS = int(os.getenv("API_RETRY_ATTEMPTS", "3"))
+API_RETRY_BASE_DELAY = float(os.getenv("API_RETRY_BASE_DELAY", "0.5"))
+API_RETRY_MAX_DELAY = float(os.getenv("API_RETRY_MAX_DELAY", "5"))
+API_RETRY_AFTER_MAX = float(os.getenv("API_RETRY_AFTER_MAX", "30"))
+API_BREAKER_THRESHOLD = int(os.getenv("API_BREAKER_THRESHOLD", "5"))
+API_BREAKER_COOLDOWN = float(os.getenv("API_BREAKER_COOLDOWN", "30"))
+
+# Рассылки (utils/broadcast.py): размер порции получателей из БД, сколько сообщений
+# одновременно «в полёте» (скорость ограничивает utils/outbound.py), как часто (с)
+# обновлять админу сообщение с прогрессом; пауза (с) перед повтором, если Bot API
+# недоступен (сеть/5xx/разомкнут предохранитель utils/api_retry.py).
+BROADCAST_CHUNK = int(os.getenv("BROADCAST_CHUNK", "500"))
+BROADCAST_CONCURRENCY = int(os.getenv("BROADCAST_CONCURRENCY", "10"))
+BROADCAST_REPORT_INTERVAL = float(os.getenv("BROADCAST_REPORT_INTERVAL", "10"))
+BROADCAST_RETRY_DELAY = float(os.getenv("BROADCAST_RETRY_DELAY", "5"))
+
+# Экраны, которые перерисовываются на месте (utils/screen.py): сколько сообщений и
+# сколько секунд помним показанное содержимое (Telegram даёт править 48 часов).
+SCREEN_CACHE_SIZE = int(os.getenv("SCREEN_CACHE_SIZE", "20000"))
+SCREEN_CACHE_TTL = float(os.getenv("SCREEN_CACHE_TTL", "86400"))
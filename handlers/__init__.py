@@ -2,6 +2,13 @@
 from loader import dp
 
 # Просто импортируем все файлы — даже если в них старые импорты, они не упадут на старте
+# broadcast — первым: его команды только для админов, а topup ловит весь прочий текст
+try:
+    from . import broadcast
+    dp.include_router(broadcast.router)
+except Exception as e:
+    print(f"Ошибка загрузки broadcast: {e}")
+
 try:
     from . import start
     dp.include_router(start.router)
@@ -1,11 +1,13 @@
 # handlers/admin.py
-from aiogram import types
-from aiogram.dispatcher import FSMContext
-from loader import dp, bot
+from aiogram import Router, types
+from aiogram.fsm.context import FSMContext
+from loader import bot, callbacks
 from keyboards.main_menu import get_main_menu
-from utils.db_api import confirm_payment, reject_payment, get_user_info
-from config import ADMIN_IDS
-from utils.i18n import tr
+from utils.db_api import confirm_payment, reject_payment, get_user_info, get_user_language
+from utils.i18n import tr_, K
+from middlewares.user_context import UserContext
+from utils.admin_notify import admins
+import html
 import os
 import logging
 
@@ -38,29 +40,35 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+router = Router(name=__name__)
 
-@dp.callback_query_handler(lambda c: c.from_user.id in ADMIN_IDS and c.data.startswith('confirm_'), state='*')
-async def confirm_payment_handler(callback: types.CallbackQuery, state: FSMContext):
+
+async def _close_admin_copies(callback: types.CallbackQuery, payment_id: str, status: str):
+    """Итог по платежу — во все копии уведомления у админов (кнопки убираются)."""
+    status = f"{status} ({html.escape(callback.from_user.full_name)})"
+    if await admins.resolve(payment_id, status):
+        return
+    # копии не записаны (уведомление ушло до рестарта) — правим хотя бы нажатую
+    try:
+        await callback.message.edit_text(f"{callback.message.html_text}\n\n{status}", reply_markup=None)
+    except Exception as e:
+        logger.warning(f"Не удалось обновить сообщение админки: {e}")
+
+
+@callbacks.action("confirm", admin=True)
+async def confirm_payment_handler(callback: types.CallbackQuery, args: tuple, state: FSMContext, user_ctx: UserContext):
     logger.info(f"Admin {callback.from_user.id} confirming payment: {callback.data}, state: {await state.get_state()}")
     try:
-        payment_id = callback.data.replace('confirm_', '')
+        payment_id = args[0] if args else ""
 
         user_id, amount, new_balance = await confirm_payment(payment_id)
 
         if user_id:
-            try:
-                await callback.message.delete()
-            except Exception as e:
-                logger.warning(f"Не удалось удалить сообщение админки: {e}")
-
-            await callback.message.answer(
-                f"✅ <b>Платёж {payment_id} подтверждён.</b>",
-                reply_markup=get_main_menu()
-            )
+            await _close_admin_copies(callback, payment_id, "✅ <b>Подтверждён</b>")
 
             if new_balance is None:
                 try:
-                    info = await get_user_info(user_id)
+                    info = await get_user_info(user_id, fresh=True)
                     new_balance = info.get("balance", 0.0)
                 except Exception as e:
                     logger.error(f"Не удалось получить новый баланс пользователя {user_id}: {e}")
@@ -73,14 +81,16 @@ async def confirm_payment_handler(callback: types.CallbackQuery, state: FSMConte
                 logger.warning(f"Не удалось удалить сообщение ожидания у пользователя {user_id}: {e}")
 
             try:
+                # язык клиента (не админа) — один запрос на всё уведомление
+                lang = await get_user_language(user_id) or "ru"
                 lines = [
-                    await tr(user_id, "payment_confirmed"),
-                    await tr(user_id, "balance_topped_up", amount=amount)
+                    tr_(lang, K.payment_confirmed),
+                    tr_(lang, K.balance_topped_up, amount=amount)
                 ]
                 if new_balance is not None:
-                    lines.append(await tr(user_id, "current_balance", balance=new_balance))
+                    lines.append(tr_(lang, K.current_balance, balance=new_balance))
 
-                await bot.send_message(user_id, "\n".join(lines), reply_markup=get_main_menu())
+                await bot.send_message(user_id, "\n".join(lines), reply_markup=get_main_menu(lang))
                 logger.info(f"Client {user_id} notified about confirmed payment {payment_id}")
             except Exception as e:
                 logger.error(f"Ошибка при отправке уведомления пользователю {user_id}: {e}")
@@ -89,7 +99,7 @@ async def confirm_payment_handler(callback: types.CallbackQuery, state: FSMConte
         else:
             await bot.send_message(
                 callback.from_user.id,
-                await tr(callback.from_user.id, "payment_not_found")
+                user_ctx.tr(K.payment_not_found)
             )
             logger.error(f"Payment {payment_id} not found or already processed by admin {callback.from_user.id}")
             await callback.answer()
@@ -98,19 +108,19 @@ async def confirm_payment_handler(callback: types.CallbackQuery, state: FSMConte
         try:
             await bot.send_message(
                 callback.from_user.id,
-                await tr(callback.from_user.id, "error_check_payment")
+                user_ctx.tr(K.error_check_payment)
             )
         except Exception:
             pass
-        await state.finish()
+        await state.clear()
         await callback.answer()
 
 
-@dp.callback_query_handler(lambda c: c.from_user.id in ADMIN_IDS and c.data.startswith('reject_'), state='*')
-async def reject_payment_handler(callback: types.CallbackQuery, state: FSMContext):
+@callbacks.action("reject", admin=True)
+async def reject_payment_handler(callback: types.CallbackQuery, args: tuple, state: FSMContext, user_ctx: UserContext):
     logger.info(f"Admin {callback.from_user.id} rejecting payment: {callback.data}, state: {await state.get_state()}")
     try:
-        payment_id = callback.data.replace('reject_', '')
+        payment_id = args[0] if args else ""
 
         result = await reject_payment(payment_id)
         if isinstance(result, tuple):
@@ -122,15 +132,7 @@ async def reject_payment_handler(callback: types.CallbackQuery, state: FSMContex
             user_id = payment_user_map.pop(payment_id, None)
 
         if success:
-            try:
-                await callback.message.delete()
-            except Exception as e:
-                logger.warning(f"Не удалось удалить сообщение админки: {e}")
-
-            await callback.message.answer(
-                f"❌ <b>Платёж {payment_id} отклонён.</b>",
-                reply_markup=get_main_menu()
-            )
+            await _close_admin_copies(callback, payment_id, "❌ <b>Отклонён</b>")
 
             if user_id:
                 try:
@@ -140,26 +142,16 @@ async def reject_payment_handler(callback: types.CallbackQuery, state: FSMContex
                 except Exception as e:
                     logger.warning(f"Не удалось удалить сообщение ожидания у пользователя {user_id}: {e}")
 
-                # Переводим первую строку
-                try:
-                    base = await tr(user_id, "payment_rejected_plain")
-                except Exception:
-                    base = "❌ Your payment was rejected by the administrator."
-
-                # Определяем язык
+                # Определяем язык клиента
                 try:
-                    from utils.db_api import get_user_language
                     lang = (await get_user_language(user_id)) or "ru"
                 except Exception:
                     lang = "ru"
 
-                extra_by_lang = {
-                    "ru": "Если считаете, что это ошибка — свяжитесь с администрацией",
-                    "en": "If you believe this is a mistake, please contact the administration",
-                    "de": "Wenn Sie glauben, dass dies ein Fehler ist, wenden Sie sich bitte an die Administration",
-                    "pl": "Jeśli uważasz, że to błąd, skontaktuj się z administracją",
-                }
-                extra_line = extra_by_lang.get(lang, extra_by_lang["en"])
+                # Переводим первую строку
+                base = tr_(lang, K.payment_rejected_plain)
+
+                extra_line = tr_(lang, K.reject_contact_admin)
 
                 admin_user = CURATOR_USERNAME or SUPPORT_USERNAME or ADMIN_CONTACT_USERNAME
                 admin_at = None
@@ -171,19 +163,16 @@ async def reject_payment_handler(callback: types.CallbackQuery, state: FSMContex
 
                 kb = None
                 if admin_at:
-                    try:
-                        btn_text = await tr(user_id, "btn_contact_support")
-                    except Exception:
-                        btn_text = "📧 Contact support"
-                    kb = types.InlineKeyboardMarkup().add(
-                        types.InlineKeyboardButton(btn_text, url=f"https://t.me/{admin_at.lstrip('@')}")
-                    )
+                    btn_text = tr_(lang, K.btn_contact_support)
+                    kb = types.InlineKeyboardMarkup(inline_keyboard=[[
+                        types.InlineKeyboardButton(text=btn_text, url=f"https://t.me/{admin_at.lstrip('@')}")
+                    ]])
 
                 try:
                     await bot.send_message(
                         user_id,
                         text,
-                        reply_markup=kb or get_main_menu()
+                        reply_markup=kb or get_main_menu(lang)
                     )
                 except Exception as e:
                     logger.error(f"Ошибка при отправке уведомления об отклонении пользователю {user_id}: {e}")
@@ -192,7 +181,7 @@ async def reject_payment_handler(callback: types.CallbackQuery, state: FSMContex
         else:
             await bot.send_message(
                 callback.from_user.id,
-                await tr(callback.from_user.id, "payment_not_found_or_not_pending")
+                user_ctx.tr(K.payment_not_found_or_not_pending)
             )
             logger.error(f"Payment {payment_id} not found or not pending by admin {callback.from_user.id}")
 
@@ -202,9 +191,9 @@ async def reject_payment_handler(callback: types.CallbackQuery, state: FSMContex
         try:
             await bot.send_message(
                 callback.from_user.id,
-                await tr(callback.from_user.id, "error_check_payment")
+                user_ctx.tr(K.error_check_payment)
             )
         except Exception:
             pass
-        await state.finish()
+        await state.clear()
         await callback.answer()
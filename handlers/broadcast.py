@@ -0,0 +1,67 @@
+# handlers/broadcast.py — рассылка всем пользователям (только для админов)
+#   /broadcast <текст>          — запустить (или ответом /broadcast на готовое сообщение)
+#   /broadcast_status           — прогресс идущих рассылок
+#   /broadcast_stop [id]        — остановить (без id — все)
+# Плюс учёт блокировок: Telegram присылает my_chat_member, когда пользователь
+# блокирует/разблокирует бота — рассылка пропускает заблокировавших.
+from aiogram import F, Router, types
+from aiogram.filters import Command, CommandObject
+from config import ADMIN_IDS
+from utils.broadcast import broadcasts
+from utils.db_api import set_user_blocked
+import os
+import logging
+
+log_file = os.path.join(os.path.dirname(__file__), 'bot.log')
+
+logging.basicConfig(
+    filename=log_file,
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+router = Router(name=__name__)
+# команды рассылки видят только админы (остальным они уходят дальше как обычный текст)
+router.message.filter(F.from_user.id.in_(ADMIN_IDS))
+
+
+@router.message(Command("broadcast"))
+async def broadcast_command(message: types.Message, command: CommandObject):
+    if message.reply_to_message and (message.reply_to_message.text or message.reply_to_message.caption):
+        text = message.reply_to_message.html_text
+    else:
+        # html_text — чтобы сохранить форматирование; отрезаем саму команду
+        parts = message.html_text.split(maxsplit=1)
+        text = parts[1] if command.args and len(parts) > 1 else ""
+    if not text.strip():
+        await message.answer(
+            "📣 <b>Рассылка</b>\n"
+            "└ <code>/broadcast текст</code> или ответом <code>/broadcast</code> на сообщение\n"
+            "└ <code>/broadcast_status</code>, <code>/broadcast_stop [id]</code>"
+        )
+        return
+    record = await broadcasts.start(message.from_user.id, text)
+    logger.info(f"Admin {message.from_user.id} started broadcast {record['broadcast_id']} to {record['total']} users")
+
+
+@router.message(Command("broadcast_status"))
+async def broadcast_status(message: types.Message):
+    reports = broadcasts.running()
+    await message.answer("\n\n".join(reports) if reports else "📣 Сейчас рассылок нет.")
+
+
+@router.message(Command("broadcast_stop"))
+async def broadcast_stop(message: types.Message, command: CommandObject):
+    stopped = broadcasts.cancel(command.args.strip() if command.args else None)
+    logger.info(f"Admin {message.from_user.id} stopped {stopped} broadcast(s)")
+    await message.answer(f"⏹ Остановлено рассылок: {stopped}" if stopped else "📣 Такой рассылки нет.")
+
+
+@router.my_chat_member(F.chat.type == "private")
+async def bot_blocked_changed(event: types.ChatMemberUpdated):
+    blocked = event.new_chat_member.status == "kicked"
+    try:
+        await set_user_blocked(event.chat.id, blocked)
+    except Exception as e:
+        logger.error(f"Cannot update blocked flag for {event.chat.id}: {e}")
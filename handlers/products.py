@@ -1,14 +1,21 @@
 # handlers/products.py
-from aiogram import types
-from aiogram.dispatcher import FSMContext
-from aiogram.dispatcher.filters.state import State, StatesGroup
-from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, InputMediaPhoto
+from aiogram import Router, types
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
 
-from loader import dp
+from loader import callbacks
 from keyboards.main_menu import get_main_menu
-from utils.db_api import get_user_info, update_balance
-from utils.i18n import tr  # локализация
-from config import ADMIN_IDS
+from keyboards.products import get_products_keyboard, get_purchase_confirm_keyboard
+from utils.db_api import purchase
+from middlewares.user_context import UserContext  # язык/регистрация на апдейт
+from utils.i18n import K
+from config import ASSETS_DIR
+from utils.assets import assets
+from utils.media import media
+from utils.screen import screens
+from utils.menu import is_menu_button
+from utils.products import products
+from utils.admin_notify import admins
 
 import os
 import logging
@@ -23,7 +30,8 @@ except Exception:
     CURATOR_USERNAME = "supcartel"
 
 # Путь к картинке каталога
-PRODUCTS_IMAGE = os.path.join("images", "products.jpg")
+PRODUCTS_IMAGE = os.path.join(ASSETS_DIR, "products.jpg")
+assets.require(PRODUCTS_IMAGE)
 
 log_file = os.path.join(os.path.dirname(__file__), 'bot.log')
 logging.basicConfig(
@@ -33,44 +41,27 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+router = Router(name=__name__)
+
 
 class Purchase(StatesGroup):
     choose_quantity = State()
     waiting_confirmation = State()
 
 
-# Каталог (названия будут переводиться через ключи)
-PRODUCTS = {
-    "1": {"name_key": "product_1", "price": 100.0},
-    "2": {"name_key": "product_2", "price": 200.0},
-    "3": {"name_key": "product_3", "price": 300.0}
-}
-
-
-async def _is_registered(user_id: int) -> bool:
-    """Есть ли пользователь в БД (считаем зарегистрированным)"""
-    try:
-        info = await get_user_info(user_id)
-        return bool(info)
-    except Exception:
-        return False
-
-
-async def _guard_or_start(message_or_cb, state: FSMContext) -> bool:
+async def _guard_or_start(message_or_cb, state: FSMContext, user_ctx: UserContext) -> bool:
     """
     Возвращает True, если зарегистрирован и можно продолжать.
     Если не зарегистрирован — отправляет в /start и возвращает False.
-    Поддерживает и message, и callback.
+    Поддерживает и message, и callback. Регистрацию уже загрузил UserContextMiddleware.
     """
     if isinstance(message_or_cb, types.CallbackQuery):
-        user_id = message_or_cb.from_user.id
         msg = message_or_cb.message
     else:
-        user_id = message_or_cb.from_user.id
         msg = message_or_cb
 
-    if not await _is_registered(user_id):
-        await start_command(msg, state)
+    if not user_ctx.registered:
+        await start_command(msg, state, user_ctx)
         try:
             if isinstance(message_or_cb, types.CallbackQuery):
                 await message_or_cb.answer()
@@ -80,130 +71,72 @@ async def _guard_or_start(message_or_cb, state: FSMContext) -> bool:
     return True
 
 
-async def build_products_keyboard(user_id: int) -> InlineKeyboardMarkup:
-    kb = InlineKeyboardMarkup(row_width=1)
-    for pid, p in PRODUCTS.items():
-        product_name = await tr(user_id, p["name_key"])
-        kb.add(InlineKeyboardButton(text=product_name, callback_data=f"select_{pid}"))
-    return kb
-
-
-async def build_quantity_keyboard(user_id: int) -> InlineKeyboardMarkup:
-    kb = InlineKeyboardMarkup(row_width=5)
-    kb.add(
-        InlineKeyboardButton("1", callback_data="qty_1"),
-        InlineKeyboardButton("2", callback_data="qty_2"),
-        InlineKeyboardButton("3", callback_data="qty_3"),
-        InlineKeyboardButton("4", callback_data="qty_4"),
-        InlineKeyboardButton("5", callback_data="qty_5"),
-    )
-    kb.add(InlineKeyboardButton(await tr(user_id, "cancel"), callback_data="cancel_purchase"))
-    return kb
-
-
-async def edit_photo_or_text(msg: types.Message, image_path: str, caption: str, reply_markup=None):
-    """
-    Универсально обновляет сообщение с фото/текстом:
-    - если в сообщении фото -> пытается заменить медиа и подпись
-    - если фото-файла нет -> меняет только текст/подпись
-    - если в сообщении не фото -> правит текст
-    В случае ошибки — отправляет новое сообщение.
-    """
-    try:
-        if msg.photo:
-            if os.path.exists(image_path):
-                with open(image_path, "rb") as f:
-                    media = InputMediaPhoto(f, caption=caption)
-                    await msg.edit_media(media=media, reply_markup=reply_markup)
-            else:
-                await msg.edit_caption(caption=caption, reply_markup=reply_markup)
-        else:
-            await msg.edit_text(text=caption, reply_markup=reply_markup)
-    except Exception as e:
-        logger.debug(f"edit_photo_or_text fallback: {e}")
-        try:
-            if os.path.exists(image_path):
-                with open(image_path, "rb") as f:
-                    await msg.answer_photo(photo=f, caption=caption, reply_markup=reply_markup)
-            else:
-                await msg.answer(caption, reply_markup=reply_markup)
-        except Exception as e2:
-            logger.error(f"Unable to send fallback message: {e2}")
-
-
-@dp.message_handler(text="🛒 Products")
-async def products_command(message: types.Message, state: FSMContext):
+@router.message(is_menu_button("products"))
+async def products_command(message: types.Message, state: FSMContext, user_ctx: UserContext):
     # ✅ защита: незарегистрированных отправляем в /start
-    if not await _guard_or_start(message, state):
+    if not await _guard_or_start(message, state, user_ctx):
         return
 
-    await state.finish()
-    caption = await tr(message.from_user.id, "choose_product")
+    await state.clear()
+    caption = user_ctx.tr(K.choose_product)
 
     # Пытаемся отправить фото каталога, иначе — просто текст
+    kb = get_products_keyboard(user_ctx.lang)
     try:
-        if os.path.exists(PRODUCTS_IMAGE):
-            with open(PRODUCTS_IMAGE, "rb") as f:
-                await message.answer_photo(
-                    photo=f,
-                    caption=caption,
-                    reply_markup=await build_products_keyboard(message.from_user.id)
-                )
+        if assets.exists(PRODUCTS_IMAGE):
+            sent = await media.answer_photo(
+                message, PRODUCTS_IMAGE,
+                caption=caption,
+                reply_markup=kb
+            )
         else:
-            await message.answer(
+            sent = await message.answer(
                 caption,
-                reply_markup=await build_products_keyboard(message.from_user.id)
+                reply_markup=kb
             )
     except Exception as e:
         logger.error(f"Cannot send products image: {e}")
-        await message.answer(
+        sent = await message.answer(
             caption,
-            reply_markup=await build_products_keyboard(message.from_user.id)
+            reply_markup=kb
         )
+    # запоминаем экран — первая же правка каталога не уйдёт впустую (utils/screen.py)
+    screens.remember(sent, PRODUCTS_IMAGE, caption, kb)
 
-@dp.callback_query_handler(lambda c: c.data.startswith("select_"), state="*")
-async def select_product(callback: types.CallbackQuery, state: FSMContext):
-    if not await _guard_or_start(callback, state):
+@callbacks.action("select")
+async def select_product(callback: types.CallbackQuery, args: tuple, state: FSMContext, user_ctx: UserContext):
+    if not await _guard_or_start(callback, state, user_ctx):
         return
 
-    product_id = callback.data.replace("select_", "")
-    if product_id not in PRODUCTS:
-        await callback.answer(await tr(callback.from_user.id, "product_not_found"))
+    product_id = args[0] if args else ""
+    if product_id not in products:
+        await callback.answer(user_ctx.tr(K.product_not_found))
         return
 
     await state.update_data(product_id=product_id, quantity=1)  # фиксируем qty=1
-    product = PRODUCTS[product_id]
-    product_name = await tr(callback.from_user.id, product["name_key"])
+    product = products.get(product_id)
+    product_name = user_ctx.tr(product["name_key"])
     total = round(product["price"], 2)
     await state.update_data(total=total)
 
-    keyboard = InlineKeyboardMarkup(row_width=2)
-    keyboard.add(
-        InlineKeyboardButton(await tr(callback.from_user.id, "confirm"), callback_data="confirm_final"),
-        InlineKeyboardButton(await tr(callback.from_user.id, "cancel"), callback_data="cancel_purchase")
-    )
+    keyboard = get_purchase_confirm_keyboard(user_ctx.lang)
 
     caption = (
-        f"{await tr(callback.from_user.id, 'confirm_purchase')}\n"
-        f"{await tr(callback.from_user.id, 'product_label')}: <b>{product_name}</b>\n"
-        f"{await tr(callback.from_user.id, 'total_label')}: <b>{total} EUR</b>\n\n"
-        f"{await tr(callback.from_user.id, 'confirm_or_cancel')}"
+        f"{user_ctx.tr(K.confirm_purchase)}\n"
+        f"{user_ctx.tr(K.product_label)}: <b>{product_name}</b>\n"
+        f"{user_ctx.tr(K.total_label)}: <b>{total} EUR</b>\n\n"
+        f"{user_ctx.tr(K.confirm_or_cancel)}"
     )
 
-    await Purchase.waiting_confirmation.set()
-    await edit_photo_or_text(callback.message, PRODUCTS_IMAGE, caption, keyboard)
+    await state.set_state(Purchase.waiting_confirmation)
+    await screens.update(callback.message, PRODUCTS_IMAGE, caption, keyboard)
     await callback.answer()
 
 
-
-
-
-
-
-@dp.callback_query_handler(lambda c: c.data == "confirm_final", state=Purchase.waiting_confirmation)
-async def finalize_purchase(callback: types.CallbackQuery, state: FSMContext):
+@callbacks.action("confirm_final", state=Purchase.waiting_confirmation)
+async def finalize_purchase(callback: types.CallbackQuery, state: FSMContext, user_ctx: UserContext):
     # ✅ защита
-    if not await _guard_or_start(callback, state):
+    if not await _guard_or_start(callback, state, user_ctx):
         return
 
     try:
@@ -211,48 +144,48 @@ async def finalize_purchase(callback: types.CallbackQuery, state: FSMContext):
         product_id = data.get("product_id")
         qty = int(data.get("quantity", 1) or 1)
 
-        if not product_id or product_id not in PRODUCTS:
+        if not product_id or product_id not in products:
             await callback.message.answer(
-                await tr(callback.from_user.id, "error_try_later"),
-                reply_markup=get_main_menu()
+                user_ctx.tr(K.error_try_later),
+                reply_markup=get_main_menu(user_ctx.lang)
             )
-            await state.finish()
+            await state.clear()
             return
 
         user_id = callback.from_user.id
-        product = PRODUCTS[product_id]
-        product_name = await tr(user_id, product["name_key"])
+        product = products.get(product_id)
+        product_name = user_ctx.tr(product["name_key"])
         unit_price = product["price"]
         total = round(unit_price * qty, 2)
 
-        info = await get_user_info(user_id)
-        balance = float(info.get("balance", 0.0) or 0.0)
+        # проверка баланса и списание — одним условным UPDATE в одной транзакции
+        ok, balance, order_id = await purchase(user_id, product_id, qty, total)
+        user_ctx.balance = balance
 
-        if balance < total:
+        if not ok:
+            balance = float(balance or 0.0)
             need = round(total - balance, 2)
             caption = (
-                f"{await tr(user_id, 'insufficient_funds')}\n"
-                f"{await tr(user_id, 'total_needed')}: <b>{total} EUR</b>\n"
-                f"{await tr(user_id, 'your_balance')}: <b>{balance} EUR</b>\n"
-                f"{await tr(user_id, 'missing_amount')}: <b>{need} EUR</b>\n\n"
-                f"{await tr(user_id, 'topup_hint')}"
+                f"{user_ctx.tr(K.insufficient_funds)}\n"
+                f"{user_ctx.tr(K.total_needed)}: <b>{total} EUR</b>\n"
+                f"{user_ctx.tr(K.your_balance)}: <b>{balance} EUR</b>\n"
+                f"{user_ctx.tr(K.missing_amount)}: <b>{need} EUR</b>\n\n"
+                f"{user_ctx.tr(K.topup_hint)}"
             )
-            await edit_photo_or_text(callback.message, PRODUCTS_IMAGE, caption, None)
-            await state.finish()
+            await screens.update(callback.message, PRODUCTS_IMAGE, caption, None)
+            await state.clear()
             await callback.answer()
             return
 
-        await update_balance(user_id, -total)
-
         curator_at = f"@{CURATOR_USERNAME}" if CURATOR_USERNAME else "supcartel"
         caption = (
-            f"{await tr(user_id, 'purchase_success')}\n"
-            f"{await tr(user_id, 'product_label')}: <b>{product_name}</b>\n"
-            f"{await tr(user_id, 'quantity_label')}: <b>{qty}</b>\n"
-            f"{await tr(user_id, 'debited_amount')}: <b>{total} EUR</b>\n\n"
-            f"{await tr(user_id, 'contact_curator')}: {curator_at}"
+            f"{user_ctx.tr(K.purchase_success)}\n"
+            f"{user_ctx.tr(K.product_label)}: <b>{product_name}</b>\n"
+            f"{user_ctx.tr(K.quantity_label)}: <b>{qty}</b>\n"
+            f"{user_ctx.tr(K.debited_amount)}: <b>{total} EUR</b>\n\n"
+            f"{user_ctx.tr(K.contact_curator)}: {curator_at}"
         )
-        await edit_photo_or_text(callback.message, PRODUCTS_IMAGE, caption, None)
+        await screens.update(callback.message, PRODUCTS_IMAGE, caption, None)
 
         # уведомление админам (по-русски)
         try:
@@ -268,40 +201,38 @@ async def finalize_purchase(callback: types.CallbackQuery, state: FSMContext):
                 f"└ <b>Сумма:</b> <b>{total} EUR</b>\n"
                 f"└ <b>Время:</b> <code>{when}</code>"
             )
-            for admin_id in ADMIN_IDS:
-                await dp.bot.send_message(admin_id, text)
+            # всем админам параллельно и в фоне — покупателю ответ уже ушёл
+            admins.send_later(text)
         except Exception as e:
             logger.error(f"Не удалось отправить уведомление админам: {e}")
 
-        logger.info(f"User {user_id} bought {product_name} x{qty} for {total} EUR")
-        await state.finish()
+        logger.info(f"User {user_id} bought {product_name} x{qty} for {total} EUR (order {order_id}, balance {balance})")
+        await state.clear()
         await callback.answer()
 
     except Exception as e:
         logger.error(f"Error in finalize_purchase for user {callback.from_user.id}: {e}")
         try:
-            await edit_photo_or_text(callback.message, PRODUCTS_IMAGE, await tr(callback.from_user.id, "error_try_later"))
+            await screens.update(callback.message, PRODUCTS_IMAGE, user_ctx.tr(K.error_try_later))
         finally:
-            await state.finish()
+            await state.clear()
             await callback.answer()
 
 
-@dp.callback_query_handler(lambda c: c.data == "cancel_purchase", state="*")
-async def cancel_purchase(callback: types.CallbackQuery, state: FSMContext):
+@callbacks.action("cancel_purchase")
+async def cancel_purchase(callback: types.CallbackQuery, state: FSMContext, user_ctx: UserContext):
     # ✅ защита
-    if not await _guard_or_start(callback, state):
+    if not await _guard_or_start(callback, state, user_ctx):
         return
 
-    try:
-        # Сообщение «покупка отменена»
-        await edit_photo_or_text(callback.message, PRODUCTS_IMAGE, await tr(callback.from_user.id, "purchase_cancelled"))
-    except Exception:
-        await callback.message.answer(await tr(callback.from_user.id, "purchase_cancelled"))
+    # «покупка отменена» и сразу каталог — в одном batch до Telegram уходит только каталог
+    async with screens.batch():
+        await screens.update(callback.message, PRODUCTS_IMAGE, user_ctx.tr(K.purchase_cancelled))
 
-    # Снова открыть каталог
-    caption = await tr(callback.from_user.id, "choose_product")
-    kb = await build_products_keyboard(callback.from_user.id)
-    await edit_photo_or_text(callback.message, PRODUCTS_IMAGE, caption, kb)
+        # Снова открыть каталог
+        caption = user_ctx.tr(K.choose_product)
+        kb = get_products_keyboard(user_ctx.lang)
+        await screens.update(callback.message, PRODUCTS_IMAGE, caption, kb)
 
-    await state.finish()
+    await state.clear()
     await callback.answer()
@@ -1,10 +1,16 @@
 # handlers/profile.py — Handler for Profile button (i18n-ready)
-from aiogram import types
-from aiogram.dispatcher import FSMContext
-from loader import dp
+from aiogram import Router, types
+from aiogram.filters import Command
+from aiogram.fsm.context import FSMContext
+from loader import bot
 from keyboards.main_menu import get_main_menu
-from utils.db_api import get_user_info, get_user_language, user_exists
-from utils.i18n import tr, tr_, T  # i18n helpers
+from utils.i18n import tr_, K  # i18n helpers
+from config import ASSETS_DIR
+from utils.assets import assets
+from utils.media import media
+from utils.profile_cache import profiles
+from utils.menu import is_menu_button
+from middlewares.user_context import UserContext
 from .start import start_command  # <-- чтобы увести незарегистрированных в /start
 import os
 import logging
@@ -19,22 +25,10 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-PROFILE_BUTTON_TEXTS = {d.get("btn_profile") for d in T.values()} | {
-    "👨‍💻 Profile", "👨‍💻 Профиль", "📁 Profile", "📁 Профиль", "📁 Profil"
-}
-
-def _pick_db_username(uinfo: dict) -> str:
-    if not uinfo:
-        return ""
-    return (
-        uinfo.get("username")
-        or uinfo.get("tg_username")
-        or uinfo.get("user_name")
-        or uinfo.get("login")
-        or uinfo.get("nick")
-        or uinfo.get("uname")
-        or ""
-    )
+PROFILE_IMAGE = os.path.join(ASSETS_DIR, "profile.jpg")
+assets.require(PROFILE_IMAGE)
+
+router = Router(name=__name__)
 
 def _format_username(*candidates: str) -> str:
     """
@@ -58,88 +52,80 @@ def _format_username(*candidates: str) -> str:
         cand = cand[1:]
     return cand
 
-@dp.message_handler(commands=["profile"])
-@dp.message_handler(lambda m: (m.text or "").strip() in PROFILE_BUTTON_TEXTS)
-async def profile_command(message: types.Message, state: FSMContext):
+@router.message(Command("profile"))
+@router.message(is_menu_button("profile"))
+async def profile_command(message: types.Message, state: FSMContext, user_ctx: UserContext):
     user_id = message.from_user.id
     logger.info(f"User {user_id} accessed Profile, current state: {await state.get_state()}")
 
     # ⛔ Блокируем доступ незарегистрированным: уводим в /start и выходим
-    try:
-        if not await user_exists(user_id):
-            await start_command(message, state)
-            return
-    except Exception as e:
-        logger.error(f"Error checking user_exists for {user_id}: {e}")
-        # на всякий случай тоже уводим в /start
-        await start_command(message, state)
+    # (регистрацию, язык и баланс одним запросом загрузил UserContextMiddleware)
+    if not user_ctx.registered:
+        await start_command(message, state, user_ctx)
         return
 
     try:
-        await state.finish()
+        await state.clear()
         name = message.from_user.full_name
-        user_info = await get_user_info(user_id) or {}
-        lang = await get_user_language(user_id) or "ru"
+        lang = user_ctx.lang
 
         # Дата регистрации
-        reg_date_str = user_info.get("registration_date") or "—"
+        reg_date_str = user_ctx.registration_date or "—"
         try:
             reg_date = datetime.fromisoformat(str(reg_date_str))
             reg_date_str = reg_date.strftime("%Y-%m-%d")
         except Exception:
             pass
 
+        # username из get_chat и аватарка — из кэша (Bot API только при первом показе/после TTL)
+        info = await profiles.get(bot, user_id, user_ctx.username)
+        chat_username = info.username
+
         # Username: пробуем (БД → get_chat → from_user)
-        try:
-            chat = await dp.bot.get_chat(user_id)
-            chat_username = getattr(chat, "username", None)
-        except Exception:
-            chat_username = None
 
-        db_username = _pick_db_username(user_info)
+        db_username = user_ctx.username
         tg_username = message.from_user.username  # может быть None
         nice_username = _format_username(db_username, chat_username, tg_username)
 
-        balance = user_info.get("balance", 0.0)
+        balance = user_ctx.balance
 
         profile_text = (
-            f"👨‍💻 <b>{tr_(lang, 'profile_title')}</b> <code>{name}</code>\n"
+            f"👨‍💻 <b>{tr_(lang, K.profile_title)}</b> <code>{name}</code>\n"
             f"🆔 <code>{user_id}</code>\n\n"
-            f"🏧 <b>{tr_(lang, 'balance_label')}:</b> <code>{balance} EUR</code>\n"
-            f"📅 <b>{tr_(lang, 'registration_date_label')}:</b> <code>{reg_date_str}</code>\n\n"
-            f"📛 <b>{tr_(lang, 'username_label')}:</b> <code>{nice_username}</code>"
+            f"🏧 <b>{tr_(lang, K.balance_label)}:</b> <code>{balance} EUR</code>\n"
+            f"📅 <b>{tr_(lang, K.registration_date_label)}:</b> <code>{reg_date_str}</code>\n\n"
+            f"📛 <b>{tr_(lang, K.username_label)}:</b> <code>{nice_username}</code>"
         )
 
         # Фото профиля: сначала юзерское, затем дефолт
         try:
-            photos = await dp.bot.get_user_profile_photos(user_id, limit=1)
-            if photos.photos:
+            if info.photo_file_id:
                 await message.answer_photo(
-                    photos.photos[0][-1].file_id,
+                    info.photo_file_id,
                     caption=profile_text,
-                    reply_markup=get_main_menu()
+                    reply_markup=get_main_menu(user_ctx.lang)
                 )
             else:
                 raise FileNotFoundError("no user photo")
         except Exception:
-            photo_path = os.path.join("images", "profile.jpg")
             try:
-                with open(photo_path, 'rb') as photo:
-                    await message.answer_photo(
-                        photo=photo,
-                        caption=profile_text,
-                        reply_markup=get_main_menu()
-                    )
+                await media.answer_photo(
+                    message, PROFILE_IMAGE,
+                    caption=profile_text,
+                    reply_markup=get_main_menu(user_ctx.lang)
+                )
             except FileNotFoundError:
-                logger.error(f"Default profile photo not found at {photo_path}")
+                logger.debug(f"Default profile photo not found at {PROFILE_IMAGE}")
                 await message.answer(
-                    profile_text + f"\n({tr_(lang, 'image_unavailable')})",
-                    reply_markup=get_main_menu()
+                    profile_text + f"\n({tr_(lang, K.image_unavailable)})",
+                    reply_markup=get_main_menu(user_ctx.lang)
                 )
 
-        await state.finish()
+        # ответ ушёл — устаревшую запись обновим в фоне (и сменившийся username запишем в БД)
+        profiles.refresh_later(bot, user_id, chat_username)
+        await state.clear()
 
     except Exception as e:
         logger.error(f"Error in profile_command for user {message.from_user.id}: {e}")
-        await message.answer(await tr(user_id, "error_try_later"))
-        await state.finish()
+        await message.answer(user_ctx.tr(K.error_try_later))
+        await state.clear()
@@ -1,8 +1,13 @@
-from aiogram import types
-from aiogram.dispatcher import FSMContext
-from loader import dp
+from aiogram import Router, types
+from aiogram.filters import Command
+from aiogram.fsm.context import FSMContext
+from loader import bot, callbacks
 from keyboards.main_menu import get_main_menu
-from utils.db_api import register_user, user_exists, get_user_language, set_user_language
+from keyboards.cache import FrozenInlineKeyboardMarkup, cached
+from utils.callback_router import callback_data
+from utils.db_api import register_user, set_user_language
+from middlewares.user_context import UserContext
+from utils.i18n import catalog, tr_, K
 from utils.notify import notify_new_user
 from utils.set_bot_commands import set_only_start_for_user  # фиксируем только /start у юзера
 import logging
@@ -16,54 +21,43 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-LANG_PREFIX = "set_lang:"
-
-LANG_CONFIRM = {
-    "ru": "Готово! Язык: Русский.\nОткрываю меню…",
-    "en": "Done! Language: English.\nOpening menu…",
-    "de": "Fertig! Sprache: Deutsch.\nMenü wird geöffnet…",
-    "pl": "Gotowe! Język: Polski.\nOtwieram menu…",
-}
-
-GREETINGS = {
-    "ru": "👋 Привет, {first}! Добро пожаловать в наш магазин.",
-    "en": "👋 Hi, {first}! Welcome to our shop.",
-    "de": "👋 Hallo, {first}! Willkommen in unserem Shop.",
-    "pl": "👋 Cześć, {first}! Witamy w naszym sklepie.",
-}
-
-
-def language_keyboard():
-    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-    kb = InlineKeyboardMarkup(row_width=2)
-    kb.add(
-        InlineKeyboardButton("🇷🇺 Русский", callback_data=f"{LANG_PREFIX}ru"),
-        InlineKeyboardButton("🇬🇧 English", callback_data=f"{LANG_PREFIX}en"),
-        InlineKeyboardButton("🇩🇪 Deutsch", callback_data=f"{LANG_PREFIX}de"),
-        InlineKeyboardButton("🇵🇱 Polski", callback_data=f"{LANG_PREFIX}pl"),
-    )
-    return kb
-
-
-@dp.message_handler(commands=['start'])
-async def start_command(message: types.Message, state: FSMContext):
-    user_id = message.from_user.id
+LANG_ACTION = "set_lang"
+
+router = Router(name=__name__)
+
+
+@cached("language")
+def language_keyboard(lang: str = None):
+    from aiogram.types import InlineKeyboardButton
+    return FrozenInlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="🇷🇺 Русский", callback_data=callback_data(LANG_ACTION, "ru")),
+         InlineKeyboardButton(text="🇬🇧 English", callback_data=callback_data(LANG_ACTION, "en"))],
+        [InlineKeyboardButton(text="🇩🇪 Deutsch", callback_data=callback_data(LANG_ACTION, "de")),
+         InlineKeyboardButton(text="🇵🇱 Polski", callback_data=callback_data(LANG_ACTION, "pl"))],
+    ])
+
+
+@router.message(Command("start"))
+async def start_command(message: types.Message, state: FSMContext, user_ctx: UserContext):
+    # user_ctx.user_id, а не message.from_user: из callback'ов сюда приходит сообщение бота
+    user_id = user_ctx.user_id
     logger.info(f"User {user_id} started the bot, current state: {await state.get_state()}")
 
     try:
         # 1) если язык ещё не выбран — показываем выбор языка и выходим
-        lang = await get_user_language(user_id)
+        lang = user_ctx.language
         if not lang:
             await message.answer(
-                "Выберите язык / Choose your language / Wähle eine Sprache / Wybierz język:",
+                tr_("ru", K.choose_language),
                 reply_markup=language_keyboard()
             )
             return
 
         # 2) регистрация при первом запуске, когда язык уже известен
-        is_new = not await user_exists(user_id)
+        is_new = not user_ctx.registered
         if is_new:
             await register_user(user_id, message.from_user.username, language=lang)
+            user_ctx.registered = True
             logger.info(f"[start] Registered new user {user_id} (lang={lang})")
 
             # уведомление в канал
@@ -75,31 +69,38 @@ async def start_command(message: types.Message, state: FSMContext):
 
         # 2.1) закрепляем у этого пользователя ТОЛЬКО /start (персональные команды)
         try:
-            await set_only_start_for_user(dp.bot, user_id, lang)
+            await set_only_start_for_user(bot, user_id, lang)
         except Exception as e:
             logger.warning(f"set_only_start_for_user failed for {user_id}: {e}")
 
         # 3) приветствие и главное меню
-        greet = GREETINGS.get(lang, GREETINGS["ru"]).format(first=message.from_user.first_name)
-        await message.answer(greet, reply_markup=get_main_menu())
-        await state.finish()
+        greet = tr_(lang, K.greet, first=message.from_user.first_name)
+        await message.answer(greet, reply_markup=get_main_menu(lang))
+        await state.clear()
 
     except Exception as e:
         logger.error(f"Error in start_command for user {user_id}: {e}", exc_info=True)
         await message.answer("❌ <b>Ошибка:</b> Попробуйте позже.")
-        await state.finish()
+        await state.clear()
 
 
-@dp.callback_query_handler(lambda c: c.data and c.data.startswith(LANG_PREFIX))
-async def set_language_callback(call: types.CallbackQuery):
+@callbacks.action(LANG_ACTION)
+async def set_language_callback(call: types.CallbackQuery, args: tuple, user_ctx: UserContext):
     user_id = call.from_user.id
-    lang = call.data.split(":")[1]  # ru|en|de|pl
+    lang = args[0] if args else "ru"  # ru|en|de|pl
+
+    # callback_data приходит от клиента — сохраняем только языки из каталога переводов
+    if lang not in catalog.languages:
+        logger.warning(f"[lang] User {user_id} sent unknown language '{lang}', ignored")
+        await call.answer()
+        return
 
     try:
-        was_new = not await user_exists(user_id)
+        was_new = not user_ctx.registered
 
         # сохраняем язык
         await set_user_language(user_id, lang)
+        user_ctx.set_language(lang)
 
         # регистрируем (создаст запись, если её ещё нет)
         await register_user(
@@ -119,14 +120,15 @@ async def set_language_callback(call: types.CallbackQuery):
 
         # закрепляем ТОЛЬКО /start у пользователя с учётом языка
         try:
-            await set_only_start_for_user(dp.bot, user_id, lang)
+            await set_only_start_for_user(bot, user_id, lang)
         except Exception as e:
             logger.warning(f"set_only_start_for_user (lang callback) failed for {user_id}: {e}")
 
         # подтверждаем выбор языка и открываем меню
-        await call.message.edit_text(LANG_CONFIRM.get(lang, "Language set."))
-        greet = GREETINGS.get(lang, GREETINGS["ru"]).format(first=call.from_user.first_name)
-        await call.message.answer(greet, reply_markup=get_main_menu())
+        await call.message.edit_text(user_ctx.tr(K.lang_confirm))
+        greet = user_ctx.tr(K.greet, first=call.from_user.first_name)
+        await call.message.answer(greet, reply_markup=get_main_menu(lang))
+        await call.answer()
 
     except Exception as e:
         logger.error(f"Error in set_language_callback for user {user_id}: {e}", exc_info=True)
@@ -134,10 +136,10 @@ async def set_language_callback(call: types.CallbackQuery):
 
 
 # 🔒 Блокируем любые другие слэш-команды: всё кроме /start → ведём на сценарий старта
-@dp.message_handler(lambda m: m.text and m.text.startswith('/') and m.text.strip().lower() != '/start', state='*')
-async def block_other_commands(message: types.Message, state: FSMContext):
+@router.message(lambda m: m.text and m.text.startswith('/') and m.text.strip().lower() != '/start')
+async def block_other_commands(message: types.Message, state: FSMContext, user_ctx: UserContext):
     try:
-        await state.finish()
+        await state.clear()
     except Exception:
         pass
-    await start_command(message, state)
+    await start_command(message, state, user_ctx)
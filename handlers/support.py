@@ -1,9 +1,13 @@
 # Handler for Support button
-from aiogram import types
-from aiogram.dispatcher import FSMContext
-from loader import dp
+from aiogram import Router, types
+from aiogram.fsm.context import FSMContext
 from keyboards.support import get_support_menu
-from utils.i18n import tr
+from middlewares.user_context import UserContext
+from utils.i18n import K
+from config import ASSETS_DIR
+from utils.assets import assets
+from utils.media import media
+from utils.menu import is_menu_button
 import os
 import logging
 
@@ -16,49 +20,52 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+SUPPORT_IMAGE = os.path.join(ASSETS_DIR, "support.jpg")
+assets.require(SUPPORT_IMAGE)
 
-@dp.message_handler(text=["📞 Support", "📞 Поддержка"])
-async def support_command(message: types.Message, state: FSMContext):
+router = Router(name=__name__)
+
+
+@router.message(is_menu_button("support"))
+async def support_command(message: types.Message, state: FSMContext, user_ctx: UserContext):
     logger.info(
         f"User {message.from_user.id} accessed Support, current state: {await state.get_state()}"
     )
     try:
-        await state.finish()  # Сброс состояния
+        await state.clear()  # Сброс состояния
 
         # Локализация текста
-        support_title = await tr(message.from_user.id, "support_title")
-        support_description = await tr(message.from_user.id, "support_description")
-        image_unavailable = await tr(message.from_user.id, "image_unavailable")
-        error_try_later = await tr(message.from_user.id, "error_try_later")
+        support_title = user_ctx.tr(K.support_title)
+        support_description = user_ctx.tr(K.support_description)
+        image_unavailable = user_ctx.tr(K.image_unavailable)
+        error_try_later = user_ctx.tr(K.error_try_later)
 
         support_text = f"📞 <b>{support_title}</b>\n{support_description}"
 
-        # Загружаем фото
-        photo_path = os.path.join("images", "support.jpg")
+        # Фото — по file_id из utils/media.py (загружается в Telegram один раз)
         try:
-            with open(photo_path, 'rb') as photo:
-                await message.answer_photo(
-                    photo=photo,
-                    caption=support_text,
-                    reply_markup=await get_support_menu(message.from_user.id)
-                )
+            await media.answer_photo(
+                message, SUPPORT_IMAGE,
+                caption=support_text,
+                reply_markup=get_support_menu(user_ctx.lang)
+            )
         except FileNotFoundError:
-            logger.error(f"Support photo not found at {photo_path}")
+            logger.debug(f"Support photo not found at {SUPPORT_IMAGE}")
             await message.answer(
                 f"{support_text}\n({image_unavailable})",
-                reply_markup=await get_support_menu(message.from_user.id)
+                reply_markup=get_support_menu(user_ctx.lang)
             )
         except Exception as e:
             logger.error(f"Error sending support message to {message.from_user.id}: {e}")
             await message.answer(
                 error_try_later,
-                reply_markup=await get_support_menu(message.from_user.id)
+                reply_markup=get_support_menu(user_ctx.lang)
             )
 
     except Exception as e:
         logger.error(f"Error in support_command for user {message.from_user.id}: {e}")
-        error_try_later = await tr(message.from_user.id, "error_try_later")
+        error_try_later = user_ctx.tr(K.error_try_later)
         await message.answer(
             error_try_later,
-            reply_markup=await get_support_menu(message.from_user.id)
+            reply_markup=get_support_menu(user_ctx.lang)
         )
@@ -0,0 +1,74 @@
+# keyboards/cache.py
+# Готовые клавиатуры по (имя, язык): собираются один раз и отдаются одним и тем же
+# объектом. Кэш сбрасывается целиком, когда меняется версия переводов
+# (utils/i18n.catalog.version) или каталога товаров (utils/products.products.version).
+import logging
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+from aiogram.types import InlineKeyboardMarkup, ReplyKeyboardMarkup
+from pydantic import ConfigDict
+
+from utils.i18n import catalog
+from utils.products import products
+
+logger = logging.getLogger(__name__)
+
+
+class FrozenInlineKeyboardMarkup(InlineKeyboardMarkup):
+    """Общая на всех клавиатура — присваивание полей запрещено."""
+    model_config = ConfigDict(frozen=True)
+
+
+class FrozenReplyKeyboardMarkup(ReplyKeyboardMarkup):
+    model_config = ConfigDict(frozen=True)
+
+
+Markup = FrozenInlineKeyboardMarkup | FrozenReplyKeyboardMarkup
+
+
+class KeyboardCache:
+    def __init__(self):
+        self._items: Dict[Tuple[str, Hashable], Markup] = {}
+        self._stamp: Optional[Tuple[int, int]] = None
+        self.hits = 0
+        self.misses = 0
+        self.resets = 0
+
+    def get(self, name: str, lang: Hashable, build: Callable[[], Markup]) -> Markup:
+        stamp = (catalog.version, products.version)
+        if stamp != self._stamp:
+            if self._items:
+                self.resets += 1
+                logger.info(f"keyboards: сброс кэша (переводы v{stamp[0]}, товары v{stamp[1]})")
+            self._items = {}
+            self._stamp = stamp
+        key = (name, lang)
+        markup = self._items.get(key)
+        if markup is not None:
+            self.hits += 1
+            return markup
+        self.misses += 1
+        markup = build()
+        self._items[key] = markup
+        return markup
+
+    def stats(self) -> dict:
+        return {"size": len(self._items), "hits": self.hits, "misses": self.misses, "resets": self.resets}
+
+
+keyboards = KeyboardCache()
+
+
+def cached(name: str):
+    """
+    Декоратор для построителей клавиатур вида fn(lang) -> Markup:
+    повторный вызов с тем же языком отдаёт уже собранный объект.
+    """
+    def decorator(build: Callable[[Hashable], Markup]):
+        def wrapper(lang: Hashable = None) -> Markup:
+            return keyboards.get(name, lang, lambda: build(lang))
+        wrapper.__name__ = build.__name__
+        wrapper.__doc__ = build.__doc__
+        wrapper.build = build
+        return wrapper
+    return decorator
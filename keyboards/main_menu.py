@@ -1,8 +1,18 @@
 # Main menu keyboard
-from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
+from aiogram.types import KeyboardButton
 
-def get_main_menu():
-    keyboard = ReplyKeyboardMarkup(resize_keyboard=True)
-    keyboard.row(KeyboardButton("👨‍💻 Profile"), KeyboardButton("🛒 Products"))
-    keyboard.row(KeyboardButton("💰 Top-up Balance"), KeyboardButton("📞 Support"))
-    return keyboard
\ No newline at end of file
+from keyboards.cache import FrozenReplyKeyboardMarkup, cached
+from utils.i18n import DEFAULT_LANG, K, tr_
+
+
+@cached("main_menu")
+def get_main_menu(lang: str = None) -> FrozenReplyKeyboardMarkup:
+    """Главное меню на языке пользователя (подписи разбирает utils/menu.py)."""
+    lang = lang or DEFAULT_LANG
+    return FrozenReplyKeyboardMarkup(
+        keyboard=[
+            [KeyboardButton(text=tr_(lang, K.btn_profile)), KeyboardButton(text=tr_(lang, K.btn_products))],
+            [KeyboardButton(text=tr_(lang, K.btn_topup)), KeyboardButton(text=tr_(lang, K.btn_support))],
+        ],
+        resize_keyboard=True,
+    )
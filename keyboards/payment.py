@@ -1,29 +1,67 @@
 # Keyboards for payment selection
-from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-
-def get_payment_menu():
-    keyboard = InlineKeyboardMarkup(row_width=2)
-    keyboard.add(
-        InlineKeyboardButton("💸 Crypto", callback_data="crypto")
-    )
-    return keyboard
-
-def get_crypto_menu():
-    keyboard = InlineKeyboardMarkup(row_width=2)
-    keyboard.add(
-        InlineKeyboardButton("₿ Bitcoin", callback_data="bitcoin"),
-        InlineKeyboardButton("Ξ Ethereum", callback_data="ethereum"),
-        InlineKeyboardButton("◎ Solana", callback_data="solana"),
-        InlineKeyboardButton("₮ USDT", callback_data="usdt")
-    )
-    return keyboard
-
-def get_usdt_network_menu():
-    keyboard = InlineKeyboardMarkup(row_width=2)
-    keyboard.add(
-        InlineKeyboardButton("TRC20", callback_data="TRC20"),
-        InlineKeyboardButton("ERC20", callback_data="ERC20"),
-        InlineKeyboardButton("BEP20", callback_data="BEP20"),
-        InlineKeyboardButton("SOL", callback_data="SOL")
-    )
-    return keyboard
\ No newline at end of file
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+from keyboards.cache import FrozenInlineKeyboardMarkup, cached
+from utils.callback_router import callback_data
+from utils.i18n import tr_, K
+from config import REVOLUT_PAYMENT_LINK
+
+
+@cached("payment_menu")
+def get_payment_menu(lang: str = None) -> FrozenInlineKeyboardMarkup:
+    return FrozenInlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="💸 Crypto", callback_data="crypto")],
+    ])
+
+
+@cached("crypto_menu")
+def get_crypto_menu(lang: str = None) -> FrozenInlineKeyboardMarkup:
+    return FrozenInlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="₿ Bitcoin", callback_data="bitcoin"),
+         InlineKeyboardButton(text="Ξ Ethereum", callback_data="ethereum")],
+        [InlineKeyboardButton(text="◎ Solana", callback_data="solana"),
+         InlineKeyboardButton(text="₮ USDT", callback_data="usdt")],
+    ])
+
+
+@cached("usdt_network_menu")
+def get_usdt_network_menu(lang: str = None) -> FrozenInlineKeyboardMarkup:
+    return FrozenInlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="TRC20", callback_data="TRC20"),
+         InlineKeyboardButton(text="ERC20", callback_data="ERC20")],
+        [InlineKeyboardButton(text="BEP20", callback_data="BEP20"),
+         InlineKeyboardButton(text="SOL", callback_data="SOL")],
+    ])
+
+
+@cached("payment_cancel")
+def get_payment_cancel_menu(lang: str) -> FrozenInlineKeyboardMarkup:
+    """Одна кнопка «Отмена» на шаге ввода суммы."""
+    return FrozenInlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text=tr_(lang, K.cancel), callback_data="cancel_payment")],
+    ])
+
+
+@cached("revolut_confirm")
+def get_revolut_menu(lang: str) -> FrozenInlineKeyboardMarkup:
+    return FrozenInlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text=tr_(lang, K.revolut_open), url=REVOLUT_PAYMENT_LINK)],
+        [InlineKeyboardButton(text=tr_(lang, K.revolut_confirm_btn), callback_data="confirm_revolut")],
+        [InlineKeyboardButton(text=tr_(lang, K.cancel), callback_data="cancel_payment")],
+    ])
+
+
+@cached("crypto_confirm")
+def get_crypto_confirm_menu(lang: str) -> FrozenInlineKeyboardMarkup:
+    return FrozenInlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text=tr_(lang, K.confirm), callback_data="confirm_payment"),
+         InlineKeyboardButton(text=tr_(lang, K.cancel), callback_data="cancel_payment")],
+    ])
+
+
+def get_admin_payment_menu(payment_id: str) -> InlineKeyboardMarkup:
+    """Кнопки админа под заявкой (по-русски); своя на каждый платёж, поэтому не кэшируется."""
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="✅ Подтвердить", callback_data=callback_data("confirm", payment_id)),
+         InlineKeyboardButton(text="❌ Отклонить", callback_data=callback_data("reject", payment_id))],
+    ])
@@ -1,12 +1,32 @@
-from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-
-def get_product_menu(products: dict) -> InlineKeyboardMarkup:
-    markup = InlineKeyboardMarkup(row_width=1)
-    for product_id, product in products.items():
-        markup.add(
-            InlineKeyboardButton(
-                text=product["name"],
-                callback_data=f"buy_{product_id}"
-            )
-        )
-    return markup
+# Keyboards for the product catalog and purchase flow
+from aiogram.types import InlineKeyboardButton
+
+from keyboards.cache import FrozenInlineKeyboardMarkup, cached
+from utils.callback_router import callback_data
+from utils.i18n import tr_, K
+from utils.products import products
+
+
+@cached("products")
+def get_products_keyboard(lang: str) -> FrozenInlineKeyboardMarkup:
+    """Список товаров; пересобирается при смене каталога (products.version) или переводов."""
+    return FrozenInlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text=tr_(lang, p["name_key"]), callback_data=callback_data("select", pid))]
+        for pid, p in products.items.items()
+    ])
+
+
+@cached("quantity")
+def get_quantity_keyboard(lang: str) -> FrozenInlineKeyboardMarkup:
+    return FrozenInlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text=str(n), callback_data=callback_data("qty", n)) for n in range(1, 6)],
+        [InlineKeyboardButton(text=tr_(lang, K.cancel), callback_data="cancel_purchase")],
+    ])
+
+
+@cached("purchase_confirm")
+def get_purchase_confirm_keyboard(lang: str) -> FrozenInlineKeyboardMarkup:
+    return FrozenInlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text=tr_(lang, K.confirm), callback_data="confirm_final"),
+         InlineKeyboardButton(text=tr_(lang, K.cancel), callback_data="cancel_purchase")],
+    ])
@@ -1,6 +1,8 @@
 # Keyboards for support menu
-from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-from utils.i18n import tr
+from aiogram.types import InlineKeyboardButton
+
+from keyboards.cache import FrozenInlineKeyboardMarkup, cached
+from utils.i18n import tr_, K
 
 # Берём логины из конфига, но не требуем их строго
 try:
@@ -26,28 +28,17 @@ def _tg_url(handle_or_url: str) -> str:
         s = s[1:]
     return f"https://t.me/{s}"
 
-async def get_support_menu(user_id: int) -> InlineKeyboardMarkup:
+@cached("support_menu")
+def get_support_menu(lang: str) -> FrozenInlineKeyboardMarkup:
     """
     Локализованное меню поддержки.
     """
-    kb = InlineKeyboardMarkup(row_width=1)
-
-    text_contact_support = await tr(user_id, "btn_contact_support")
-    kb.add(
-        InlineKeyboardButton(
-            text=text_contact_support,
-            url=_tg_url(SUPPORT_USERNAME)
-        )
-    )
+    text_contact_support = tr_(lang, K.btn_contact_support)
+    rows = [[InlineKeyboardButton(text=text_contact_support, url=_tg_url(SUPPORT_USERNAME))]]
 
     # Если захочешь отдельную кнопку админу — раскомментируй и добавь ключ перевода.
-    # text_contact_admin = await tr(user_id, "btn_contact_admin")
+    # text_contact_admin = tr_(lang, "btn_contact_admin")
     # if ADMIN_USERNAME:
-    #     kb.add(
-    #         InlineKeyboardButton(
-    #             text=text_contact_admin,
-    #             url=_tg_url(ADMIN_USERNAME)
-    #         )
-    #     )
+    #     rows.append([InlineKeyboardButton(text=text_contact_admin, url=_tg_url(ADMIN_USERNAME))])
 
-    return kb
+    return FrozenInlineKeyboardMarkup(inline_keyboard=rows)
@@ -2,11 +2,31 @@ from aiogram import Bot, Dispatcher
 from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
-from config import BOT_TOKEN
+from aiogram.client.telegram import TelegramAPIServer, PRODUCTION
+from config import BOT_TOKEN, ADMIN_IDS, BOT_API_SERVER
+from middlewares.user_context import UserContextMiddleware
+from utils.callback_router import CallbackRouter
+from utils.api_retry import api_retry
+from utils.outbound import outbound
+from utils.http import SharedAiohttpSession
 
 bot = Bot(
     token=BOT_TOKEN,
+    # соединения — из общего пула utils/http.py; свой сервер Bot API, если задан BOT_API_SERVER
+    session=SharedAiohttpSession(api=TelegramAPIServer.from_base(BOT_API_SERVER) if BOT_API_SERVER else PRODUCTION),
     default=DefaultBotProperties(parse_mode=ParseMode.HTML)
 )
+# Порядок важен: повторы (429, сбои сети) снаружи — каждый повтор снова проходит планировщик.
+# Планировщик: лимиты Telegram на send/edit, приоритет ответов пользователю
+bot.session.middleware(api_retry)
+bot.session.middleware(outbound)
 storage = MemoryStorage()
-dp = Dispatcher(storage=storage)
\ No newline at end of file
+dp = Dispatcher(storage=storage)
+
+# Регистрация/язык/баланс отправителя — один запрос на апдейт, хендлеры получают user_ctx
+dp.message.outer_middleware(UserContextMiddleware())
+dp.callback_query.outer_middleware(UserContextMiddleware())
+
+# Все inline-кнопки: один хендлер, data разбирается один раз, хендлер — из словаря действий
+callbacks = CallbackRouter(name="callbacks", admins=ADMIN_IDS)
+dp.include_router(callbacks)
@@ -0,0 +1,76 @@
+# middlewares/user_context.py
+# Состояние пользователя на один апдейт: регистрация, язык, баланс, username —
+# одним запросом к хранилищу, дальше хендлеры переводят синхронно без обращений к БД.
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Union
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from utils.db_api import get_user
+from utils.i18n import tr_
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LANG = "ru"
+
+
+@dataclass
+class UserContext:
+    user_id: int
+    registered: bool = False
+    language: Optional[str] = None      # None — язык ещё не выбран
+    balance: float = 0.0
+    username: Optional[str] = None
+    registration_date: Optional[str] = None
+
+    @property
+    def lang(self) -> str:
+        return self.language or DEFAULT_LANG
+
+    def tr(self, key: Union[str, int], **kwargs) -> str:
+        """Перевод на язык пользователя (без обращения к БД); key — хэндл K.<ключ> или имя."""
+        return tr_(self.lang, key, **kwargs)
+
+    def set_language(self, lang: str):
+        """Язык выбран в этом же апдейте: запись уже создана set_user_language."""
+        self.language = lang
+        self.registered = True
+
+
+async def load_user_context(user_id: int, fresh: bool = False) -> UserContext:
+    user = await get_user(user_id, fresh)
+    if not user:
+        return UserContext(user_id=user_id)
+    return UserContext(
+        user_id=user_id,
+        registered=True,
+        language=user["language"],
+        balance=user["balance"],
+        username=user["username"],
+        registration_date=user["registration_date"],
+    )
+
+
+class UserContextMiddleware(BaseMiddleware):
+    """
+    Кладёт в data["user_ctx"] UserContext отправителя апдейта.
+    Хендлер получает его аргументом user_ctx: UserContext.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        if user is not None and "user_ctx" not in data:
+            try:
+                data["user_ctx"] = await load_user_context(user.id)
+            except Exception as e:
+                # хранилище недоступно — считаем незарегистрированным, хендлер уведёт в /start
+                logger.error(f"Cannot load user context for {user.id}: {e}")
+                data["user_ctx"] = UserContext(user_id=user.id)
+        return await handler(event, data)
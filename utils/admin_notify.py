@@ -0,0 +1,137 @@
+# utils/admin_notify.py
+# Уведомления админам: всем сразу (не больше ADMIN_FANOUT_CONCURRENCY одновременных отправок),
+# в полосе Lane.ADMIN и в фоне — пользователь не ждёт, пока сообщение дойдёт до каждого админа.
+# Для запросов на оплату запоминаем (payment_id, admin_id, message_id): когда один админ
+# подтвердил/отклонил платёж, копии у остальных правятся на месте одним проходом.
+import asyncio
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Optional
+
+from aiogram.types import InlineKeyboardMarkup
+
+from config import ADMIN_IDS, ADMIN_FANOUT_CONCURRENCY, ADMIN_MESSAGES_MAX
+from loader import bot
+from utils.outbound import outbound_lane, Lane
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _PaymentMessages:
+    text: str                                           # исходный текст (HTML) уведомления
+    messages: Dict[int, int] = field(default_factory=dict)  # admin_id -> message_id
+    status: Optional[str] = None                        # итог, если платёж уже обработан
+
+
+class AdminNotifier:
+    def __init__(self, admin_ids: Iterable[int] = ADMIN_IDS,
+                 concurrency: int = ADMIN_FANOUT_CONCURRENCY, max_payments: int = ADMIN_MESSAGES_MAX):
+        self.admin_ids = tuple(admin_ids)
+        self.concurrency = max(1, concurrency)
+        self.max_payments = max_payments
+        self._payments: "OrderedDict[str, _PaymentMessages]" = OrderedDict()
+        self._tasks = set()
+        self.sent = 0
+        self.failed = 0
+        self.edited = 0
+
+    # ---------- рассылка ----------
+
+    async def _fan_out(self, coro_factory, targets) -> Dict[int, object]:
+        """coro_factory(target) для каждой цели, не больше concurrency одновременно; ошибки — в лог."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def one(target):
+            async with semaphore:
+                return await coro_factory(target)
+
+        with outbound_lane(Lane.ADMIN):
+            results = await asyncio.gather(*(one(t) for t in targets), return_exceptions=True)
+        return dict(zip(targets, results))
+
+    async def send(self, text: str, reply_markup: Optional[InlineKeyboardMarkup] = None,
+                   payment_id: Optional[str] = None) -> Dict[int, int]:
+        """Отправить всем админам; возвращает admin_id -> message_id доставленных."""
+        entry = None
+        if payment_id is not None:
+            entry = self._payments.setdefault(str(payment_id), _PaymentMessages(text))
+            self._payments.move_to_end(str(payment_id))
+            while len(self._payments) > self.max_payments:
+                self._payments.popitem(last=False)
+
+        async def deliver(admin_id):
+            msg = await bot.send_message(admin_id, text, reply_markup=reply_markup)
+            if entry is not None:
+                entry.messages[admin_id] = msg.message_id
+                if entry.status is not None:
+                    # платёж обработали, пока шла рассылка — эту копию сразу закрываем
+                    try:
+                        await self._edit(admin_id, msg.message_id, entry)
+                        self.edited += 1
+                    except Exception as e:
+                        logger.warning(f"Не удалось обновить уведомление о платеже {payment_id} у админа {admin_id}: {e}")
+            return msg.message_id
+
+        delivered = {}
+        for admin_id, result in (await self._fan_out(deliver, self.admin_ids)).items():
+            if isinstance(result, Exception):
+                self.failed += 1
+                logger.error(f"Не смог написать админу {admin_id}: {result}")
+            else:
+                self.sent += 1
+                delivered[admin_id] = result
+        return delivered
+
+    def send_later(self, text: str, reply_markup: Optional[InlineKeyboardMarkup] = None,
+                   payment_id: Optional[str] = None):
+        """То же, что send(), но в фоне — хендлер отвечает пользователю, не дожидаясь админов."""
+        task = asyncio.create_task(self.send(text, reply_markup, payment_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    # ---------- итог по платежу ----------
+
+    async def _edit(self, admin_id: int, message_id: int, entry: _PaymentMessages):
+        await bot.edit_message_text(
+            f"{entry.text}\n\n{entry.status}",
+            chat_id=admin_id, message_id=message_id, reply_markup=None,
+        )
+
+    async def resolve(self, payment_id: str, status: str) -> int:
+        """
+        Дописывает status во все копии уведомления о платеже и убирает кнопки.
+        Возвращает число обновлённых копий (0 — о платеже ничего не известно, например после рестарта).
+        """
+        entry = self._payments.get(str(payment_id))
+        if entry is None:
+            return 0
+        entry.status = status
+        messages = dict(entry.messages)
+        results = await self._fan_out(lambda a: self._edit(a, messages[a], entry), list(messages))
+        updated = 0
+        for admin_id, result in results.items():
+            if isinstance(result, Exception):
+                logger.warning(f"Не удалось обновить уведомление о платеже {payment_id} у админа {admin_id}: {result}")
+            else:
+                updated += 1
+        self.edited += updated
+        return updated
+
+    async def drain(self):
+        """Дождаться фоновых рассылок (при остановке бота)."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "edited": self.edited,
+            "payments": len(self._payments),
+            "inflight": len(self._tasks),
+        }
+
+
+admins = AdminNotifier()
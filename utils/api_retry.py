@@ -0,0 +1,165 @@
+# utils/api_retry.py
+# Повторы и «предохранитель» для запросов к Bot API: middleware сессии бота (loader.py),
+# стоит снаружи планировщика utils/outbound.py — каждый повтор снова проходит его лимиты.
+#   - 429 (RetryAfter): ждём, сколько сказал Telegram, и повторяем любой метод —
+#     запрос не выполнялся (ожидание больше API_RETRY_AFTER_MAX — сразу ошибка);
+#   - сеть/5xx: повторяем с экспоненциальной задержкой и джиттером только идемпотентные
+#     методы (get*/edit*/delete*/set*) — повтор sendMessage мог бы задвоить сообщение;
+#   - API_BREAKER_THRESHOLD таких сбоев подряд — предохранитель размыкается на
+#     API_BREAKER_COOLDOWN секунд: запросы сразу падают с CircuitOpen, хендлеры не висят
+#     на таймаутах; затем один пробный запрос решает, замкнуть его или нет.
+#   - по каждому методу — счётчики успехов, ошибок, повторов и время попытки
+#     (вместе с ожиданием в планировщике outbound).
+import asyncio
+import logging
+import random
+import time
+from typing import Dict
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramNetworkError, TelegramRetryAfter, TelegramServerError
+
+from config import (
+    API_RETRY_ATTEMPTS, API_RETRY_BASE_DELAY, API_RETRY_MAX_DELAY, API_RETRY_AFTER_MAX,
+    API_BREAKER_THRESHOLD, API_BREAKER_COOLDOWN,
+)
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENT_PREFIXES = ("Get", "Edit", "Delete", "Set")
+# у long polling свои повторы и пауза в aiogram — не трогаем
+PASS_THROUGH = frozenset({"GetUpdates"})
+
+
+class CircuitOpen(TelegramNetworkError):
+    """Bot API недоступен (предохранитель разомкнут) — запрос не отправлялся."""
+
+
+class MethodStats:
+    __slots__ = ("ok", "errors", "retries", "latency_total", "latency_max")
+
+    def __init__(self):
+        self.ok = 0
+        self.errors = 0
+        self.retries = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def as_dict(self) -> dict:
+        attempts = self.ok + self.errors + self.retries   # время ответа — на каждую попытку
+        return {
+            "ok": self.ok,
+            "errors": self.errors,
+            "retries": self.retries,
+            "latency_avg_ms": round(self.latency_total / attempts * 1000, 1) if attempts else 0.0,
+            "latency_max_ms": round(self.latency_max * 1000, 1),
+        }
+
+
+class ApiRetry(BaseRequestMiddleware):
+    def __init__(self, attempts: int = API_RETRY_ATTEMPTS, base_delay: float = API_RETRY_BASE_DELAY,
+                 max_delay: float = API_RETRY_MAX_DELAY, retry_after_max: float = API_RETRY_AFTER_MAX,
+                 breaker_threshold: int = API_BREAKER_THRESHOLD, breaker_cooldown: float = API_BREAKER_COOLDOWN):
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_after_max = retry_after_max
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.methods: Dict[str, MethodStats] = {}
+        self.failures = 0            # сбоев сети/5xx подряд
+        self.open_until = 0.0        # предохранитель разомкнут до этого момента
+        self._probe = False          # идёт пробный запрос после паузы
+        self.fast_failed = 0
+        self.breaker_trips = 0
+
+    # ---------- предохранитель ----------
+
+    def _check_breaker(self, method):
+        if not self.open_until:
+            return False
+        if time.monotonic() < self.open_until or self._probe:
+            self.fast_failed += 1
+            raise CircuitOpen(method=method, message="Bot API недоступен, запрос не отправлялся")
+        self._probe = True
+        return True
+
+    def _settle(self, stats: "MethodStats", started: float, probe: bool, alive: bool):
+        """Учёт попытки: время ответа и состояние предохранителя (alive — Telegram ответил)."""
+        elapsed = time.monotonic() - started
+        stats.latency_total += elapsed
+        stats.latency_max = max(stats.latency_max, elapsed)
+        if alive:
+            if self.open_until:
+                logger.info("api: Bot API снова отвечает, предохранитель замкнут")
+            self.failures = 0
+            self.open_until = 0.0
+            return
+        self.failures += 1
+        # неудачная проба — снова пауза; иначе размыкаем по порогу
+        # (ответы запросов, отправленных до размыкания, паузу не продлевают)
+        if probe or (not self.open_until and self.failures >= self.breaker_threshold):
+            if not self.open_until:
+                self.breaker_trips += 1
+                logger.error(f"api: {self.failures} сбоев подряд — предохранитель разомкнут на {self.breaker_cooldown}с")
+            self.open_until = time.monotonic() + self.breaker_cooldown
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    # ---------- middleware ----------
+
+    async def __call__(self, make_request, bot, method):
+        name = type(method).__name__
+        if name in PASS_THROUGH:
+            return await make_request(bot, method)
+        stats = self.methods.get(name)
+        if stats is None:
+            stats = self.methods[name] = MethodStats()
+        idempotent = name.startswith(IDEMPOTENT_PREFIXES)
+
+        attempt = 0
+        while True:
+            probe = self._check_breaker(method)
+            started = time.monotonic()
+            try:
+                result = await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                self._settle(stats, started, probe, alive=True)
+                if attempt + 1 >= self.attempts or e.retry_after > self.retry_after_max:
+                    stats.errors += 1
+                    raise
+                delay = e.retry_after
+            except (TelegramNetworkError, TelegramServerError) as e:
+                self._settle(stats, started, probe, alive=False)
+                if not idempotent or attempt + 1 >= self.attempts or self.open_until:
+                    stats.errors += 1
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(f"api: {name} — {e}; повтор через {delay:.2f}с")
+            except Exception:
+                # 4xx и прочее: повтор не поможет, но Telegram ответил
+                self._settle(stats, started, probe, alive=True)
+                stats.errors += 1
+                raise
+            else:
+                self._settle(stats, started, probe, alive=True)
+                stats.ok += 1
+                return result
+            finally:
+                if probe:
+                    self._probe = False
+            attempt += 1
+            stats.retries += 1
+            await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        return {
+            "methods": {name: s.as_dict() for name, s in sorted(self.methods.items())},
+            "breaker_open": bool(self.open_until),
+            "breaker_trips": self.breaker_trips,
+            "fast_failed": self.fast_failed,
+        }
+
+
+api_retry = ApiRetry()
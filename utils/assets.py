@@ -0,0 +1,242 @@
+# utils/assets.py
+# Картинки экранов (images/): сканируются один раз при старте — проверка формата,
+# вариант под Telegram (ужатый/пережатый Pillow), небольшие — в памяти.
+# Хендлеры спрашивают assets.get()/exists(): поиск в словаре, без обращений к диску.
+# Отсутствующие картинки, которые ждут хендлеры (assets.require), сообщаются один раз при старте.
+# Pillow — в requirements.txt. Если его всё же нет, бот работает: файлы проверяются
+# по сигнатуре и отдаются как есть, при старте — одно предупреждение.
+import asyncio
+import hashlib
+import io
+import logging
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from aiogram.types import BufferedInputFile, FSInputFile, InputFile
+
+from config import (
+    ASSETS_DIR, ASSET_MAX_SIDE, ASSET_JPEG_QUALITY, ASSET_MEMORY_LIMIT_KB, ASSETS_RELOAD_INTERVAL,
+)
+
+try:
+    from PIL import Image
+except ImportError:   # не установлен requirements.txt — только проверка сигнатуры, файлы как есть
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+# ограничения Telegram для sendPhoto
+PHOTO_MAX_BYTES = 10 * 1024 * 1024
+PHOTO_MAX_SIDES_SUM = 10_000
+PHOTO_MAX_RATIO = 20
+
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"RIFF", "webp"),
+)
+
+
+def _key(path: str) -> str:
+    return os.path.normpath(path)
+
+
+def _to_rgb(img):
+    """Для JPEG: прозрачные области PNG/WebP — на белый фон (convert("RGB") дал бы чёрный/мусор)."""
+    if img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info):
+        rgba = img.convert("RGBA")
+        background = Image.new("RGB", rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        return background
+    return img.convert("RGB")
+
+
+def _sniff(data: bytes) -> Optional[str]:
+    for signature, fmt in _SIGNATURES:
+        if data.startswith(signature):
+            if fmt == "webp" and data[8:12] != b"WEBP":
+                continue
+            return fmt
+    return None
+
+
+@dataclass(frozen=True)
+class Asset:
+    path: str                   # как в хендлерах: os.path.join(ASSETS_DIR, "products.jpg")
+    source: str                 # файл на диске
+    content_hash: str           # хэш отправляемого варианта (ключ file_id в media_files)
+    mtime_ns: int
+    size: int                   # размер файла на диске
+    data: Optional[bytes]       # подготовленный вариант в памяти; None — отправляем файл с диска
+    width: Optional[int] = None
+    height: Optional[int] = None
+    optimized: bool = False     # вариант ужат/пережат Pillow
+
+    def input_file(self) -> InputFile:
+        """Что загружать в Telegram, если file_id ещё нет."""
+        if self.data is not None:
+            return BufferedInputFile(self.data, filename=os.path.basename(self.source))
+        return FSInputFile(self.source)
+
+
+class AssetStore:
+    def __init__(self, root: str = ASSETS_DIR, max_side: int = ASSET_MAX_SIDE,
+                 quality: int = ASSET_JPEG_QUALITY, memory_limit: int = ASSET_MEMORY_LIMIT_KB * 1024):
+        self.root = root
+        self.max_side = max_side
+        self.quality = quality
+        self.memory_limit = memory_limit
+        self._assets: Dict[str, Asset] = {}
+        self._required = set()
+        self._invalid: Dict[str, Tuple[int, int]] = {}   # path -> (mtime_ns, size) битого файла
+        self.version = 0
+
+    # ---------- для хендлеров ----------
+
+    def require(self, *paths: str):
+        """Картинки, без которых экран покажется текстом — о пропаже сообщим при старте."""
+        self._required.update(_key(p) for p in paths)
+
+    def get(self, path: str) -> Optional[Asset]:
+        return self._assets.get(_key(path))
+
+    def exists(self, path: str) -> bool:
+        return _key(path) in self._assets
+
+    def missing(self) -> List[str]:
+        return sorted(p for p in self._required if p not in self._assets)
+
+    # ---------- подготовка (в отдельном потоке) ----------
+
+    def _prepare(self, path: str, st: os.stat_result) -> Asset:
+        with open(path, "rb") as f:
+            data = f.read()
+        fmt = _sniff(data)
+        if fmt is None:
+            raise ValueError("не JPEG/PNG/WebP")
+        width = height = None
+        optimized = False
+        if Image is not None:
+            with Image.open(io.BytesIO(data)) as img:
+                img.verify()
+            with Image.open(io.BytesIO(data)) as img:
+                width, height = img.size
+                if min(width, height) <= 0 or max(width, height) / min(width, height) > PHOTO_MAX_RATIO:
+                    raise ValueError(f"пропорции {width}x{height} Telegram не примет как фото")
+                if max(width, height) > self.max_side or fmt != "jpeg" or len(data) > self.memory_limit:
+                    img.thumbnail((self.max_side, self.max_side))
+                    out = io.BytesIO()
+                    _to_rgb(img).save(out, "JPEG", quality=self.quality, optimize=True, progressive=True)
+                    if out.tell() < len(data) or max(width, height) > self.max_side or fmt != "jpeg":
+                        data = out.getvalue()
+                        width, height = img.size
+                        optimized = True
+            if width + height > PHOTO_MAX_SIDES_SUM:
+                raise ValueError(f"{width}x{height}: сумма сторон больше {PHOTO_MAX_SIDES_SUM}")
+        if len(data) > PHOTO_MAX_BYTES:
+            raise ValueError(f"{len(data) // 1024} КБ — больше лимита Telegram для фото")
+        content_hash = hashlib.sha256(data).hexdigest()
+        return Asset(
+            path=_key(path), source=path, content_hash=content_hash,
+            mtime_ns=st.st_mtime_ns, size=st.st_size,
+            data=data if (optimized or len(data) <= self.memory_limit) else None,
+            width=width, height=height, optimized=optimized,
+        )
+
+    def scan(self) -> List[str]:
+        """
+        Сверяет каталог с тем, что уже загружено: новые и изменённые (mtime/size) файлы
+        готовит заново, удалённые убирает. Возвращает изменившиеся пути.
+        Битый файл не перечитывается, пока не изменится.
+        """
+        assets = dict(self._assets)
+        seen = set()
+        changed = []
+        for dirpath, _dirs, files in os.walk(self.root):
+            for name in sorted(files):
+                if not name.lower().endswith(IMAGE_EXTENSIONS):
+                    continue
+                path = os.path.join(dirpath, name)
+                key = _key(path)
+                seen.add(key)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                stamp = (st.st_mtime_ns, st.st_size)
+                current = assets.get(key)
+                if current and (current.mtime_ns, current.size) == stamp:
+                    continue
+                if self._invalid.get(key) == stamp:
+                    continue
+                try:
+                    assets[key] = self._prepare(path, st)
+                    self._invalid.pop(key, None)
+                except Exception as e:
+                    logger.error(f"assets: {path} пропущен — {e}")
+                    self._invalid[key] = stamp
+                    assets.pop(key, None)
+                changed.append(key)
+        for key in list(assets):
+            if key not in seen:
+                del assets[key]
+                changed.append(key)
+        for key in list(self._invalid):
+            if key not in seen:
+                del self._invalid[key]
+        if changed:
+            # одно присваивание — хендлеры видят либо старый, либо новый набор
+            self._assets = assets
+            self.version += 1
+        return changed
+
+    # ---------- запуск ----------
+
+    async def load(self):
+        """Сканирование при старте + один отчёт о недостающих картинках."""
+        if not os.path.isdir(self.root):
+            logger.warning(f"assets: каталог {self.root} не найден, экраны пойдут без картинок")
+        if Image is None:
+            logger.warning(
+                "assets: Pillow не установлен — картинки не ужимаются и не пережимаются, "
+                "уходят как есть; включить: pip install -r requirements.txt"
+            )
+        await asyncio.to_thread(self.scan)
+        stats = self.stats()
+        logger.info(
+            f"assets: {stats['files']} картинок, {stats['optimized']} ужато, {stats['memory_kb']} КБ в памяти"
+        )
+        for path in self.missing():
+            logger.warning(f"assets: нет {path} — экран покажется без картинки")
+
+    def stats(self) -> dict:
+        assets = list(self._assets.values())
+        return {
+            "files": len(assets),
+            "optimized": sum(1 for a in assets if a.optimized),
+            "memory_kb": sum(len(a.data) for a in assets if a.data is not None) // 1024,
+            "invalid": len(self._invalid),
+            "missing": len(self.missing()),
+            "version": self.version,
+        }
+
+
+async def watch_assets(interval: float = ASSETS_RELOAD_INTERVAL):
+    """Фоновая проверка каталога картинок: изменённые файлы готовятся заново в отдельном потоке."""
+    if interval <= 0:
+        return
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            changed = await asyncio.to_thread(assets.scan)
+            if changed:
+                logger.info(f"assets: обновлены {', '.join(changed)} (v{assets.version})")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"assets: ошибка проверки каталога: {e}")
+
+
+assets = AssetStore()
@@ -0,0 +1,243 @@
+# utils/broadcast.py
+# Рассылка всем пользователям (команды — handlers/broadcast.py).
+#   - получатели читаются из users порциями по BROADCAST_CHUNK (keyset по user_id) —
+#     в памяти не больше одной порции, хоть 100k пользователей;
+#   - отправка в полосе Lane.BULK: лимиты Telegram и приоритет живых ответов
+#     обеспечивает utils/outbound.py, 429 повторяет utils/api_retry.py;
+#   - одновременно в работе до BROADCAST_CONCURRENCY сообщений, но курсор двигается строго
+#     по порядку и сохраняется после каждого получателя: после падения/рестарта рассылка
+#     продолжается с места остановки (повторно могут уйти лишь те, что были «в полёте»);
+#   - заблокировавшие бота помечаются (users.blocked_at) и дальше не выбираются;
+#   - FAILED — только ошибки конкретного чата; если недоступен сам Bot API (сеть/5xx,
+#     разомкнутый предохранитель utils/api_retry.py) — курсор стоит, рассылка ждёт
+#     и отправляет тому же получателю снова;
+#   - админ видит одно сообщение с прогрессом: скорость и оценка оставшегося времени.
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from aiogram.exceptions import (
+    TelegramBadRequest, TelegramForbiddenError, TelegramNetworkError, TelegramRetryAfter, TelegramServerError,
+)
+
+from config import BROADCAST_CHUNK, BROADCAST_CONCURRENCY, BROADCAST_REPORT_INTERVAL, BROADCAST_RETRY_DELAY
+from loader import bot
+from utils.api_retry import api_retry
+from utils.db_api import (
+    count_broadcast_recipients, get_broadcast_recipients, create_broadcast, get_broadcast,
+    get_running_broadcasts, save_broadcast_progress, set_user_blocked,
+)
+from utils.outbound import outbound_lane, Lane
+
+logger = logging.getLogger(__name__)
+
+SENT, BLOCKED, FAILED = "sent", "blocked", "failed"
+RETRY = "retry"     # Bot API недоступен — получатель не обработан, отправим ещё раз
+# «получателя больше нет» — как и блокировка, повторять не имеет смысла
+GONE_ERRORS = ("chat not found", "user is deactivated", "bot was blocked")
+
+
+def _format_eta(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}с"
+    if seconds < 3600:
+        return f"{seconds // 60}м {seconds % 60:02d}с"
+    return f"{seconds // 3600}ч {seconds % 3600 // 60:02d}м"
+
+
+class _Run:
+    """Состояние одной идущей рассылки (счётчики — с учётом прошлых запусков)."""
+
+    def __init__(self, record: dict):
+        self.id = record["broadcast_id"]
+        self.admin_id = record["admin_id"]
+        self.text = record["text"]
+        self.total = record["total"]
+        self.cursor = record["last_user_id"]
+        self.counts = {SENT: record["sent"], BLOCKED: record["blocked"], FAILED: record["failed"]}
+        self.started = time.monotonic()
+        self.done_at_start = self.processed
+        self.stop_requested = False
+        self.report_message_id: Optional[int] = None
+        self.api_back = False      # повтор после недоступности прошёл — остальным в окне не ждать
+        self.reported_at = 0.0
+
+    @property
+    def processed(self) -> int:
+        return sum(self.counts.values())
+
+    def rate(self) -> float:
+        elapsed = time.monotonic() - self.started
+        return (self.processed - self.done_at_start) / elapsed if elapsed > 0 else 0.0
+
+    def report(self, status: str = "идёт") -> str:
+        rate = self.rate()
+        remaining = max(0, self.total - self.processed)
+        eta = _format_eta(remaining / rate) if rate > 0 and remaining else "—"
+        return (
+            f"📣 <b>Рассылка</b> <code>{self.id[:8]}</code>: {status}\n"
+            f"└ <b>Обработано:</b> {self.processed}/{self.total}\n"
+            f"└ <b>Доставлено:</b> {self.counts[SENT]}, <b>заблокировали:</b> {self.counts[BLOCKED]}, "
+            f"<b>ошибок:</b> {self.counts[FAILED]}\n"
+            f"└ <b>Скорость:</b> {rate:.1f} сообщ/с, <b>осталось:</b> ~{eta}"
+        )
+
+
+class Broadcaster:
+    def __init__(self, chunk: int = BROADCAST_CHUNK, concurrency: int = BROADCAST_CONCURRENCY,
+                 report_interval: float = BROADCAST_REPORT_INTERVAL, retry_delay: float = BROADCAST_RETRY_DELAY):
+        self.chunk = chunk
+        self.concurrency = max(1, concurrency)
+        self.report_interval = report_interval
+        self.retry_delay = retry_delay
+        self._runs: Dict[str, _Run] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    # ---------- управление ----------
+
+    async def start(self, admin_id: int, text: str) -> dict:
+        """Новая рассылка text (HTML) всем незаблокировавшим; возвращает её запись."""
+        total = await count_broadcast_recipients()
+        broadcast_id = await create_broadcast(admin_id, text, total)
+        record = await get_broadcast(broadcast_id)
+        self._spawn(record)
+        logger.info(f"broadcast {broadcast_id}: started by {admin_id}, {total} recipients")
+        return record
+
+    async def resume(self) -> int:
+        """При старте бота: продолжить незавершённые рассылки с сохранённого курсора."""
+        records = await get_running_broadcasts()
+        for record in records:
+            if record["broadcast_id"] not in self._tasks:
+                logger.info(f"broadcast {record['broadcast_id']}: resuming after user {record['last_user_id']}")
+                self._spawn(record)
+        return len(records)
+
+    def cancel(self, broadcast_id: Optional[str] = None) -> int:
+        """Остановить рассылку (по id или префиксу id; None — все); сколько остановлено."""
+        stopped = 0
+        for run in self._runs.values():
+            if broadcast_id is None or run.id.startswith(broadcast_id):
+                run.stop_requested = True
+                stopped += 1
+        return stopped
+
+    def running(self) -> list:
+        return [run.report() for run in self._runs.values()]
+
+    async def shutdown(self):
+        """Остановка бота: прерываем отправку, курсор уже в БД — после рестарта продолжим."""
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+    def _spawn(self, record: dict):
+        run = _Run(record)
+        self._runs[run.id] = run
+        task = asyncio.create_task(self._run(run))
+        self._tasks[run.id] = task
+        task.add_done_callback(lambda t: self._finished(run.id, t))
+
+    def _finished(self, broadcast_id: str, task: asyncio.Task):
+        self._runs.pop(broadcast_id, None)
+        self._tasks.pop(broadcast_id, None)
+        if not task.cancelled() and task.exception():
+            logger.error(f"broadcast {broadcast_id}: stopped with error: {task.exception()}")
+
+    # ---------- отправка ----------
+
+    async def _deliver(self, user_id: int, text: str) -> str:
+        try:
+            with outbound_lane(Lane.BULK):
+                await bot.send_message(user_id, text)
+            return SENT
+        except TelegramForbiddenError:
+            await set_user_blocked(user_id, True)
+            return BLOCKED
+        except (TelegramNetworkError, TelegramServerError, TelegramRetryAfter) as e:
+            # в т.ч. CircuitOpen: дело не в получателе, а в Telegram
+            logger.debug(f"broadcast: {user_id}: {e}")
+            return RETRY
+        except TelegramBadRequest as e:
+            if any(reason in str(e).lower() for reason in GONE_ERRORS):
+                await set_user_blocked(user_id, True)
+                return BLOCKED
+            logger.warning(f"broadcast: {user_id}: {e}")
+            return FAILED
+        except Exception as e:
+            logger.warning(f"broadcast: {user_id}: {e}")
+            return FAILED
+
+    def _outage_delay(self) -> float:
+        """Сколько ждать перед повтором: до конца паузы предохранителя, но не меньше retry_delay."""
+        if api_retry.open_until:
+            return max(self.retry_delay, api_retry.open_until - time.monotonic())
+        return self.retry_delay
+
+    async def _settle(self, run: _Run, user_id: int, task: asyncio.Task) -> bool:
+        """Дождаться результата по получателю и сдвинуть курсор; False — остановлена во время паузы."""
+        outcome = await task
+        while outcome == RETRY:
+            # ушедшие в окне до восстановления — сразу ещё раз, остальные ждут паузу
+            if not run.api_back:
+                delay = self._outage_delay()
+                logger.warning(f"broadcast {run.id}: Bot API недоступен, повтор для {user_id} через {delay:.0f}с")
+                await self._report(run, "пауза: Bot API недоступен")
+                await asyncio.sleep(delay)
+            if run.stop_requested:
+                return False
+            outcome = await self._deliver(user_id, run.text)
+            run.api_back = outcome != RETRY
+        run.counts[outcome] += 1
+        run.cursor = user_id
+        await save_broadcast_progress(run.id, run.cursor, run.counts[SENT], run.counts[FAILED], run.counts[BLOCKED])
+        if time.monotonic() - run.reported_at >= self.report_interval:
+            await self._report(run)
+        return True
+
+    async def _run(self, run: _Run):
+        window = deque()
+        status = "done"
+        try:
+            await self._report(run)
+            while not run.stop_requested:
+                user_ids = await get_broadcast_recipients(run.cursor, self.chunk)
+                if not user_ids:
+                    break
+                for user_id in user_ids:
+                    if run.stop_requested:
+                        break
+                    window.append((user_id, asyncio.create_task(self._deliver(user_id, run.text))))
+                    if len(window) >= self.concurrency and not await self._settle(run, *window.popleft()):
+                        break
+                while window and not run.stop_requested:
+                    if not await self._settle(run, *window.popleft()):
+                        break
+            if run.stop_requested:
+                status = "cancelled"
+        finally:
+            for _, task in window:
+                task.cancel()
+        await save_broadcast_progress(run.id, run.cursor, run.counts[SENT], run.counts[FAILED],
+                                      run.counts[BLOCKED], status=status)
+        logger.info(f"broadcast {run.id}: {status}, {run.counts}")
+        await self._report(run, "завершена" if status == "done" else "остановлена")
+
+    async def _report(self, run: _Run, status: str = "идёт"):
+        """Одно сообщение админу с прогрессом — правится на месте."""
+        run.reported_at = time.monotonic()
+        text = run.report(status)
+        try:
+            with outbound_lane(Lane.ADMIN):
+                if run.report_message_id is None:
+                    run.report_message_id = (await bot.send_message(run.admin_id, text)).message_id
+                else:
+                    await bot.edit_message_text(text, chat_id=run.admin_id, message_id=run.report_message_id)
+        except Exception as e:
+            logger.debug(f"broadcast {run.id}: progress report failed: {e}")
+
+
+broadcasts = Broadcaster()
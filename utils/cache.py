@@ -0,0 +1,77 @@
+# utils/cache.py
+# Небольшой LRU-кэш со сроком жизни записей (для данных пользователей в db_api)
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+# маркер промаха: None — законное значение (например, «пользователя нет»)
+MISSING = object()
+
+
+class TTLCache:
+    """
+    LRU + TTL: не больше maxsize записей, каждая живёт ttl секунд.
+    Без блокировок — рассчитан на использование из одного event loop.
+    """
+
+    def __init__(self, maxsize: int = 10_000, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()   # key -> (expires_at, value)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        """Значение по ключу; при промахе — default (по умолчанию MISSING)."""
+        item = self._data.get(key)
+        if item is not None:
+            expires_at, value = item
+            if expires_at > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._data[key]
+            self.expired += 1
+        self.misses += 1
+        return default
+
+    def set(self, key: Hashable, value: Any):
+        if self.maxsize <= 0:
+            return
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def peek(self, key: Hashable, default: Any = MISSING) -> Any:
+        """Значение без учёта в статистике и без продления LRU (для точечного обновления)."""
+        item = self._data.get(key)
+        if item is None or item[0] <= time.monotonic():
+            return default
+        return item[1]
+
+    def pop(self, key: Hashable):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expired": self.expired,
+        }
+
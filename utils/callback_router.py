@@ -0,0 +1,128 @@
+# utils/callback_router.py
+# Роутер inline-кнопок: callback_data разбирается один раз в (action, args),
+# хендлер берётся из словаря по действию (и состоянию FSM) — стоимость маршрутизации
+# не растёт с числом экранов, в отличие от цепочки lambda-фильтров.
+import inspect
+import logging
+from typing import Any, Callable, Dict, Iterable, NamedTuple, Optional, Tuple, Union
+
+from aiogram import Router
+from aiogram.dispatcher.event.bases import UNHANDLED
+from aiogram.fsm.state import State
+from aiogram.types import CallbackQuery
+
+logger = logging.getLogger(__name__)
+
+# новый формат: "action:arg1:arg2"; старый "action_arg" (confirm_<id>, select_<id>) тоже понимаем,
+# чтобы кнопки в уже отправленных сообщениях продолжали работать
+SEPARATOR = ":"
+LEGACY_SEPARATOR = "_"
+ANY_STATE = None
+
+
+def callback_data(action: str, *args: Any) -> str:
+    """Собирает callback_data для кнопки: callback_data("confirm", pid) -> "confirm:<pid>"."""
+    if not args:
+        return action
+    return SEPARATOR.join((action, *map(str, args)))
+
+
+def _state_name(state: Union[State, str, None]) -> Optional[str]:
+    if state is None or isinstance(state, str):
+        return state
+    return state.state
+
+
+class Route(NamedTuple):
+    handler: Callable
+    params: Tuple[str, ...]     # какие ключи data передавать хендлеру
+    admin_only: bool
+
+
+class CallbackRouter(Router):
+    """
+    aiogram Router с единственным хендлером callback_query.
+
+    Порядок поиска (всё — словари):
+      1) действие + текущее состояние;
+      2) действие в любом состоянии;
+      3) «любая кнопка» в текущем состоянии (выбор метода/монеты/сети в топапе);
+      4) fallback.
+    Хендлер получает callback и те ключи data, которые есть в его сигнатуре
+    (state, user_ctx, raw_state, args, bot, ...).
+    """
+
+    def __init__(self, name: Optional[str] = None, admins: Iterable[int] = ()):
+        super().__init__(name=name)
+        self.admins = frozenset(admins)
+        self._routes: Dict[Tuple[str, Optional[str]], Route] = {}
+        self._state_routes: Dict[str, Route] = {}
+        self._actions = set()
+        self._fallback: Optional[Route] = None
+        self.callback_query.register(self._dispatch)
+
+    # ---------- регистрация ----------
+    @staticmethod
+    def _route(handler: Callable, admin_only: bool) -> Route:
+        params = tuple(inspect.signature(handler).parameters)[1:]
+        return Route(handler, params, admin_only)
+
+    def action(self, name: str, state: Union[State, str, None] = ANY_STATE, admin: bool = False):
+        """Кнопка с callback_data "name" / "name:args..." (и старое "name_arg")."""
+        def decorator(handler):
+            key = (name, _state_name(state))
+            if key in self._routes:
+                raise ValueError(f"callback action '{name}' уже зарегистрирован для состояния {key[1]}")
+            self._routes[key] = self._route(handler, admin)
+            self._actions.add(name)
+            return handler
+        return decorator
+
+    def state(self, state: Union[State, str]):
+        """Любая кнопка в состоянии state (если под её действие нет своего хендлера)."""
+        def decorator(handler):
+            self._state_routes[_state_name(state)] = self._route(handler, False)
+            return handler
+        return decorator
+
+    def fallback(self):
+        """Кнопка, которую никто не взял (устаревшая клавиатура и т.п.)."""
+        def decorator(handler):
+            self._fallback = self._route(handler, False)
+            return handler
+        return decorator
+
+    # ---------- разбор и диспетчеризация ----------
+    def parse(self, data: Optional[str]) -> Tuple[str, Tuple[str, ...]]:
+        if not data:
+            return "", ()
+        action, sep, rest = data.partition(SEPARATOR)
+        if sep:
+            return action, tuple(rest.split(SEPARATOR))
+        if data in self._actions:
+            return data, ()
+        head, sep, rest = data.partition(LEGACY_SEPARATOR)
+        if sep and head in self._actions:
+            return head, (rest,)
+        return data, ()
+
+    def resolve(self, action: str, raw_state: Optional[str]) -> Optional[Route]:
+        return (
+            self._routes.get((action, raw_state))
+            or self._routes.get((action, ANY_STATE))
+            or self._state_routes.get(raw_state)
+            or self._fallback
+        )
+
+    async def _dispatch(self, callback: CallbackQuery, **data: Any) -> Any:
+        action, args = self.parse(callback.data)
+        route = self.resolve(action, data.get("raw_state"))
+        if route is None:
+            return UNHANDLED
+        if route.admin_only and callback.from_user.id not in self.admins:
+            logger.warning(f"callback '{action}' from non-admin {callback.from_user.id} ignored")
+            await callback.answer()
+            return None
+        data["args"] = args
+        data["action"] = action
+        return await route.handler(callback, **{k: data[k] for k in route.params if k in data})
@@ -1,8 +1,9 @@
 # Crypto price fetching
-import aiohttp
 import logging
 import os
 
+from utils.http import http  # общий пул: соединение с CoinGecko переиспользуется
+
 log_file = os.path.join(os.path.dirname(__file__), 'bot.log')
 
 logging.basicConfig(
@@ -25,18 +26,18 @@ async def get_crypto_price(crypto):
         }
         coin_id = crypto_map.get(crypto.lower(), crypto)
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                f"https://api.coingecko.com/api/v3/simple/price?ids={coin_id}&vs_currencies=eur"
-            ) as response:
-                data = await response.json()
-                if coin_id in data and "eur" in data[coin_id]:
-                    price = data[coin_id]["eur"]
-                    logger.info(f"Price for {crypto}: {price} EUR")
-                    return price
-                else:
-                    logger.error(f"No price data for {coin_id}")
-                    return 1.0  # Fallback price
+        session = await http.session()
+        async with session.get(
+            f"https://api.coingecko.com/api/v3/simple/price?ids={coin_id}&vs_currencies=eur"
+        ) as response:
+            data = await response.json()
+            if coin_id in data and "eur" in data[coin_id]:
+                price = data[coin_id]["eur"]
+                logger.info(f"Price for {crypto}: {price} EUR")
+                return price
+            else:
+                logger.error(f"No price data for {coin_id}")
+                return 1.0  # Fallback price
     except Exception as e:
         logger.error(f"Error fetching price for {crypto}: {e}")
         return 1.0  # Fallback price
\ No newline at end of file
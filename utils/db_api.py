@@ -1,280 +1,227 @@
-import sqlite3
-import asyncio
-import uuid
-from datetime import datetime
-from contextlib import asynccontextmanager
+# utils/db_api.py
+# Точка входа для хендлеров: функции ниже делегируют выбранному хранилищу
+# (config.DB_BACKEND: "sqlite" — utils/sqlite_repository.py, "memory" — utils/repository.py)
 from typing import Optional
 
-DB_PATH = 'shop.db'
+from config import (
+    DB_BACKEND, DB_PATH,
+    DB_QUEUE_LIMIT, DB_QUEUE_TIMEOUT, DB_PRAGMAS, DB_READERS,
+    DB_BATCH_MAX_OPS, DB_BATCH_MAX_DELAY_MS,
+    USER_CACHE_SIZE, USER_CACHE_TTL,
+)
+from utils.cache import TTLCache, MISSING
+from utils.repository import Repository, MemoryRepository
+from utils.sqlite_repository import SQLiteRepository
+
+
+def create_repository(backend: str = DB_BACKEND) -> Repository:
+    if backend == "memory":
+        return MemoryRepository()
+    if backend == "sqlite":
+        return SQLiteRepository(
+            DB_PATH,
+            max_pending=DB_QUEUE_LIMIT,
+            acquire_timeout=DB_QUEUE_TIMEOUT,
+            pragmas=DB_PRAGMAS,
+            readers=DB_READERS,
+            batch_max_ops=DB_BATCH_MAX_OPS,
+            batch_max_delay=DB_BATCH_MAX_DELAY_MS / 1000,
+        )
+    raise ValueError(f"Unknown DB_BACKEND: {backend!r}")
+
+
+# Одно хранилище на процесс
+repo: Repository = create_repository()
 
 
-@asynccontextmanager
-async def db_transaction():
+async def apply_db_profile() -> dict:
     """
-    Асинхронный контекстный менеджер для транзакций SQLite.
-    Разрешает использование соединения в разных потоках.
+    Готовит хранилище при старте: для SQLite включает профиль PRAGMA из
+    config.DB_PRAGMAS (WAL, synchronous, кэш, mmap, ...). Возвращает действующие значения.
     """
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-    conn.execute('BEGIN TRANSACTION')
-    try:
-        yield conn
-        conn.commit()
-    except Exception as e:
-        conn.rollback()
-        raise e
-    finally:
-        conn.close()
+    return await repo.open()
 
 
-# ============== МИГРАЦИЯ КОЛОНКИ ЯЗЫКА ==============
-
-async def ensure_language_column():
+async def migrate_db():
     """
-    Мягкая миграция: добавляет колонку language в таблицу users, если её нет.
+    Доводит схему до последней версии (utils/migrations.py).
     Вызывать один раз при старте бота (on_startup).
     """
-    loop = asyncio.get_event_loop()
-
-    def sync_migrate():
-        conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-        cur = conn.cursor()
-        # Убедимся, что таблица есть (на случай чистой БД)
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                user_id INTEGER PRIMARY KEY,
-                balance REAL DEFAULT 0.0,
-                registration_date TEXT,
-                username TEXT
-            )
-        """)
-        # Проверим наличие колонки language
-        cur.execute("PRAGMA table_info(users)")
-        cols = [r[1] for r in cur.fetchall()]
-        if "language" not in cols:
-            cur.execute("ALTER TABLE users ADD COLUMN language TEXT DEFAULT 'ru'")
-            conn.commit()
-        conn.close()
-
-    await loop.run_in_executor(None, sync_migrate)
+    return await repo.migrate()
+
+
+async def close_db():
+    """
+    Дожидается выполнения всех поставленных в очередь запросов и закрывает хранилище.
+    Вызывать при остановке бота.
+    """
+    await repo.close()
+
+
+async def flush_writes():
+    """Дожидается фиксации всех уже отправленных записей (в т.ч. отложенных в пачку)."""
+    await repo.flush()
+
+
+def db_stats() -> dict:
+    """Глубина очереди, размер пачек group commit и время COMMIT (для логов/диагностики)."""
+    return repo.stats()
+
+
+# ============== КЭШ ПОЛЬЗОВАТЕЛЕЙ ==============
+# Read-through: запись пользователя (или None — «такого нет») читается из хранилища
+# один раз на USER_CACHE_TTL секунд, повторные проверки/язык/баланс в рамках апдейта — из памяти.
+# Все записи ниже сами обновляют или сбрасывают свою запись в кэше.
+
+_user_cache = TTLCache(USER_CACHE_SIZE, USER_CACHE_TTL)
+# счётчик записей: чтение, начатое до записи, не кладёт в кэш устаревший результат
+_user_writes = 0
+
+
+async def _load_user(user_id: int, fresh: bool = False) -> Optional[dict]:
+    if not fresh:
+        user = _user_cache.get(user_id)
+        if user is not MISSING:
+            return user
+    seen = _user_writes
+    user = await repo.get_user(user_id)
+    if seen == _user_writes:
+        _user_cache.set(user_id, user)
+    return user
+
+
+def _invalidate_user(user_id: int):
+    global _user_writes
+    _user_writes += 1
+    _user_cache.pop(user_id)
+
+
+def _patch_cached_user(user_id: int, **fields):
+    """Обновляет поля закэшированной записи; если записи нет — просто сбрасывает ключ."""
+    global _user_writes
+    _user_writes += 1
+    user = _user_cache.peek(user_id)
+    if user:
+        _user_cache.set(user_id, {**user, **fields})
+    else:
+        _user_cache.pop(user_id)
+
+
+def cache_stats() -> dict:
+    """Попадания/промахи кэша пользователей (для логов/диагностики)."""
+    return _user_cache.stats()
 
 
 # ============== USERS ==============
 
-async def get_user_info(user_id: int):
-    loop = asyncio.get_event_loop()
-
-    def sync_get():
-        conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT balance, registration_date, username
-            FROM users
-            WHERE user_id = ?
-        """, (user_id,))
-        row = cursor.fetchone()
-        conn.close()
-        if row:
-            balance = 0.0 if row[0] is None else row[0]
-            return {
-                "user_id": user_id,
-                "balance": balance,
-                "registration_date": row[1] if row[1] else "N/A",
-                "username": row[2] if row[2] else "N/A"
-            }
-        # Если вдруг нет записи — вернём заглушку
-        return {"user_id": user_id, "balance": 0.0, "registration_date": "N/A", "username": "N/A"}
-
-    return await loop.run_in_executor(None, sync_get)
+async def get_user(user_id: int, fresh: bool = False) -> Optional[dict]:
+    """
+    Запись пользователя одним запросом (через кэш): {"user_id", "balance",
+    "registration_date", "username", "language"} или None, если не зарегистрирован.
+    """
+    return await _load_user(user_id, fresh)
 
 
-async def get_user_language(user_id: int) -> Optional[str]:
+async def get_user_info(user_id: int, fresh: bool = False):
     """
-    Возвращает язык пользователя ('ru'/'en'/'de'/'pl') или None, если записи нет.
+    Профиль пользователя для хендлеров. fresh=True — читать из хранилища мимо кэша
+    (для путей, где важен баланс «прямо сейчас»).
     """
-    loop = asyncio.get_event_loop()
+    user = await _load_user(user_id, fresh)
+    if user:
+        return {
+            "user_id": user_id,
+            "balance": user["balance"],
+            "registration_date": user["registration_date"] or "N/A",
+            "username": user["username"] or "N/A"
+        }
+    # Если вдруг нет записи — вернём заглушку
+    return {"user_id": user_id, "balance": 0.0, "registration_date": "N/A", "username": "N/A"}
 
-    def sync_get():
-        conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-        cur = conn.cursor()
-        # Если колонки ещё нет (бот впервые запустился без миграции) — вернём None
-        try:
-            cur.execute("SELECT language FROM users WHERE user_id = ?", (user_id,))
-            row = cur.fetchone()
-            conn.close()
-            return row[0] if row else None
-        except sqlite3.OperationalError:
-            # Колонка language отсутствует
-            conn.close()
-            return None
 
-    return await loop.run_in_executor(None, sync_get)
+async def get_user_language(user_id: int) -> Optional[str]:
+    """
+    Возвращает язык пользователя ('ru'/'en'/'de'/'pl') или None, если записи нет.
+    """
+    user = await _load_user(user_id)
+    return user["language"] if user else None
 
 
 async def set_user_language(user_id: int, lang: str):
     """
     Устанавливает язык пользователю. Если пользователя ещё нет — создаёт запись.
     """
-    loop = asyncio.get_event_loop()
-
-    def sync_set():
-        conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-        cur = conn.cursor()
-        # Попробуем обновить существующую запись
-        try:
-            cur.execute("UPDATE users SET language = ? WHERE user_id = ?", (lang, user_id))
-        except sqlite3.OperationalError:
-            # Если колонки ещё нет (на всякий случай) — создадим её
-            cur.execute("PRAGMA table_info(users)")
-            cols = [r[1] for r in cur.fetchall()]
-            if "language" not in cols:
-                cur.execute("ALTER TABLE users ADD COLUMN language TEXT DEFAULT 'ru'")
-            cur.execute("UPDATE users SET language = ? WHERE user_id = ?", (lang, user_id))
-
-        if cur.rowcount == 0:
-            # пользователя ещё нет — создадим
-            cur.execute("""
-                INSERT OR IGNORE INTO users (user_id, balance, registration_date, username, language)
-                VALUES (?, ?, ?, ?, ?)
-            """, (user_id, 0.0, datetime.now().isoformat(), None, lang))
-        conn.commit()
-        conn.close()
-
-    await loop.run_in_executor(None, sync_set)
-
-
-async def update_balance(user_id: int, amount: float, conn=None):
-    loop = asyncio.get_event_loop()
-
-    def sync_update(conn_):
-        cursor = conn_.cursor()
-        # COALESCE на случай, если баланс ранее оказался NULL
-        cursor.execute(
-            "UPDATE users SET balance = COALESCE(balance, 0) + ? WHERE user_id = ?",
-            (amount, user_id)
-        )
+    await repo.set_user_language(user_id, lang)
+    _patch_cached_user(user_id, language=lang)
 
-    if conn:
-        await loop.run_in_executor(None, sync_update, conn)
-    else:
-        async with db_transaction() as conn2:
-            await loop.run_in_executor(None, sync_update, conn2)
 
-
-async def create_db():
-    """
-    Базовая инициализация таблиц (без language — миграция добавит колонку отдельно,
-    чтобы не ломать уже существующие БД).
-    """
-    loop = asyncio.get_event_loop()
-
-    def sync_create():
-        conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-        cursor = conn.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                user_id INTEGER PRIMARY KEY,
-                balance REAL DEFAULT 0.0,
-                registration_date TEXT,
-                username TEXT
-            )
-        """)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS payment_requests (
-                payment_id TEXT PRIMARY KEY,
-                user_id INTEGER,
-                method TEXT,
-                amount REAL,
-                crypto TEXT,
-                crypto_amount REAL,
-                network TEXT,
-                status TEXT DEFAULT 'pending',
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        conn.commit()
-        conn.close()
-
-    await loop.run_in_executor(None, sync_create)
+async def set_username(user_id: int, username: Optional[str]) -> bool:
+    """Новый username из Telegram (пользователь сменил/убрал его). Незарегистрированных не создаёт."""
+    updated = await repo.set_username(user_id, username)
+    if updated:
+        _patch_cached_user(user_id, username=username)
+    return updated
 
 
 async def register_user(user_id: int, username: str = None, language: Optional[str] = None):
     """
-    Регистрирует пользователя при отсутствии записи.
+    Регистрирует пользователя при отсутствии записи (существующую не трогает).
     Параметр language опциональный, чтобы не ломать существующие вызовы.
-    Если колонка language есть — проставим значение; если нет — просто создадим запись.
     """
-    loop = asyncio.get_event_loop()
+    await repo.register_user(user_id, username, language)
+    # существующую запись регистрация не меняет — сбрасываем только «пользователя нет»
+    if not _user_cache.peek(user_id, None):
+        _invalidate_user(user_id)
+
 
-    def sync_register():
-        conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-        cursor = conn.cursor()
+async def user_exists(user_id: int) -> bool:
+    return await _load_user(user_id) is not None
 
-        # Проверим, есть ли уже пользователь
-        cursor.execute("SELECT 1 FROM users WHERE user_id = ?", (user_id,))
-        exists = cursor.fetchone() is not None
 
-        if not exists:
-            # Пытаемся вставить с language, если колонка есть
-            has_language = False
-            try:
-                cursor.execute("PRAGMA table_info(users)")
-                cols = [r[1] for r in cursor.fetchall()]
-                has_language = "language" in cols
-            except Exception:
-                has_language = False
+# ============== БАЛАНС ==============
 
-            if has_language:
-                cursor.execute("""
-                    INSERT OR IGNORE INTO users (user_id, balance, registration_date, username, language)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (user_id, 0.0, datetime.now().isoformat(), username, language or 'ru'))
-            else:
-                cursor.execute("""
-                    INSERT OR IGNORE INTO users (user_id, balance, registration_date, username)
-                    VALUES (?, ?, ?, ?)
-                """, (user_id, 0.0, datetime.now().isoformat(), username))
+async def update_balance(user_id: int, amount: float, kind: str = "adjustment", ref: Optional[str] = None):
+    await repo.update_balance(user_id, amount, kind, ref)
+    _invalidate_user(user_id)
 
-            conn.commit()
 
-        conn.close()
+async def get_balance_history(user_id: int, limit: int = 20) -> list:
+    """Последние проводки пользователя (новые первыми), суммы в EUR."""
+    return await repo.get_balance_history(user_id, limit)
 
-    await loop.run_in_executor(None, sync_register)
 
+async def rebuild_balances(dry_run: bool = False):
+    """
+    Пересчитывает снимки балансов из журнала проводок.
+    Возвращает (пользователей_всего, снимков_расходилось).
+    """
+    result = await repo.rebuild_balances(dry_run)
+    if not dry_run:
+        _user_cache.clear()
+    return result
 
-async def user_exists(user_id: int) -> bool:
-    loop = asyncio.get_event_loop()
 
-    def sync_check():
-        conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-        cursor = conn.cursor()
-        cursor.execute("SELECT 1 FROM users WHERE user_id = ?", (user_id,))
-        res = cursor.fetchone()
-        conn.close()
-        return res is not None
+# ============== ORDERS ==============
 
-    return await loop.run_in_executor(None, sync_check)
+async def purchase(user_id: int, product_id: str, quantity: int, total: float):
+    """
+    Атомарная покупка: проверка баланса и списание — один условный UPDATE,
+    запись заказа — в той же транзакции. Два одновременных подтверждения
+    не смогут увести баланс в минус.
+    Возвращает (ok, balance, order_id): при успехе balance — новый баланс,
+    при нехватке средств ok=False, balance — текущий баланс, order_id=None.
+    """
+    ok, balance, order_id = await repo.purchase(user_id, product_id, quantity, total)
+    # в обоих исходах balance — актуальное значение из той же транзакции
+    _patch_cached_user(user_id, balance=balance)
+    return ok, balance, order_id
 
 
 # ============== PAYMENTS ==============
 
 async def record_payment_request(user_id: int, method: str, amount: float,
                                  crypto: str = None, crypto_amount: float = None, network: str = None) -> str:
-    loop = asyncio.get_event_loop()
-
-    def sync_record():
-        conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-        cursor = conn.cursor()
-        payment_id = str(uuid.uuid4())
-        cursor.execute("""
-            INSERT INTO payment_requests
-                (payment_id, user_id, method, amount, crypto, crypto_amount, network, status)
-            VALUES (?, ?, ?, ?, ?, ?, ?, 'pending')
-        """, (payment_id, user_id, method, amount, crypto, crypto_amount, network))
-        conn.commit()
-        conn.close()
-        return payment_id
-
-    return await loop.run_in_executor(None, sync_record)
+    return await repo.record_payment_request(user_id, method, amount, crypto, crypto_amount, network)
 
 
 async def confirm_payment(payment_id: str):
@@ -282,50 +229,79 @@ async def confirm_payment(payment_id: str):
     Подтверждаем платёж и ВОЗВРАЩАЕМ (user_id, amount, new_balance).
     new_balance берём в той же транзакции — без гонок и кэша.
     """
-    loop = asyncio.get_event_loop()
-
-    async with db_transaction() as conn:
-        def sync_confirm(conn_):
-            cursor = conn_.cursor()
-            cursor.execute("""
-                SELECT user_id, amount
-                FROM payment_requests
-                WHERE payment_id = ? AND status = 'pending'
-            """, (payment_id,))
-            payment = cursor.fetchone()
-            if not payment:
-                return None, None, None
-
-            user_id, amount = payment
-
-            cursor.execute("UPDATE payment_requests SET status = 'confirmed' WHERE payment_id = ?", (payment_id,))
-            cursor.execute(
-                "UPDATE users SET balance = COALESCE(balance, 0) + ? WHERE user_id = ?",
-                (amount, user_id)
-            )
-            # Сразу читаем новый баланс из этой же транзакции
-            cursor.execute("SELECT COALESCE(balance, 0) FROM users WHERE user_id = ?", (user_id,))
-            row = cursor.fetchone()
-            new_balance = row[0] if row else None
-            return user_id, amount, new_balance
-
-        return await loop.run_in_executor(None, sync_confirm, conn)
+    user_id, amount, new_balance = await repo.confirm_payment(payment_id)
+    if user_id is not None:
+        if new_balance is None:
+            _invalidate_user(user_id)
+        else:
+            _patch_cached_user(user_id, balance=new_balance)
+    return user_id, amount, new_balance
 
 
 async def reject_payment(payment_id: str) -> bool:
-    loop = asyncio.get_event_loop()
-
-    async with db_transaction() as conn:
-        def sync_reject(conn_):
-            cursor = conn_.cursor()
-            cursor.execute("""
-                SELECT 1
-                FROM payment_requests
-                WHERE payment_id = ? AND status = 'pending'
-            """, (payment_id,))
-            if cursor.fetchone():
-                cursor.execute("UPDATE payment_requests SET status = 'rejected' WHERE payment_id = ?", (payment_id,))
-                return True
-            return False
-
-        return await loop.run_in_executor(None, sync_reject, conn)
+    return await repo.reject_payment(payment_id)
+
+
+async def get_pending_payments(limit: int = 50, older_than: Optional[str] = None) -> list:
+    """
+    Ожидающие платежи, самые старые первыми (очередь админа / чистка просроченных).
+    older_than — верхняя граница created_at ('YYYY-MM-DD HH:MM:SS'), по умолчанию — все.
+    """
+    return await repo.get_pending_payments(limit, older_than)
+
+
+async def get_user_payments(user_id: int, limit: int = 20) -> list:
+    """Последние заявки на оплату пользователя, новые первыми."""
+    return await repo.get_user_payments(user_id, limit)
+
+
+# ============== MEDIA ==============
+
+async def get_media_file_id(path: str, content_hash: str) -> Optional[str]:
+    """file_id уже загруженной в Telegram картинки с этим содержимым или None (utils/media.py)."""
+    return await repo.get_media_file_id(path, content_hash)
+
+
+async def set_media_file_id(path: str, content_hash: str, file_id: str):
+    await repo.set_media_file_id(path, content_hash, file_id)
+
+
+async def forget_media_file_id(path: str):
+    await repo.forget_media_file_id(path)
+
+
+# ============== BROADCASTS ==============
+
+async def set_user_blocked(user_id: int, blocked: bool = True) -> bool:
+    """Пользователь заблокировал (blocked=False — разблокировал) бота; рассылки его пропускают."""
+    return await repo.set_user_blocked(user_id, blocked)
+
+
+async def count_broadcast_recipients() -> int:
+    return await repo.count_broadcast_recipients()
+
+
+async def get_broadcast_recipients(after_user_id: int, limit: int) -> list:
+    """
+    Порция получателей рассылки: user_id > after_user_id по возрастанию.
+    Курсор — последний обработанный user_id, все получатели в память не грузятся.
+    """
+    return await repo.get_broadcast_recipients(after_user_id, limit)
+
+
+async def create_broadcast(admin_id: int, text: str, total: int) -> str:
+    return await repo.create_broadcast(admin_id, text, total)
+
+
+async def get_broadcast(broadcast_id: str) -> Optional[dict]:
+    return await repo.get_broadcast(broadcast_id)
+
+
+async def get_running_broadcasts() -> list:
+    """Незавершённые рассылки — продолжаются после перезапуска (utils/broadcast.py)."""
+    return await repo.get_running_broadcasts()
+
+
+async def save_broadcast_progress(broadcast_id: str, last_user_id: int, sent: int, failed: int,
+                                  blocked: int, status: Optional[str] = None):
+    await repo.save_broadcast_progress(broadcast_id, last_user_id, sent, failed, blocked, status)
@@ -0,0 +1,393 @@
+# utils/db_engine.py
+# Движок SQLite: одно долгоживущее соединение на выделенном потоке
+import asyncio
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+# виды задач
+_READ = "read"      # без явной транзакции
+_TX = "tx"          # своя транзакция BEGIN IMMEDIATE ... COMMIT
+_BATCH = "batch"    # может разделить один COMMIT с соседними задачами (group commit)
+
+# Допустимые значения «текстовых» PRAGMA (в PRAGMA нельзя передать параметр через ?)
+_PRAGMA_CHOICES = {
+    "journal_mode": {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"},
+    "synchronous": {"OFF", "NORMAL", "FULL", "EXTRA", "0", "1", "2", "3"},
+    "temp_store": {"DEFAULT", "FILE", "MEMORY", "0", "1", "2"},
+}
+_PRAGMA_INTS = {"cache_size", "mmap_size", "busy_timeout"}
+
+# journal_mode хранится в самом файле БД — ставится один раз при старте,
+# остальные действуют на соединение и применяются к каждому новому соединению
+_CONNECTION_PRAGMAS = ("synchronous", "cache_size", "mmap_size", "busy_timeout", "temp_store")
+
+
+def _pragma_value(name: str, value) -> str:
+    if name in _PRAGMA_INTS:
+        return str(int(value))
+    v = str(value).strip().upper()
+    if v not in _PRAGMA_CHOICES.get(name, ()):
+        raise ValueError(f"Invalid value for PRAGMA {name}: {value!r}")
+    return v
+
+
+class DBEngineBusy(RuntimeError):
+    """Очередь к БД переполнена и место не освободилось за отведённое время."""
+
+
+class DBEngine:
+    """
+    Владеет одним соединением sqlite3, которое живёт на собственном потоке.
+    Асинхронный код отдаёт в движок «единицы работы» — синхронные функции вида
+    fn(conn, *args) — и ждёт результат через future, не блокируя event loop.
+
+    transaction(fn) выполняет fn целиком внутри BEGIN IMMEDIATE ... COMMIT
+    (ROLLBACK при исключении), read(fn) — без явной транзакции.
+
+    После apply_profile() с journal_mode=WAL чтения уходят на пул читающих
+    соединений (readers потоков) и больше не ждут писателя.
+
+    Group commit (batch_max_ops > 1): задачи, отправленные через batched(fn),
+    писатель собирает в одну транзакцию — всё, что уже стоит в очереди, плюс
+    то, что успеет прийти за batch_max_delay секунд, но не больше batch_max_ops.
+    Каждая задача выполняется в своём SAVEPOINT (ошибка одной не откатывает
+    остальные), а future вызывающих разрешаются только после общего COMMIT.
+
+    Backpressure: одновременно в движке может быть не больше max_pending задач,
+    остальные вызывающие ждут свободного слота (или получают DBEngineBusy,
+    если задан acquire_timeout).
+    """
+
+    def __init__(self, path: str, max_pending: int = 1000, acquire_timeout: Optional[float] = None,
+                 pragmas: Optional[Dict[str, Any]] = None, readers: int = 0,
+                 batch_max_ops: int = 1, batch_max_delay: float = 0.0):
+        self.path = path
+        self.max_pending = max_pending
+        self.acquire_timeout = acquire_timeout
+        self.pragmas = dict(pragmas or {})
+        self.readers = readers
+        self.batch_max_ops = max(1, batch_max_ops)
+        self.batch_max_delay = max(0.0, batch_max_delay)
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._read_queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._reader_threads: List[threading.Thread] = []
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop = None
+        self._in_flight = 0
+
+        # счётчики
+        self.jobs_done = 0
+        self.jobs_failed = 0
+        self.max_depth_seen = 0
+        self.total_wait = 0.0
+        self.total_exec = 0.0
+        # счётчики group commit
+        self.batches = 0
+        self.batched_ops = 0
+        self.max_batch_size = 0
+        self.last_batch_size = 0
+        self.commit_time_total = 0.0
+        self.commit_time_max = 0.0
+
+    # ---------- жизненный цикл ----------
+
+    def _connect(self, readonly: bool = False) -> sqlite3.Connection:
+        # isolation_level=None — транзакциями управляем сами (BEGIN/COMMIT)
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        for name in _CONNECTION_PRAGMAS:
+            if self.pragmas.get(name) is not None:
+                conn.execute(f"PRAGMA {name} = {_pragma_value(name, self.pragmas[name])}")
+        if readonly:
+            conn.execute("PRAGMA query_only = 1")
+        return conn
+
+    def start(self):
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, args=(self._queue, False),
+                                            name="db-writer", daemon=True)
+            self._thread.start()
+
+    def _start_readers(self):
+        with self._start_lock:
+            if self._reader_threads:
+                return
+            for i in range(self.readers):
+                t = threading.Thread(target=self._run, args=(self._read_queue, True),
+                                     name=f"db-reader-{i}", daemon=True)
+                t.start()
+                self._reader_threads.append(t)
+
+    async def apply_profile(self) -> Dict[str, Any]:
+        """
+        Применяет профиль PRAGMA (journal_mode пишется в файл БД) и, если включён WAL,
+        поднимает читающие соединения. Возвращает фактически действующие настройки.
+        """
+        mode = self.pragmas.get("journal_mode")
+
+        def sync_apply(conn):
+            if mode:
+                conn.execute(f"PRAGMA journal_mode = {_pragma_value('journal_mode', mode)}").fetchone()
+            return self._read_pragmas(conn)
+
+        active = await self._submit(sync_apply, (), _READ, self._queue)
+        if self.readers > 0 and str(active.get("journal_mode", "")).lower() == "wal":
+            self._start_readers()
+        elif self.readers > 0:
+            logger.warning(f"journal_mode={active.get('journal_mode')}: reader connections disabled")
+        return active
+
+    async def active_pragmas(self) -> Dict[str, Any]:
+        """Текущие значения PRAGMA на соединении писателя."""
+        return await self._submit(self._read_pragmas, (), _READ, self._queue)
+
+    @staticmethod
+    def _read_pragmas(conn: sqlite3.Connection) -> Dict[str, Any]:
+        result = {}
+        for name in ("journal_mode",) + _CONNECTION_PRAGMAS:
+            row = conn.execute(f"PRAGMA {name}").fetchone()
+            result[name] = row[0] if row else None
+        return result
+
+    async def close(self):
+        """
+        Дожидается выполнения всех уже поставленных задач и закрывает соединения.
+        """
+        loop = asyncio.get_running_loop()
+        readers, self._reader_threads = self._reader_threads, []
+        for _ in readers:
+            self._read_queue.put(_STOP)
+        for t in readers:
+            await loop.run_in_executor(None, t.join)
+        if not self._thread or not self._thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        await loop.run_in_executor(None, self._thread.join)
+        self._thread = None
+
+    # ---------- API для async-кода ----------
+
+    async def transaction(self, fn: Callable[..., Any], *args) -> Any:
+        return await self._submit(fn, args, _TX, self._queue)
+
+    async def batched(self, fn: Callable[..., Any], *args) -> Any:
+        """
+        Запись, которая может разделить COMMIT с другими (если group commit включён).
+        Результат возвращается только после того, как общая транзакция зафиксирована.
+        """
+        kind = _BATCH if self.batch_max_ops > 1 else _TX
+        return await self._submit(fn, args, kind, self._queue)
+
+    async def read(self, fn: Callable[..., Any], *args) -> Any:
+        q = self._read_queue if self._reader_threads else self._queue
+        return await self._submit(fn, args, _READ, q)
+
+    async def flush(self):
+        """
+        Дожидается фиксации всех записей, поставленных в очередь до вызова
+        (очередь писателя FIFO, поэтому достаточно пустой транзакции в её конце).
+        """
+        await self._submit(lambda conn: None, (), _TX, self._queue)
+
+    @property
+    def queue_depth(self) -> int:
+        """Сколько задач ждут своей очереди на потоках БД."""
+        return self._queue.qsize() + self._read_queue.qsize()
+
+    @property
+    def in_flight(self) -> int:
+        """Сколько задач принято движком и ещё не завершено."""
+        return self._in_flight
+
+    @property
+    def saturated(self) -> bool:
+        return self._in_flight >= self.max_pending
+
+    def stats(self) -> dict:
+        done = self.jobs_done + self.jobs_failed
+        return {
+            "queue_depth": self.queue_depth,
+            "write_queue_depth": self._queue.qsize(),
+            "read_queue_depth": self._read_queue.qsize(),
+            "readers": len(self._reader_threads),
+            "in_flight": self._in_flight,
+            "max_pending": self.max_pending,
+            "max_depth_seen": self.max_depth_seen,
+            "jobs_done": self.jobs_done,
+            "jobs_failed": self.jobs_failed,
+            "avg_wait_ms": round(self.total_wait / done * 1000, 3) if done else 0.0,
+            "avg_exec_ms": round(self.total_exec / done * 1000, 3) if done else 0.0,
+            "batches": self.batches,
+            "batched_ops": self.batched_ops,
+            "avg_batch_size": round(self.batched_ops / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "last_batch_size": self.last_batch_size,
+            "avg_commit_ms": round(self.commit_time_total / self.batches * 1000, 3) if self.batches else 0.0,
+            "max_commit_ms": round(self.commit_time_max * 1000, 3),
+        }
+
+    # ---------- внутреннее ----------
+
+    def _get_slots(self, loop) -> asyncio.Semaphore:
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_pending)
+            self._slots_loop = loop
+        return self._slots
+
+    async def _submit(self, fn, args, kind: str, q: "queue.Queue"):
+        if not self._thread or not self._thread.is_alive():
+            self.start()
+
+        loop = asyncio.get_running_loop()
+        slots = self._get_slots(loop)
+        if self.acquire_timeout is None:
+            await slots.acquire()
+        else:
+            try:
+                await asyncio.wait_for(slots.acquire(), self.acquire_timeout)
+            except asyncio.TimeoutError:
+                raise DBEngineBusy(f"DB queue is full ({self._in_flight} jobs in flight)")
+
+        self._in_flight += 1
+        future = loop.create_future()
+        q.put((fn, args, kind, loop, future, slots, time.perf_counter()))
+        depth = q.qsize()
+        if depth > self.max_depth_seen:
+            self.max_depth_seen = depth
+        return await future
+
+    def _finish(self, slots: asyncio.Semaphore, future: asyncio.Future, result, error):
+        # выполняется в event loop
+        self._in_flight -= 1
+        slots.release()
+        if future.cancelled():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def _complete(self, job, started: float, result, error):
+        fn, args, kind, loop, future, slots, enqueued_at = job
+        finished = time.perf_counter()
+        with self._stats_lock:
+            self.total_wait += started - enqueued_at
+            self.total_exec += finished - started
+            if error is None:
+                self.jobs_done += 1
+            else:
+                self.jobs_failed += 1
+        try:
+            loop.call_soon_threadsafe(self._finish, slots, future, result, error)
+        except RuntimeError:
+            # event loop уже закрыт — результат отдавать некому
+            pass
+
+    def _execute(self, conn: sqlite3.Connection, job):
+        fn, args, kind = job[0], job[1], job[2]
+        started = time.perf_counter()
+        result, error = None, None
+        try:
+            if kind == _READ:
+                result = fn(conn, *args)
+            else:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    result = fn(conn, *args)
+                    conn.execute("COMMIT")
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+        except Exception as e:
+            error = e
+        self._complete(job, started, result, error)
+
+    def _collect_batch(self, q: "queue.Queue", first):
+        """
+        Собирает пачку batch-задач: сначала всё, что уже в очереди, затем ждёт
+        остаток batch_max_delay. Возвращает (пачка, следующая_не_batch_задача|None).
+        """
+        batch = [first]
+        deadline = time.perf_counter() + self.batch_max_delay
+        while len(batch) < self.batch_max_ops:
+            try:
+                job = q.get_nowait()
+            except queue.Empty:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    job = q.get(timeout=timeout)
+                except queue.Empty:
+                    break
+            if job is _STOP or job[2] != _BATCH:
+                return batch, job
+            batch.append(job)
+        return batch, None
+
+    def _execute_batch(self, conn: sqlite3.Connection, batch):
+        started = time.perf_counter()
+        outcomes = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for job in batch:
+                fn, args = job[0], job[1]
+                conn.execute("SAVEPOINT batch_op")
+                try:
+                    outcomes.append((fn(conn, *args), None))
+                    conn.execute("RELEASE batch_op")
+                except Exception as e:
+                    conn.execute("ROLLBACK TO batch_op")
+                    conn.execute("RELEASE batch_op")
+                    outcomes.append((None, e))
+            commit_started = time.perf_counter()
+            conn.execute("COMMIT")
+            commit_time = time.perf_counter() - commit_started
+        except Exception as e:
+            # общий COMMIT не прошёл — ошибка у всех участников пачки
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            outcomes = [(None, e)] * len(batch)
+            commit_time = 0.0
+
+        with self._stats_lock:
+            self.batches += 1
+            self.batched_ops += len(batch)
+            self.last_batch_size = len(batch)
+            self.max_batch_size = max(self.max_batch_size, len(batch))
+            self.commit_time_total += commit_time
+            self.commit_time_max = max(self.commit_time_max, commit_time)
+        for job, (result, error) in zip(batch, outcomes):
+            self._complete(job, started, result, error)
+
+    def _run(self, q: "queue.Queue", readonly: bool):
+        conn = self._connect(readonly)
+        logger.info(f"DB {'reader' if readonly else 'writer'} connection opened on {self.path}")
+        try:
+            job = None
+            while True:
+                if job is None:
+                    job = q.get()
+                if job is _STOP:
+                    break
+                if job[2] == _BATCH:
+                    batch, job = self._collect_batch(q, job)
+                    self._execute_batch(conn, batch)
+                    continue
+                self._execute(conn, job)
+                job = None
+        finally:
+            conn.close()
@@ -0,0 +1,54 @@
+# utils/db_tools.py
+# Служебные команды для БД. Запуск из корня проекта:
+#   python -m utils.db_tools pragmas   — применить профиль и показать действующие PRAGMA
+#   python -m utils.db_tools migrate   — применить недостающие миграции схемы
+#   python -m utils.db_tools rebuild-balances [--dry-run] — пересчитать балансы из журнала
+import argparse
+import asyncio
+
+from utils import db_api
+
+
+async def _pragmas():
+    active = await db_api.apply_db_profile()
+    print(f"DB: {db_api.DB_PATH}")
+    for name, value in active.items():
+        print(f"  {name:<13} = {value}")
+    await db_api.close_db()
+
+
+async def _migrate():
+    await db_api.apply_db_profile()
+    before, after = await db_api.migrate_db()
+    print(f"schema_version: {before} -> {after}")
+    await db_api.close_db()
+
+
+async def _rebuild_balances(dry_run: bool):
+    await db_api.apply_db_profile()
+    await db_api.migrate_db()
+    total, drift = await db_api.rebuild_balances(dry_run=dry_run)
+    action = "would fix" if dry_run else "fixed"
+    print(f"users: {total}, snapshots {action}: {drift}")
+    await db_api.close_db()
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m utils.db_tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("pragmas", help="применить профиль PRAGMA и вывести действующие значения")
+    sub.add_parser("migrate", help="применить недостающие миграции схемы")
+    rebuild = sub.add_parser("rebuild-balances", help="пересчитать users.balance_cents из balance_ledger")
+    rebuild.add_argument("--dry-run", action="store_true", help="только посчитать расхождения")
+
+    args = parser.parse_args()
+    if args.command == "pragmas":
+        asyncio.run(_pragmas())
+    elif args.command == "migrate":
+        asyncio.run(_migrate())
+    elif args.command == "rebuild-balances":
+        asyncio.run(_rebuild_balances(args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# utils/http.py
+# Один пул HTTP-соединений на процесс: и Bot API (сессия бота — SharedAiohttpSession в loader.py),
+# и внешние запросы (utils/crypto_api.py). Соединения держатся открытыми (keep-alive) и
+# переиспользуются — TCP+TLS рукопожатие только на первом запросе к хосту.
+# Пул создаётся при первом запросе, закрывается в app.py (on_shutdown → http.close()).
+import asyncio
+import logging
+import ssl
+from typing import Optional
+
+import certifi
+from aiohttp import ClientSession, ClientTimeout, TCPConnector, TraceConfig
+from aiogram.client.session.aiohttp import AiohttpSession
+
+from config import (
+    HTTP_POOL_LIMIT, HTTP_POOL_PER_HOST, HTTP_DNS_TTL, HTTP_KEEPALIVE,
+    HTTP_CONNECT_TIMEOUT, HTTP_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class HttpClient:
+    def __init__(self, limit: int = HTTP_POOL_LIMIT, limit_per_host: int = HTTP_POOL_PER_HOST,
+                 dns_ttl: int = HTTP_DNS_TTL, keepalive: float = HTTP_KEEPALIVE,
+                 connect_timeout: float = HTTP_CONNECT_TIMEOUT, timeout: float = HTTP_TIMEOUT):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_ttl = dns_ttl
+        self.keepalive = keepalive
+        self.timeout = ClientTimeout(total=timeout, connect=connect_timeout)
+        self._session: Optional[ClientSession] = None
+        self._lock = asyncio.Lock()
+        self.requests = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+
+    def _trace(self) -> TraceConfig:
+        trace = TraceConfig()
+
+        async def on_request(_session, _ctx, _params):
+            self.requests += 1
+
+        async def on_create(_session, _ctx, _params):
+            self.connections_created += 1
+
+        async def on_reuse(_session, _ctx, _params):
+            self.connections_reused += 1
+
+        trace.on_request_start.append(on_request)
+        trace.on_connection_create_end.append(on_create)
+        trace.on_connection_reuseconn.append(on_reuse)
+        return trace
+
+    async def session(self) -> ClientSession:
+        """Общая ClientSession (создаётся при первом обращении, после close() — заново)."""
+        if self._session is not None and not self._session.closed:
+            return self._session
+        async with self._lock:
+            if self._session is None or self._session.closed:
+                connector = TCPConnector(
+                    ssl=ssl.create_default_context(cafile=certifi.where()),
+                    limit=self.limit,
+                    limit_per_host=self.limit_per_host,
+                    ttl_dns_cache=self.dns_ttl,
+                    keepalive_timeout=self.keepalive,
+                )
+                self._session = ClientSession(
+                    connector=connector, timeout=self.timeout, trace_configs=[self._trace()],
+                )
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            # даём SSL-соединениям закрыться (см. graceful shutdown в документации aiohttp)
+            await asyncio.sleep(0.25)
+        self._session = None
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "connections_created": self.connections_created,
+            "connections_reused": self.connections_reused,
+        }
+
+
+http = HttpClient()
+
+
+class SharedAiohttpSession(AiohttpSession):
+    """Сессия бота поверх общего пула http: свои соединения не открывает и сама их не закрывает."""
+
+    def __init__(self, client: HttpClient = http, **kwargs):
+        super().__init__(**kwargs)
+        self._client = client
+
+    async def create_session(self) -> ClientSession:
+        return await self._client.session()
+
+    async def close(self):
+        # dp.start_polling / run_webhook закрывают сессию бота — пул закрывает только http.close()
+        pass
@@ -1,365 +1,390 @@
-from typing import Dict
+# utils/i18n.py
+# Переводы: locales/<язык>.json (или скомпилированный gettext <язык>.mo) рядом с кодом.
+# Язык загружается при первом обращении и компилируется в каталог: у каждого ключа —
+# целочисленный хэндл (K.<ключ>), у языка — плоский список строк по хэндлам с уже
+# подставленными фолбэками, шаблоны с {полями} заранее разобраны.
+# Фоновая задача watch_locales() перечитывает изменённые файлы без перезапуска.
+# Отчёт о пропущенных ключах: python -m utils.i18n
+import asyncio
+import gettext
+import json
+import logging
+import os
+from string import Formatter
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from config import LOCALES_DIR, I18N_RELOAD_INTERVAL
 from utils.db_api import get_user_language
 
-# словарь переводов
-T: Dict[str, Dict[str, str]] = {
-    "ru": {
-        "greet": "👋 Привет, {first}! Добро пожаловать в наш магазин.",
-        "menu_title": "📋 Главное меню:",
-        "btn_profile": "📁 Профиль",
-        "btn_products": "🛒 Товары",
-        "btn_topup": "💳 Пополнить баланс",
-        "btn_support": "📞 Поддержка",
-        "error_try_later": "❌ Ошибка. Попробуйте позже.",
-        "choose_language": "Выберите язык / Choose your language / Wähle eine Sprache / Wybierz język:",
-        "profile_title": "Профиль:",
-        "balance_label": "Баланс",
-        "registration_date_label": "Дата регистрации",
-        "username_label": "Имя пользователя",
-        "image_unavailable": "Изображение недоступно",
-        "profile_not_found": "❌ Ошибка: Информация не найдена. Пожалуйста, зарегистрируйтесь заново с /start.",
-        "btn_contact_support": "📧 Связаться с поддержкой",
-	"payment_rejected_plain": "❌ Ваш платёж был отклонён администратором.",
-
-        "btn_profile": "📁 Профиль",
-        "btn_products": "🛒 Товары",
-        "btn_topup": "💳 Пополнить баланс",
-        "btn_support": "📞 Поддержка",
-
-        # Support
-        "support_title": "Поддержка",
-        "support_description": "Нужна помощь? Свяжитесь с нашей командой поддержки или администрацией магазина.",
-
-        # admin.py client messages
-        "payment_confirmed": "✅ Ваша оплата подтверждена!",
-        "balance_topped_up": "Ваш баланс пополнен на <b>{amount} EUR</b>.",
-        "current_balance": "💳 Теперь на вашем счету: <b>{balance} EUR</b>.",
-        "payment_not_found": "❌ Платёж не найден или уже обработан.",
-        "error_check_payment": "❌ Ошибка. Проверьте данные оплаты.",
-        "payment_rejected": "❌ Ваша оплата (ID {payment_id}) была отклонена администратором.",
-        "payment_not_found_or_not_pending": "❌ Платёж не найден или не в состоянии 'pending'.",
-
-        # products.py
-        "product_1": "Товар 1",
-        "product_2": "Товар 2",
-        "product_3": "Товар 3",
-        "choose_product": "🛒 Выберите продукт:",
-        "product_not_found": "❌ Продукт не найден.",
-        "selected_product": "🛒 Вы выбрали",
-        "unit_price": "Цена за единицу",
-        "choose_quantity": "Выберите количество:",
-        "invalid_quantity": "Некорректное количество.",
-        "confirm": "✅ Подтвердить",
-        "cancel": "❌ Отмена",
-        "confirm_purchase": "✅ Подтвердите покупку:",
-        "product_label": "Товар",
-        "quantity_label": "Количество",
-        "total_label": "Итого к списанию",
-        "confirm_or_cancel": "Нажмите «Подтвердить» или «Отмена».",
-        "insufficient_funds": "❌ Недостаточно средств.",
-        "total_needed": "Нужно списать",
-        "your_balance": "На счету",
-        "missing_amount": "Не хватает",
-        "topup_hint": "Пополните баланс через 💳 Top-up Balance.",
-        "purchase_success": "✅ Покупка успешна!",
-        "debited_amount": "Списано",
-        "contact_curator": "Для дальнейших действий свяжитесь с куратором",
-        "purchase_cancelled": "❌ Покупка отменена.",
-
-        # topup.py
-        "topup_choose_method": "💰 Выберите способ оплаты:",
-        "prompt_enter_amount": "💰 Введите сумму в EUR для оплаты:",
-        "choose_crypto": "💸 Выберите криптовалюту:",
-        "choose_usdt_network": "🌐 Выберите сеть для USDT:",
-        "revolut_payment_title": "Оплата через Revolut",
-        "revolut_open": "🔗 Открыть Revolut",
-        "revolut_confirm_btn": "✅ Подтвердить оплату",
-        "revolut_instruction": "Перейдите по ссылке для оплаты. После оплаты нажмите «Подтвердить оплату».",
-        "payment_request_sent": "✅ Запрос на оплату отправлен.",
-        "wait_admin_confirm": "Ожидайте подтверждения администратором.",
-        "payment_confirmation": "Подтверждение оплаты",
-        "method_label": "Способ",
-        "amount_label": "Сумма",
-        "crypto_label": "Крипта",
-        "network_label": "Сеть",
-        "crypto_amount_label": "Количество крипты",
-        "address_label": "Адрес для отправки",
-        "enter_positive_amount": "❌ Сумма должна быть положительной. Введите заново.",
-        "enter_valid_number": "❌ Введите корректную сумму (число).",
-        "enter_amount_first": "Введите сумму сначала.",
-        "payment_cancelled": "❌ Оплата отменена.",
-        "invalid_action": "❌ Неверное действие. Вернитесь в главное меню."
-    },
-    "en": {
-        "greet": "👋 Hi, {first}! Welcome to our shop.",
-        "menu_title": "📋 Main menu:",
-        "btn_profile": "📁 Profile",
-        "btn_contact_support": "📧 Contact support",
-        "btn_products": "🛒 Products",
-        "btn_topup": "💳 Top-up Balance",
-        "btn_support": "📞 Support",
-        "error_try_later": "❌ Error. Please try again later.",
-        "choose_language": "Choose your language / Выберите язык / Wähle eine Sprache / Wybierz język:",
-        "profile_title": "Profile:",
-        "balance_label": "Balance",
-        "registration_date_label": "Registration Date",
-        "username_label": "Username",
-        "image_unavailable": "Image unavailable",
-        "profile_not_found": "❌ Error: Info not found. Please /start again.",
-	"payment_rejected_plain": "❌ Your payment was rejected by the administrator.",
-
-        # Support
-        "support_title": "Support",
-        "support_description": "Need help? Contact our support team or store administration.",
-
-        "btn_profile": "📁 Profile",
-        "btn_products": "🛒 Products",
-        "btn_topup": "💳 Top-up Balance",
-        "btn_support": "📞 Support",
-
-        # admin.py client messages
-        "payment_confirmed": "✅ Your payment has been confirmed!",
-        "balance_topped_up": "Your balance has been topped up by <b>{amount} EUR</b>.",
-        "current_balance": "💳 Your current balance is: <b>{balance} EUR</b>.",
-        "payment_not_found": "❌ Payment not found or already processed.",
-        "error_check_payment": "❌ Error. Please check your payment details.",
-        "payment_rejected": "❌ Your payment (ID {payment_id}) was rejected by the administrator.",
-        "payment_not_found_or_not_pending": "❌ Payment not found or not in 'pending' status.",
-
-        # products.py
-        "product_1": "Product 1",
-        "product_2": "Product 2",
-        "product_3": "Product 3",
-        "choose_product": "🛒 Choose a product:",
-        "product_not_found": "❌ Product not found.",
-        "selected_product": "🛒 You selected",
-        "unit_price": "Unit price",
-        "choose_quantity": "Choose quantity:",
-        "invalid_quantity": "Invalid quantity.",
-        "confirm": "✅ Confirm",
-        "cancel": "❌ Cancel",
-        "confirm_purchase": "✅ Confirm purchase:",
-        "product_label": "Product",
-        "quantity_label": "Quantity",
-        "total_label": "Total to be charged",
-        "confirm_or_cancel": "Click 'Confirm' or 'Cancel'.",
-        "insufficient_funds": "❌ Insufficient funds.",
-        "total_needed": "Total needed",
-        "your_balance": "Your balance",
-        "missing_amount": "Missing amount",
-        "topup_hint": "Please top up your balance via 💳 Top-up Balance.",
-        "purchase_success": "✅ Purchase successful!",
-        "debited_amount": "Debited",
-        "contact_curator": "Contact your curator",
-        "purchase_cancelled": "❌ Purchase cancelled.",
-
-        # topup.py
-        "topup_choose_method": "💰 Choose a payment method:",
-        "prompt_enter_amount": "💰 Enter the amount in EUR:",
-        "choose_crypto": "💸 Choose cryptocurrency:",
-        "choose_usdt_network": "🌐 Choose a network for USDT:",
-        "revolut_payment_title": "Revolut Payment",
-        "revolut_open": "🔗 Open Revolut",
-        "revolut_confirm_btn": "✅ Confirm payment",
-        "revolut_instruction": "Follow the link to pay. After payment, press “Confirm payment”.",
-        "payment_request_sent": "✅ Payment request has been sent.",
-        "wait_admin_confirm": "Please wait for administrator confirmation.",
-        "payment_confirmation": "Payment confirmation",
-        "method_label": "Method",
-        "amount_label": "Amount",
-        "crypto_label": "Crypto",
-        "network_label": "Network",
-        "crypto_amount_label": "Crypto amount",
-        "address_label": "Recipient address",
-        "enter_positive_amount": "❌ Amount must be positive. Please enter again.",
-        "enter_valid_number": "❌ Enter a valid number.",
-        "enter_amount_first": "Enter the amount first.",
-        "payment_cancelled": "❌ Payment cancelled.",
-        "invalid_action": "❌ Invalid action. Return to the main menu."
-    },
-    "de": {
-        "greet": "👋 Hallo, {first}! Willkommen in unserem Shop.",
-        "menu_title": "📋 Hauptmenü:",
-        "btn_profile": "📁 Profil",
-        "btn_products": "🛒 Produkte",
-        "btn_topup": "💳 Guthaben aufladen",
-        "btn_support": "📞 Support",
-        "error_try_later": "❌ Fehler. Bitte später erneut versuchen.",
-        "choose_language": "Wähle eine Sprache / Choose your language / Выберите язык / Wybierz język:",
-        "profile_title": "Profil:",
-        "balance_label": "Kontostand",
-        "registration_date_label": "Registrierungsdatum",
-        "username_label": "Benutzername",
-        "image_unavailable": "Bild nicht verfügbar",
-        "profile_not_found": "❌ Fehler: Keine Informationen gefunden. Bitte erneut mit /start registrieren.",
-        "btn_contact_support": "📧 Support kontaktieren",
-	"payment_rejected_plain": "❌ Ihre Zahlung wurde vom Administrator abgelehnt.",
-
-
-        "btn_profile": "📁 Profil",
-        "btn_products": "🛒 Produkte",
-        "btn_topup": "💳 Guthaben aufladen",
-        "btn_support": "📞 Support",
-
-
-        # Support
-        "support_title": "Support",
-        "support_description": "Brauchen Sie Hilfe? Kontaktieren Sie unser Support-Team oder die Shop-Administration.",
-
-        # admin.py client messages
-        "payment_confirmed": "✅ Ihre Zahlung wurde bestätigt!",
-        "balance_topped_up": "Ihr Guthaben wurde um <b>{amount} EUR</b> aufgeladen.",
-        "current_balance": "💳 Ihr aktueller Kontostand: <b>{balance} EUR</b>.",
-        "payment_not_found": "❌ Zahlung nicht gefunden oder bereits verarbeitet.",
-        "error_check_payment": "❌ Fehler. Bitte überprüfen Sie Ihre Zahlungsdaten.",
-        "payment_rejected": "❌ Ihre Zahlung (ID {payment_id}) wurde vom Administrator abgelehnt.",
-        "payment_not_found_or_not_pending": "❌ Zahlung nicht gefunden oder nicht im Status 'pending'.",
-
-        # products.py
-        "product_1": "Produkt 1",
-        "product_2": "Produkt 2",
-        "product_3": "Produkt 3",
-        "choose_product": "🛒 Wählen Sie ein Produkt:",
-        "product_not_found": "❌ Produkt nicht gefunden.",
-        "selected_product": "🛒 Sie haben ausgewählt",
-        "unit_price": "Stückpreis",
-        "choose_quantity": "Menge wählen:",
-        "invalid_quantity": "Ungültige Menge.",
-        "confirm": "✅ Bestätigen",
-        "cancel": "❌ Abbrechen",
-        "confirm_purchase": "✅ Kauf bestätigen:",
-        "product_label": "Produkt",
-        "quantity_label": "Menge",
-        "total_label": "Gesamtbetrag",
-        "confirm_or_cancel": "Klicken Sie auf 'Bestätigen' oder 'Abbrechen'.",
-        "insufficient_funds": "❌ Unzureichendes Guthaben.",
-        "total_needed": "Gesamtbetrag",
-        "your_balance": "Ihr Guthaben",
-        "missing_amount": "Fehlbetrag",
-        "topup_hint": "Bitte laden Sie Ihr Guthaben über 💳 Guthaben aufladen auf.",
-        "purchase_success": "✅ Kauf erfolgreich!",
-        "debited_amount": "Abgebucht",
-        "contact_curator": "Kontaktieren Sie Ihren Kurator",
-        "purchase_cancelled": "❌ Kauf abgebrochen.",
-
-        # topup.py
-        "topup_choose_method": "💰 Wählen Sie eine Zahlungsmethode:",
-        "prompt_enter_amount": "💰 Betrag in EUR eingeben:",
-        "choose_crypto": "💸 Kryptowährung wählen:",
-        "choose_usdt_network": "🌐 Netzwerk für USDT wählen:",
-        "revolut_payment_title": "Revolut-Zahlung",
-        "revolut_open": "🔗 Revolut öffnen",
-        "revolut_confirm_btn": "✅ Zahlung bestätigen",
-        "revolut_instruction": "Folgen Sie dem Link zur Zahlung. Nach der Zahlung klicken Sie auf „Zahlung bestätigen“.",
-        "payment_request_sent": "✅ Zahlungsanfrage wurde gesendet.",
-        "wait_admin_confirm": "Bitte warten Sie auf die Bestätigung des Administrators.",
-        "payment_confirmation": "Zahlungsbestätigung",
-        "method_label": "Methode",
-        "amount_label": "Betrag",
-        "crypto_label": "Krypto",
-        "network_label": "Netzwerk",
-        "crypto_amount_label": "Krypto-Menge",
-        "address_label": "Empfängeradresse",
-        "enter_positive_amount": "❌ Der Betrag muss positiv sein. Bitte erneut eingeben.",
-        "enter_valid_number": "❌ Gültige Zahl eingeben.",
-        "enter_amount_first": "Geben Sie zuerst den Betrag ein.",
-        "payment_cancelled": "❌ Zahlung abgebrochen.",
-        "invalid_action": "❌ Ungültige Aktion. Kehren Sie zum Hauptmenü zurück."
-    },
-    "pl": {
-        "greet": "👋 Cześć, {first}! Witamy w naszym sklepie.",
-        "menu_title": "📋 Główne menu:",
-        "btn_profile": "📁 Profil",
-        "btn_products": "🛒 Produkty",
-        "btn_topup": "💳 Doładuj saldo",
-        "btn_support": "📞 Wsparcie",
-        "error_try_later": "❌ Błąd. Spróbuj ponownie później.",
-        "choose_language": "Wybierz język / Choose your language / Выберите язык / Wähle eine Sprache:",
-        "profile_title": "Profil:",
-        "balance_label": "Saldo",
-        "registration_date_label": "Data rejestracji",
-        "username_label": "Nazwa użytkownika",
-        "image_unavailable": "Obraz niedostępny",
-        "profile_not_found": "❌ Błąd: Nie znaleziono informacji. Zarejestruj się ponownie wpisując /start.",
-        "btn_contact_support": "📧 Skontaktuj się ze wsparciem",
-	"payment_rejected_plain": "❌ Twoja płatność została odrzucona przez administratora.",
-
-        "btn_profile": "📁 Profil",
-        "btn_products": "🛒 Produkty",
-        "btn_topup": "💳 Doładuj saldo",
-        "btn_support": "📞 Wsparcie",
-
-        # Support
-        "support_title": "Wsparcie",
-        "support_description": "Potrzebujesz pomocy? Skontaktuj się z naszym zespołem wsparcia lub administracją sklepu.",
-
-        # admin.py client messages
-        "payment_confirmed": "✅ Twoja płatność została potwierdzona!",
-        "balance_topped_up": "Twoje saldo zostało doładowane o <b>{amount} EUR</b>.",
-        "current_balance": "💳 Aktualne saldo: <b>{balance} EUR</b>.",
-        "payment_not_found": "❌ Płatność nie znaleziona lub już przetworzona.",
-        "error_check_payment": "❌ Błąd. Sprawdź dane płatności.",
-        "payment_rejected": "❌ Twoja płatność (ID {payment_id}) została odrzucona przez administratora.",
-        "payment_not_found_or_not_pending": "❌ Płatność nie znaleziona lub nie jest w statusie 'pending'.",
-
-        # products.py
-        "product_1": "Produkt 1",
-        "product_2": "Produkt 2",
-        "product_3": "Produkt 3",
-        "choose_product": "🛒 Wybierz produkt:",
-        "product_not_found": "❌ Produkt nie znaleziony.",
-        "selected_product": "🛒 Wybrałeś",
-        "unit_price": "Cena za sztukę",
-        "choose_quantity": "Wybierz ilość:",
-        "invalid_quantity": "Nieprawidłowa ilość.",
-        "confirm": "✅ Potwierdź",
-        "cancel": "❌ Anuluj",
-        "confirm_purchase": "✅ Potwierdź zakup:",
-        "product_label": "Produkt",
-        "quantity_label": "Ilość",
-        "total_label": "Łączna kwota do zapłaty",
-        "confirm_or_cancel": "Kliknij 'Potwierdź' lub 'Anuluj'.",
-        "insufficient_funds": "❌ Niewystarczające środki.",
-        "total_needed": "Wymagana kwota",
-        "your_balance": "Twoje saldo",
-        "missing_amount": "Brakująca kwota",
-        "topup_hint": "Doładuj saldo przez 💳 Doładuj saldo.",
-        "purchase_success": "✅ Zakup zakończony sukcesem!",
-        "debited_amount": "Pobrano",
-        "contact_curator": "Skontaktuj się ze swoim kuratorem",
-        "purchase_cancelled": "❌ Zakup anulowany.",
-
-        # topup.py
-        "topup_choose_method": "💰 Wybierz metodę płatności:",
-        "prompt_enter_amount": "💰 Wpisz kwotę w EUR:",
-        "choose_crypto": "💸 Wybierz kryptowalutę:",
-        "choose_usdt_network": "🌐 Wybierz sieć dla USDT:",
-        "revolut_payment_title": "Płatność Revolut",
-        "revolut_open": "🔗 Otwórz Revolut",
-        "revolut_confirm_btn": "✅ Potwierdź płatność",
-        "revolut_instruction": "Przejdź do linku, aby zapłacić. Po płatności naciśnij „Potwierdź płatność”.",
-        "payment_request_sent": "✅ Żądanie płatności zostało wysłane.",
-        "wait_admin_confirm": "Poczekaj na potwierdzenie administratora.",
-        "payment_confirmation": "Potwierdzenie płatności",
-        "method_label": "Metoda",
-        "amount_label": "Kwota",
-        "crypto_label": "Krypto",
-        "network_label": "Sieć",
-        "crypto_amount_label": "Ilość krypto",
-        "address_label": "Adres odbiorcy",
-        "enter_positive_amount": "❌ Kwota musi być dodatnia. Wpisz ponownie.",
-        "enter_valid_number": "❌ Wpisz poprawną liczbę.",
-        "enter_amount_first": "Najpierw wpisz kwotę.",
-        "payment_cancelled": "❌ Płatność anulowana.",
-        "invalid_action": "❌ Nieprawidłowa akcja. Wróć do głównego menu."
-    },
-}
-
-def tr_(lang: str, key: str, **kwargs) -> str:
-    d = T.get(lang) or T["ru"]
-    s = d.get(key) or T["ru"].get(key, key)
-    return s.format(**kwargs) if kwargs else s
-
-async def tr(user_id: int, key: str, **kwargs) -> str:
-    lang = await get_user_language(user_id) or "ru"
+logger = logging.getLogger(__name__)
+
+DEFAULT_LANG = "ru"
+# порядок фолбэков для отсутствующего перевода: язык пользователя → ru → en → имя ключа
+FALLBACK_LANGS = ("ru", "en")
+LOCALE_EXTENSIONS = (".json", ".mo")
+
+_formatter = Formatter()
+
+
+class Template:
+    """
+    Строка с {полями}, разобранная заранее на литералы и имена полей:
+    рендер — склейка кусков без повторного разбора шаблона.
+    Поля со спецификаторами/атрибутами ({x:.2f}, {x!r}, {obj.attr}) рендерит str.format.
+    """
+
+    __slots__ = ("text", "fields", "literals", "names")
+
+    def __init__(self, text: str):
+        self.text = text
+        literals = [""]
+        names = []
+        simple = True
+        for literal, name, spec, conv in _formatter.parse(text):
+            literals[-1] += literal
+            if name is None:
+                continue
+            if not name.isidentifier() or spec or conv:
+                simple = False
+            names.append(name)
+            literals.append("")
+        self.fields = frozenset(names)
+        self.names = tuple(names)
+        self.literals = tuple(literals) if simple else None
+
+    def render(self, kwargs: dict) -> str:
+        lits = self.literals
+        if lits is None:
+            return self.text.format(**kwargs)
+        names = self.names
+        if len(names) == 1:
+            return f"{lits[0]}{kwargs[names[0]]}{lits[1]}"
+        out = [lits[0]]
+        for i, name in enumerate(names, 1):
+            out.append(f"{kwargs[name]}")
+            out.append(lits[i])
+        return "".join(out)
+
+
+Entry = Union[str, Template]
+
+
+def _compile_entry(text: str) -> Entry:
+    return Template(text) if "{" in text or "}" in text else text
+
+
+def _fields(text: str) -> frozenset:
+    return Template(text).fields if ("{" in text or "}" in text) else frozenset()
+
+
+def _file_stamp(path: str) -> tuple:
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def _read_locale(path: str) -> Dict[str, str]:
+    """Строки языка из .json ({"ключ": "текст"}) или .mo (msgid — ключ)."""
+    if path.endswith(".mo"):
+        with open(path, "rb") as f:
+            strings = gettext.GNUTranslations(f)._catalog
+        return {str(k): str(v) for k, v in strings.items() if k and isinstance(k, str)}
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: ожидается объект {{ключ: текст}}")
+    return {str(k): str(v) for k, v in data.items()}
+
+
+class Catalog:
+    """
+    Скомпилированные переводы с ленивой загрузкой языков.
+    keys   — имена ключей, индекс = хэндл (хэндлы не сдвигаются при перезагрузке);
+    tables — язык → список Entry по хэндлам (только загруженные языки);
+    missing / mismatched — отчёт сборки: каких ключей нет в языке,
+    у каких переводов другой набор {полей}, чем в DEFAULT_LANG.
+    version растёт при каждой перезагрузке — по нему инвалидируются кэши строк/клавиатур.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.keys: List[str] = []
+        self.ids: Dict[str, int] = {}
+        self.handles = SimpleNamespace()
+        self.version = 0
+        self.missing: Dict[str, List[str]] = {}
+        self.mismatched: Dict[str, List[str]] = {}
+        self.tables: Dict[str, List[Entry]] = {}
+        self._files: Dict[str, str] = {}                            # язык → путь
+        self._sources: Dict[str, Tuple[tuple, Dict[str, str]]] = {}  # язык → (отпечаток файла, строки)
+        self._broken: Dict[str, tuple] = {}                         # язык → отпечаток битого файла
+        self._listeners: List[Callable[["Catalog", Tuple[str, ...]], None]] = []
+        self.default_table: List[Entry] = []
+        self.scan()
+        if DEFAULT_LANG not in self._files:
+            logger.error(f"i18n: нет файла основного языка '{DEFAULT_LANG}' в {directory}")
+        self.default_table = self.table(DEFAULT_LANG)
+
+    # ---------- файлы ----------
+
+    def scan(self) -> Dict[str, str]:
+        """Какие языки лежат в каталоге (без чтения файлов)."""
+        files = {}
+        try:
+            names = sorted(os.listdir(self.directory))
+        except FileNotFoundError:
+            logger.error(f"i18n: каталог переводов не найден: {self.directory}")
+            names = []
+        for name in names:
+            lang, ext = os.path.splitext(name)
+            if ext in LOCALE_EXTENSIONS and (lang not in files or ext == ".json"):
+                files[lang] = os.path.join(self.directory, name)
+        self._files = files
+        return files
+
+    @property
+    def languages(self) -> Tuple[str, ...]:
+        return tuple(self._files)
+
+    def _load_source(self, lang: str) -> Dict[str, str]:
+        cached = self._sources.get(lang)
+        if cached is not None:
+            return cached[1]
+        path = self._files.get(lang)
+        if path is None:
+            return {}
+        stamp = _file_stamp(path)
+        strings = _read_locale(path)
+        self._sources[lang] = (stamp, strings)
+        logger.info(f"i18n: загружен '{lang}' ({len(strings)} строк) из {path}")
+        return strings
+
+    # ---------- сборка ----------
+
+    def _register_keys(self, strings: Dict[str, str]):
+        for key in strings:
+            if key not in self.ids:
+                self.ids[key] = len(self.keys)
+                self.keys.append(key)
+                setattr(self.handles, key, self.ids[key])
+
+    def _unregister_keys(self, size: int):
+        """Откат хэндлов, выданных после size (неудачная перезагрузка)."""
+        for key in self.keys[size:]:
+            del self.ids[key]
+            delattr(self.handles, key)
+        del self.keys[size:]
+
+    def _build_table(self, lang: str) -> List[Entry]:
+        strings = self._load_source(lang)
+        base = self._load_source(DEFAULT_LANG) if lang != DEFAULT_LANG else strings
+        self._register_keys(base)
+        self._register_keys(strings)
+        chain = [strings]
+        missing, mismatched, table = [], [], []
+        for key in self.keys:
+            text = strings.get(key)
+            if not text:
+                missing.append(key)
+                # фолбэк-языки читаем только если действительно чего-то не хватает
+                if len(chain) == 1:
+                    chain += [self._load_source(f) for f in FALLBACK_LANGS if f != lang]
+                text = next((d[key] for d in chain if d.get(key)), key)
+            elif lang != DEFAULT_LANG and base.get(key) and _fields(text) != _fields(base[key]):
+                mismatched.append(key)
+            table.append(_compile_entry(text))
+        self.missing.pop(lang, None)
+        self.mismatched.pop(lang, None)
+        if missing:
+            self.missing[lang] = missing
+            logger.warning(f"i18n: в '{lang}' нет {len(missing)} ключей (взят фолбэк): {', '.join(missing)}")
+        if mismatched:
+            self.mismatched[lang] = mismatched
+            logger.warning(f"i18n: в '{lang}' поля шаблона не совпадают с '{DEFAULT_LANG}': {', '.join(mismatched)}")
+        return table
+
+    def table(self, lang: str) -> List[Entry]:
+        """Таблица языка; при первом обращении язык читается с диска и компилируется."""
+        table = self.tables.get(lang)
+        if table is not None:
+            return table
+        if lang not in self._files:
+            return self.default_table
+        try:
+            table = self._build_table(lang)
+        except Exception as e:
+            logger.error(f"i18n: не удалось загрузить '{lang}': {e}")
+            self._files.pop(lang, None)
+            return self.default_table
+        # ключи, которых нет в ru, получили новые хэндлы — дотягиваем остальные таблицы
+        self._extend_tables(self.tables, len(table))
+        # новый словарь целиком — читатели видят либо старый, либо новый
+        self.tables = {**self.tables, lang: table}
+        return table
+
+    def _extend_tables(self, tables: Dict[str, List[Entry]], size: int):
+        for lang, table in tables.items():
+            for key in self.keys[len(table):size]:
+                chain = [self._sources.get(f, (None, {}))[1] for f in (lang, *FALLBACK_LANGS)]
+                chain += [src for _, src in self._sources.values()]
+                table.append(_compile_entry(next((d[key] for d in chain if d.get(key)), key)))
+
+    # ---------- перезагрузка ----------
+
+    def changed(self) -> Tuple[str, ...]:
+        """Загруженные языки, чьи файлы изменились на диске, плюс новые файлы в каталоге."""
+        before = set(self._files)
+        self.scan()
+        result = [lang for lang in self._files if lang not in before]
+        # вызывается из потока: копия, пока event loop лениво дозагружает языки
+        for lang, (stamp, _) in dict(self._sources).items():
+            path = self._files.get(lang)
+            try:
+                current = _file_stamp(path) if path else None
+            except FileNotFoundError:
+                current = None
+            # битый файл не перечитываем, пока его не поправят
+            if current != stamp and (lang not in self._broken or self._broken[lang] != current):
+                result.append(lang)
+        return tuple(result)
+
+    def read(self, langs: Tuple[str, ...]) -> Dict[str, Tuple[tuple, Dict[str, str]]]:
+        """
+        Чтение и разбор файлов langs — единственная часть перезагрузки, которая идёт
+        в потоке: состояние каталога здесь не меняется.
+        """
+        fresh = {}
+        for lang in langs:
+            path = self._files.get(lang)
+            if path is not None:
+                fresh[lang] = (_file_stamp(path), _read_locale(path))
+        return fresh
+
+    def reload_failed(self, langs: Tuple[str, ...], error: Exception):
+        logger.error(f"i18n: перезагрузка {', '.join(langs)} не удалась, оставляю прежние переводы: {error}")
+        for lang in langs:
+            path = self._files.get(lang)
+            try:
+                self._broken[lang] = _file_stamp(path) if path else None
+            except FileNotFoundError:
+                self._broken[lang] = None
+
+    def reload(self, langs: Tuple[str, ...], fresh: Dict[str, Tuple[tuple, Dict[str, str]]]) -> Optional[Dict[str, List[Entry]]]:
+        """
+        Пересобирает все загруженные таблицы (фолбэки зависят от ru/en) из прочитанных
+        read() строк. Только на потоке event loop, сразу перед swap(). Возвращает новые
+        таблицы или None — тогда остаются старые, а выданные по дороге хэндлы откатываются.
+        """
+        old_sources, size = self._sources, len(self.keys)
+        old_reports = dict(self.missing), dict(self.mismatched)
+        self._sources = {**{k: v for k, v in old_sources.items() if k not in langs}, **fresh}
+        try:
+            tables = {lang: self._build_table(lang) for lang in self.tables if lang in self._files}
+            if DEFAULT_LANG not in tables:
+                tables[DEFAULT_LANG] = self._build_table(DEFAULT_LANG)
+            self._extend_tables(tables, len(self.keys))
+        except Exception as e:
+            self.reload_failed(langs, e)
+            self._sources = old_sources
+            self._unregister_keys(size)
+            self.missing, self.mismatched = old_reports
+            return None
+        for lang in langs:
+            self._broken.pop(lang, None)
+        return tables
+
+    def swap(self, tables: Dict[str, List[Entry]], langs: Tuple[str, ...] = ()):
+        """Атомарно подменяет таблицы (на потоке event loop) и оповещает подписчиков."""
+        self.tables = tables
+        self.default_table = tables[DEFAULT_LANG]
+        self.version += 1
+        for listener in list(self._listeners):
+            try:
+                listener(self, langs)
+            except Exception as e:
+                logger.error(f"i18n: ошибка в подписчике на перезагрузку: {e}")
+
+    def on_change(self, listener: Callable[["Catalog", Tuple[str, ...]], None]):
+        """listener(catalog, langs) вызывается после каждой перезагрузки переводов."""
+        self._listeners.append(listener)
+        return listener
+
+    def load_all(self):
+        """Загружает все языки каталога (для отчёта и индексов по всем языкам)."""
+        for lang in self.languages:
+            self.table(lang)
+
+    def values(self, key: Union[str, int]) -> Dict[str, str]:
+        """Текст ключа во всех языках каталога (без форматирования)."""
+        self.load_all()
+        i = key if key.__class__ is int else self.ids[key]
+        return {lang: _entry_text(table[i]) for lang, table in self.tables.items()}
+
+    def report(self) -> str:
+        self.load_all()
+        lines = [f"{len(self.keys)} keys, languages: {', '.join(self.languages)} (catalog v{self.version})"]
+        for lang, keys in self.missing.items():
+            lines.append(f"{lang}: missing {len(keys)}: {', '.join(keys)}")
+        for lang, keys in self.mismatched.items():
+            lines.append(f"{lang}: placeholders differ from {DEFAULT_LANG}: {', '.join(keys)}")
+        return "\n".join(lines)
+
+
+def _entry_text(entry: Entry) -> str:
+    return entry if entry.__class__ is str else entry.text
+
+
+async def watch_locales(interval: float = I18N_RELOAD_INTERVAL):
+    """
+    Фоновая проверка mtime файлов переводов. Чтение и разбор файлов — в отдельном потоке;
+    сборка таблиц, новые ключи и подмена — одним шагом на event loop (без await между ними),
+    так что ленивая загрузка языков в table() никогда не видит полусобранный каталог.
+    """
+    if interval <= 0:
+        return
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            langs = await asyncio.to_thread(catalog.changed)
+            if not langs:
+                continue
+            try:
+                fresh = await asyncio.to_thread(catalog.read, langs)
+            except Exception as e:
+                catalog.reload_failed(langs, e)
+                continue
+            tables = catalog.reload(langs, fresh)
+            if tables is not None:
+                catalog.swap(tables, langs)
+                logger.info(f"i18n: перезагружены {', '.join(langs)} (catalog v{catalog.version})")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"i18n: ошибка проверки файлов переводов: {e}")
+
+
+catalog = Catalog(LOCALES_DIR)
+
+# Хэндлы ключей: K.greet, K.cancel, ... — опечатка в имени падает при импорте модуля, а не в рантайме
+K = catalog.handles
+
+
+def tr_(lang: str, key: Union[str, int], **kwargs) -> str:
+    """Перевод по языку; key — хэндл K.<ключ> (быстрее) или имя ключа."""
+    table = catalog.tables.get(lang) or catalog.table(lang)
+    i = key if key.__class__ is int else catalog.ids.get(key)
+    if i is None:
+        return key
+    entry = table[i]
+    if entry.__class__ is str:
+        return entry
+    return entry.render(kwargs) if kwargs else entry.text
+
+
+async def tr(user_id: int, key: Union[str, int], **kwargs) -> str:
+    lang = await get_user_language(user_id) or DEFAULT_LANG
     return tr_(lang, key, **kwargs)
+
+
+if __name__ == "__main__":
+    print(catalog.report())
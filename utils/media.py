@@ -0,0 +1,113 @@
+# utils/media.py
+# Картинки экранов (images/*.jpg) загружаются в Telegram один раз: file_id хранится
+# в media_files по (путь, хэш содержимого), дальше отправляем/редактируем по file_id.
+# Файл изменился — хэш другой, загружаем заново; Telegram отверг file_id — тоже.
+# Содержимое и хэш берутся из utils/assets.py (подготовлены при старте, без диска в хендлерах).
+import logging
+from typing import Awaitable, Callable, Dict, Optional, Tuple, Union
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import InputFile, InputMediaPhoto, Message
+
+from utils.assets import Asset, AssetStore, assets as default_assets
+from utils.db_api import get_media_file_id, set_media_file_id, forget_media_file_id
+
+logger = logging.getLogger(__name__)
+
+# так Telegram отвечает на file_id, который больше нельзя использовать
+_REJECTED_FILE_ID = ("wrong file identifier", "wrong remote file identifier", "file reference", "file_id")
+
+
+def _is_rejected_file_id(error: TelegramBadRequest) -> bool:
+    text = str(error).lower()
+    return any(marker in text for marker in _REJECTED_FILE_ID)
+
+
+class MediaRegistry:
+    """
+    path -> file_id с проверкой содержимого.
+    Хэш — из AssetStore (пересчитывается при смене файла), file_id — из памяти,
+    а при первом обращении после рестарта — из БД.
+    """
+
+    def __init__(self, store: AssetStore = default_assets):
+        self.store = store
+        self._file_ids: Dict[Tuple[str, str], str] = {}        # (path, hash) -> file_id
+        self.uploads = 0
+        self.reused = 0
+        self.rejected = 0
+
+    def _asset(self, path: str) -> Asset:
+        asset = self.store.get(path)
+        if asset is None:   # не нашли при сканировании — пусть решает хендлер, как и раньше
+            raise FileNotFoundError(path)
+        return asset
+
+    async def file_id(self, asset: Asset) -> Optional[str]:
+        """file_id или None, если картинку с таким содержимым ещё не загружали."""
+        key = (asset.path, asset.content_hash)
+        if key in self._file_ids:
+            return self._file_ids[key]
+        file_id = await get_media_file_id(asset.path, asset.content_hash)
+        if file_id:
+            self._file_ids[key] = file_id
+        return file_id
+
+    async def _remember(self, asset: Asset, message: Union[Message, bool, None]):
+        photo = getattr(message, "photo", None) if isinstance(message, Message) else None
+        if not photo:
+            return
+        file_id = photo[-1].file_id
+        self._file_ids[(asset.path, asset.content_hash)] = file_id
+        await set_media_file_id(asset.path, asset.content_hash, file_id)
+        logger.info(f"media: {asset.path} загружен, file_id сохранён")
+
+    async def _forget(self, asset: Asset):
+        self._file_ids.pop((asset.path, asset.content_hash), None)
+        await forget_media_file_id(asset.path)
+
+    async def _with_photo(self, path: str, send: Callable[[Union[str, InputFile]], Awaitable]):
+        """send(photo) с file_id, если он есть; иначе (или если его отвергли) — с загрузкой файла."""
+        asset = self._asset(path)
+        file_id = await self.file_id(asset)
+        if file_id:
+            try:
+                result = await send(file_id)
+                self.reused += 1
+                return result
+            except TelegramBadRequest as e:
+                if not _is_rejected_file_id(e):
+                    raise
+                self.rejected += 1
+                logger.warning(f"media: file_id для {path} отвергнут ({e}), загружаем заново")
+                await self._forget(asset)
+        result = await send(asset.input_file())
+        self.uploads += 1
+        await self._remember(asset, result)
+        return result
+
+    # ---------- для хендлеров ----------
+
+    async def answer_photo(self, message: Message, path: str, **kwargs) -> Message:
+        """message.answer_photo с картинкой из path."""
+        return await self._with_photo(path, lambda photo: message.answer_photo(photo=photo, **kwargs))
+
+    async def send_photo(self, bot, chat_id: int, path: str, **kwargs) -> Message:
+        return await self._with_photo(path, lambda photo: bot.send_photo(chat_id, photo=photo, **kwargs))
+
+    async def edit_photo(self, message: Message, path: str, caption: str, reply_markup=None):
+        """Замена фото и подписи в уже отправленном сообщении."""
+        return await self._with_photo(path, lambda photo: message.edit_media(
+            media=InputMediaPhoto(media=photo, caption=caption), reply_markup=reply_markup
+        ))
+
+    def stats(self) -> dict:
+        return {
+            "file_ids": len(self._file_ids),
+            "uploads": self.uploads,
+            "reused": self.reused,
+            "rejected": self.rejected,
+        }
+
+
+media = MediaRegistry()
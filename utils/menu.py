@@ -0,0 +1,71 @@
+# utils/menu.py
+# Обратный индекс «текст кнопки главного меню → действие».
+# Строится один раз из каталога переводов (все языки + старые подписи кнопок)
+# и пересобирается сам при перезагрузке/добавлении языков (catalog.on_change).
+import logging
+from typing import Dict, Optional
+
+from utils.i18n import K, catalog, Catalog
+
+logger = logging.getLogger(__name__)
+
+# действие → ключ перевода подписи кнопки
+MENU_BUTTONS = {
+    "profile": K.btn_profile,
+    "products": K.btn_products,
+    "topup": K.btn_topup,
+    "support": K.btn_support,
+}
+
+# Подписи старых клавиатур, которые ещё могут висеть у пользователей
+LEGACY_LABELS = {
+    "👨‍💻 Profile": "profile",
+    "👨‍💻 Профиль": "profile",
+    "📁 Profile": "profile",
+    "🛒 Products": "products",
+    "💰 Top-up Balance": "topup",
+    "📞 Support": "support",
+}
+
+
+class MenuIndex:
+    def __init__(self, source: Catalog):
+        self._catalog = source
+        self._index: Dict[str, str] = {}
+        self.rebuild()
+        source.on_change(lambda _catalog, _langs: self.rebuild())
+
+    def rebuild(self):
+        index = dict(LEGACY_LABELS)
+        for action, key in MENU_BUTTONS.items():
+            for lang, label in self._catalog.values(key).items():
+                label = label.strip()
+                other = index.get(label)
+                if other and other != action:
+                    logger.warning(f"menu: подпись '{label}' ({lang}) уже занята действием '{other}'")
+                    continue
+                index[label] = action
+        # одно присваивание — обработчики видят либо старый, либо новый индекс
+        self._index = index
+        logger.info(f"menu: индекс кнопок пересобран, {len(index)} подписей")
+
+    def action(self, text: Optional[str]) -> Optional[str]:
+        """Действие для текста кнопки или None."""
+        if not text:
+            return None
+        return self._index.get(text) or self._index.get(text.strip())
+
+    def labels(self, action: str) -> frozenset:
+        return frozenset(label for label, a in self._index.items() if a == action)
+
+
+menu_index = MenuIndex(catalog)
+
+
+def menu_action(text: Optional[str]) -> Optional[str]:
+    return menu_index.action(text)
+
+
+def is_menu_button(action: str):
+    """Фильтр для хендлеров: lambda m: текст сообщения — кнопка меню action."""
+    return lambda m: menu_index.action(m.text) == action
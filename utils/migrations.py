@@ -0,0 +1,187 @@
+# utils/migrations.py
+# Версионированные миграции схемы. Выполняются один раз в on_startup,
+# после них функции db_api работают с финальной схемой без проверок.
+import logging
+import sqlite3
+from datetime import datetime
+from typing import Callable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (версия, описание, fn(conn)) — строго по возрастанию версии
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Connection], None]]] = []
+
+
+def migration(version: int, description: str):
+    def decorator(fn):
+        if MIGRATIONS and MIGRATIONS[-1][0] >= version:
+            raise ValueError(f"Migration {version} is out of order")
+        MIGRATIONS.append((version, description, fn))
+        return fn
+    return decorator
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> set:
+    return {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+
+
+# ============== ШАГИ ==============
+
+@migration(1, "users and payment_requests tables")
+def _initial(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY,
+            balance REAL DEFAULT 0.0,
+            registration_date TEXT,
+            username TEXT
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS payment_requests (
+            payment_id TEXT PRIMARY KEY,
+            user_id INTEGER,
+            method TEXT,
+            amount REAL,
+            crypto TEXT,
+            crypto_amount REAL,
+            network TEXT,
+            status TEXT DEFAULT 'pending',
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+@migration(2, "users.language column")
+def _language_column(conn):
+    # старые БД могли получить колонку через ensure_language_column()
+    if "language" not in _columns(conn, "users"):
+        conn.execute("ALTER TABLE users ADD COLUMN language TEXT DEFAULT 'ru'")
+
+
+@migration(3, "orders table")
+def _orders(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS orders (
+            order_id TEXT PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            product_id TEXT NOT NULL,
+            quantity INTEGER NOT NULL,
+            total REAL NOT NULL,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+@migration(4, "payment_requests indexes by status/user and created_at")
+def _payment_indexes(conn):
+    # очередь админа и чистка просроченных: WHERE status = ? ORDER BY/по диапазону created_at
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_payment_requests_status_created
+        ON payment_requests (status, created_at)
+    """)
+    # история пользователя: WHERE user_id = ? ORDER BY created_at DESC
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_payment_requests_user_created
+        ON payment_requests (user_id, created_at)
+    """)
+
+
+@migration(5, "balance ledger in integer cents")
+def _balance_ledger(conn):
+    # users.balance_cents — материализованный снимок суммы по журналу;
+    # старую колонку balance (REAL) оставляем зеркалом для внешних инструментов
+    if "balance_cents" not in _columns(conn, "users"):
+        conn.execute("ALTER TABLE users ADD COLUMN balance_cents INTEGER NOT NULL DEFAULT 0")
+    conn.execute("UPDATE users SET balance_cents = CAST(ROUND(COALESCE(balance, 0) * 100) AS INTEGER)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS balance_ledger (
+            entry_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            delta_cents INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            ref TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_balance_ledger_user
+        ON balance_ledger (user_id, entry_id)
+    """)
+    # входящие остатки, чтобы сумма по журналу сходилась со снимком
+    conn.execute("""
+        INSERT INTO balance_ledger (user_id, delta_cents, kind)
+        SELECT user_id, balance_cents, 'opening' FROM users WHERE balance_cents != 0
+    """)
+
+
+@migration(6, "media_files: Telegram file_id of uploaded images")
+def _media_files(conn):
+    # одна строка на путь; file_id действителен, пока хэш содержимого совпадает
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS media_files (
+            path TEXT PRIMARY KEY,
+            content_hash TEXT NOT NULL,
+            file_id TEXT NOT NULL,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+@migration(7, "broadcasts and users.blocked_at")
+def _broadcasts(conn):
+    # blocked_at — пользователь заблокировал бота (рассылка его пропускает), NULL — доступен
+    if "blocked_at" not in _columns(conn, "users"):
+        conn.execute("ALTER TABLE users ADD COLUMN blocked_at TEXT")
+    # last_user_id — курсор по users.user_id: всё, что <= него, уже обработано
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS broadcasts (
+            broadcast_id TEXT PRIMARY KEY,
+            admin_id INTEGER NOT NULL,
+            text TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'running',
+            last_user_id INTEGER NOT NULL DEFAULT 0,
+            total INTEGER NOT NULL DEFAULT 0,
+            sent INTEGER NOT NULL DEFAULT 0,
+            failed INTEGER NOT NULL DEFAULT 0,
+            blocked INTEGER NOT NULL DEFAULT 0,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            finished_at TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_broadcasts_status ON broadcasts (status)")
+
+
+# ============== ЗАПУСК ==============
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TEXT
+        )
+    """)
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def migrate(conn: sqlite3.Connection) -> Tuple[int, int]:
+    """
+    Применяет все недостающие миграции по порядку. Вызывается внутри одной
+    транзакции движка: либо применились все шаги, либо ни одного.
+    Возвращает (версия_до, версия_после).
+    """
+    before = schema_version(conn)
+    current = before
+    for version, description, fn in MIGRATIONS:
+        if version <= current:
+            continue
+        logger.info(f"Applying migration {version}: {description}")
+        fn(conn)
+        conn.execute(
+            "INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+            (version, description, datetime.now().isoformat())
+        )
+        current = version
+    return before, current
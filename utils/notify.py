@@ -1,6 +1,8 @@
 # utils/notify.py
-from loader import dp
-from config import CHANNEL_ID, ADMIN_IDS
+from loader import bot
+from config import CHANNEL_ID
+from utils.outbound import outbound_lane, Lane
+from utils.admin_notify import admins
 from datetime import datetime
 import logging
 
@@ -51,17 +53,11 @@ async def notify_new_user(user_id, username, full_name):
         return
 
     try:
-        await dp.bot.send_message(_CHANNEL, text, parse_mode="HTML")
+        # канал — самая низкая полоса: не обгоняет ответы пользователям
+        with outbound_lane(Lane.BULK):
+            await bot.send_message(_CHANNEL, text, parse_mode="HTML")
     except Exception as e:
         logger.error(f"Ошибка отправки уведомления в канал {_CHANNEL}: {e}")
 
-async def on_startup_notify(dispatcher):
-    for admin_id in ADMIN_IDS:
-        try:
-            await dispatcher.bot.send_message(
-                admin_id,
-                "🚀 <b>Бот [Shop Name] запущен!</b>\n└ <i>Добро пожаловать</i>",
-                parse_mode="HTML"
-            )
-        except Exception as e:
-            logger.error(f"Ошибка отправки уведомления админу {admin_id}: {e}")
+async def on_startup_notify():
+    await admins.send("🚀 <b>Бот [Shop Name] запущен!</b>\n└ <i>Добро пожаловать</i>")
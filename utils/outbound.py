@@ -0,0 +1,236 @@
+# utils/outbound.py
+# Планировщик исходящих запросов к Bot API: middleware сессии бота (loader.py),
+# через него идут все отправки/правки — и bot.send_message, и message.answer/edit_*.
+#   - токен-бакеты: общий (OUTBOUND_GLOBAL_RATE/с) и на каждый чат
+#     (личный — OUTBOUND_CHAT_RATE/с, группа/канал — OUTBOUND_GROUP_RATE_PER_MIN/мин);
+#   - полосы приоритета: ответы пользователю → уведомления админам → канал/рассылки.
+#     Полосу задаёт вызывающий код: with outbound_lane(Lane.ADMIN): ...
+#   - 429 (RetryAfter) ставит на паузу бакет чата, а если 429 идут подряд — и общий.
+import asyncio
+import contextlib
+import heapq
+import itertools
+import logging
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Dict, List, Optional, Tuple
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramRetryAfter
+
+from config import (
+    OUTBOUND_GLOBAL_RATE, OUTBOUND_GLOBAL_BURST,
+    OUTBOUND_CHAT_RATE, OUTBOUND_CHAT_BURST, OUTBOUND_GROUP_RATE_PER_MIN,
+)
+
+logger = logging.getLogger(__name__)
+
+# какие методы расходуют лимиты отправки (getChat, answerCallbackQuery и т.п. — нет)
+THROTTLED_PREFIXES = ("Send", "Edit", "Copy", "Forward")
+MAX_CHAT_BUCKETS = 10_000
+
+
+class Lane(IntEnum):
+    INTERACTIVE = 0   # ответы на апдейты пользователя
+    ADMIN = 1         # уведомления админам
+    BULK = 2          # канал, рассылки
+
+
+_lane: ContextVar[Lane] = ContextVar("outbound_lane", default=Lane.INTERACTIVE)
+
+
+@contextlib.contextmanager
+def outbound_lane(lane: Lane):
+    """Все запросы к Bot API внутри блока идут в полосе lane."""
+    token = _lane.set(lane)
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self) -> float:
+        """Сколько ждать до свободного токена (0 — можно сейчас)."""
+        now = time.monotonic()
+        if now < self.paused_until:
+            return self.paused_until - now
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+    def idle(self) -> bool:
+        now = time.monotonic()
+        self._refill(now)
+        return self.tokens >= self.capacity and now >= self.paused_until
+
+
+class _ChatLimiter:
+    __slots__ = ("bucket", "lock")
+
+    def __init__(self, bucket: TokenBucket):
+        self.bucket = bucket
+        self.lock = asyncio.Lock()
+
+
+class LaneStats:
+    __slots__ = ("queued", "sent", "wait_total", "wait_max")
+
+    def __init__(self):
+        self.queued = 0
+        self.sent = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "queued": self.queued,
+            "sent": self.sent,
+            "wait_avg_ms": round(self.wait_total / self.sent * 1000, 1) if self.sent else 0.0,
+            "wait_max_ms": round(self.wait_max * 1000, 1),
+        }
+
+
+class OutboundScheduler(BaseRequestMiddleware):
+    def __init__(self, global_rate: float = OUTBOUND_GLOBAL_RATE, global_burst: int = OUTBOUND_GLOBAL_BURST,
+                 chat_rate: float = OUTBOUND_CHAT_RATE, chat_burst: int = OUTBOUND_CHAT_BURST,
+                 group_rate_per_min: float = OUTBOUND_GROUP_RATE_PER_MIN):
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate_per_min / 60
+        self._chats: "OrderedDict[object, _ChatLimiter]" = OrderedDict()
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []   # (lane, seq, future)
+        self._seq = itertools.count()
+        self._pump: Optional[asyncio.Task] = None
+        self.lanes: Dict[Lane, LaneStats] = {lane: LaneStats() for lane in Lane}
+        self.retry_after_hits = 0
+        self._consecutive_429 = 0
+
+    # ---------- бакеты ----------
+
+    def _chat(self, chat_id) -> _ChatLimiter:
+        limiter = self._chats.get(chat_id)
+        if limiter is None:
+            # отрицательный id / @username — группа или канал
+            group = not isinstance(chat_id, int) or chat_id < 0
+            rate = self.group_rate if group else self.chat_rate
+            limiter = _ChatLimiter(TokenBucket(rate, 1 if group else self.chat_burst))
+            self._chats[chat_id] = limiter
+            if len(self._chats) > MAX_CHAT_BUCKETS:
+                self._evict_idle()
+        else:
+            self._chats.move_to_end(chat_id)
+        return limiter
+
+    def _evict_idle(self):
+        # сброс полного бакета ничего не меняет — выкидываем самые давние из простаивающих
+        for chat_id in list(self._chats):
+            if len(self._chats) <= MAX_CHAT_BUCKETS // 2:
+                break
+            limiter = self._chats[chat_id]
+            if not limiter.lock.locked() and limiter.bucket.idle():
+                del self._chats[chat_id]
+
+    async def _acquire_chat(self, chat_id):
+        limiter = self._chat(chat_id)
+        async with limiter.lock:
+            while True:
+                delay = limiter.bucket.delay()
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+            limiter.bucket.take()
+
+    async def _acquire_global(self, lane: Lane):
+        if not self._waiters and self.global_bucket.delay() <= 0:
+            self.global_bucket.take()
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (lane, next(self._seq), future))
+        if self._pump is None or self._pump.done():
+            self._pump = asyncio.create_task(self._run_pump())
+        await future
+
+    async def _run_pump(self):
+        """Выдаёт общие токены ожидающим строго по приоритету полосы, внутри полосы — по очереди."""
+        while self._waiters:
+            delay = self.global_bucket.delay()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():   # вызывающий отменён — токен не тратим
+                continue
+            self.global_bucket.take()
+            future.set_result(None)
+
+    # ---------- middleware ----------
+
+    async def __call__(self, make_request, bot, method):
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is None or not type(method).__name__.startswith(THROTTLED_PREFIXES):
+            return await make_request(bot, method)
+
+        lane = _lane.get()
+        stats = self.lanes[lane]
+        started = time.monotonic()
+        stats.queued += 1
+        try:
+            await self._acquire_chat(chat_id)
+            await self._acquire_global(lane)
+        finally:
+            stats.queued -= 1
+        waited = time.monotonic() - started
+        stats.sent += 1
+        stats.wait_total += waited
+        stats.wait_max = max(stats.wait_max, waited)
+        if waited > 1:
+            logger.debug(f"outbound: {type(method).__name__} to {chat_id} waited {waited:.2f}s ({lane.name})")
+
+        try:
+            result = await make_request(bot, method)
+        except TelegramRetryAfter as e:
+            # Telegram сам сказал, сколько ждать: этот чат — точно; несколько 429 подряд
+            # в разные чаты — значит, упёрлись в общий лимит
+            self.retry_after_hits += 1
+            self._consecutive_429 += 1
+            self._chat(chat_id).bucket.pause(e.retry_after)
+            if self._consecutive_429 > 1:
+                self.global_bucket.pause(min(e.retry_after, 5))
+            logger.warning(f"outbound: 429 for {chat_id}, retry after {e.retry_after}s")
+            raise
+        self._consecutive_429 = 0
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "lanes": {lane.name.lower(): s.as_dict() for lane, s in self.lanes.items()},
+            "waiting_global": len(self._waiters),
+            "chats": len(self._chats),
+            "retry_after": self.retry_after_hits,
+        }
+
+
+outbound = OutboundScheduler()
@@ -0,0 +1,30 @@
+# utils/products.py
+# Каталог товаров (названия — ключи перевода). version растёт при каждой замене
+# каталога — по нему сбрасываются закэшированные клавиатуры (keyboards/cache.py).
+from typing import Dict, Optional
+
+from utils.i18n import K
+
+
+class ProductCatalog:
+    def __init__(self, items: Dict[str, dict]):
+        self.items: Dict[str, dict] = dict(items)
+        self.version = 0
+
+    def get(self, product_id: str) -> Optional[dict]:
+        return self.items.get(product_id)
+
+    def __contains__(self, product_id: str) -> bool:
+        return product_id in self.items
+
+    def replace(self, items: Dict[str, dict]):
+        """Новый каталог целиком (цены, состав); закэшированные клавиатуры пересоберутся."""
+        self.items = dict(items)
+        self.version += 1
+
+
+products = ProductCatalog({
+    "1": {"name_key": K.product_1, "price": 100.0},
+    "2": {"name_key": K.product_2, "price": 200.0},
+    "3": {"name_key": K.product_3, "price": 300.0},
+})
@@ -0,0 +1,115 @@
+# utils/profile_cache.py
+# Данные Telegram для экрана профиля: username (get_chat) и file_id верхней аватарки
+# (get_user_profile_photos). Первый показ — один параллельный запрос, дальше — из памяти;
+# одновременные открытия профиля одного пользователя ждут один и тот же запрос;
+# устаревшая запись обновляется в фоне уже после ответа пользователю.
+# Сменившийся username записывается в users (db_api.set_username).
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from config import PROFILE_CACHE_SIZE, PROFILE_CACHE_TTL, PROFILE_REFRESH_AFTER
+from utils.cache import TTLCache, MISSING
+from utils.db_api import set_username
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ProfileInfo:
+    username: Optional[str]
+    photo_file_id: Optional[str]
+    fetched_at: float
+
+
+class ProfileCache:
+    def __init__(self, maxsize: int = PROFILE_CACHE_SIZE, ttl: float = PROFILE_CACHE_TTL,
+                 refresh_after: float = PROFILE_REFRESH_AFTER):
+        self._cache = TTLCache(maxsize, ttl)
+        self.refresh_after = refresh_after
+        self._inflight: Dict[int, asyncio.Task] = {}
+        self.fetches = 0
+        self.background_refreshes = 0
+        self.username_updates = 0
+
+    async def _fetch(self, bot, user_id: int, known_username: Optional[str]) -> ProfileInfo:
+        """Оба запроса к Bot API параллельно; упавший заменяем прошлым значением."""
+        self.fetches += 1
+        previous = self._cache.peek(user_id, None)
+        chat, photos = await asyncio.gather(
+            bot.get_chat(user_id),
+            bot.get_user_profile_photos(user_id, limit=1),
+            return_exceptions=True,
+        )
+        if isinstance(chat, Exception):
+            logger.debug(f"profile: get_chat({user_id}) failed: {chat}")
+            username = previous.username if previous else None
+        else:
+            username = getattr(chat, "username", None)
+            if username != known_username:
+                # пользователь сменил/убрал username — обновляем запись (и кэш db_api)
+                try:
+                    if await set_username(user_id, username):
+                        self.username_updates += 1
+                except Exception as e:
+                    logger.warning(f"profile: cannot store username for {user_id}: {e}")
+        if isinstance(photos, Exception):
+            logger.debug(f"profile: get_user_profile_photos({user_id}) failed: {photos}")
+            photo_file_id = previous.photo_file_id if previous else None
+        else:
+            photo_file_id = photos.photos[0][-1].file_id if photos.photos else None
+
+        info = ProfileInfo(username, photo_file_id, time.monotonic())
+        self._cache.set(user_id, info)
+        return info
+
+    async def get(self, bot, user_id: int, known_username: Optional[str] = None) -> ProfileInfo:
+        """Из кэша; при промахе — запрос к Bot API (только первый показ / после TTL)."""
+        info = self._cache.get(user_id)
+        if info is not MISSING:
+            return info
+        task = self._inflight.get(user_id) or self._spawn(bot, user_id, known_username)
+        # shield: отменённый хендлер не отменяет запрос остальным ждущим
+        return await asyncio.shield(task)
+
+    def refresh_later(self, bot, user_id: int, known_username: Optional[str] = None):
+        """После ответа: если запись старше refresh_after — обновить в фоне (одна задача на пользователя)."""
+        info = self._cache.peek(user_id, None)
+        if info and time.monotonic() - info.fetched_at < self.refresh_after:
+            return
+        if user_id in self._inflight:
+            return
+        self.background_refreshes += 1
+        self._spawn(bot, user_id, known_username)
+
+    def _spawn(self, bot, user_id: int, known_username: Optional[str]) -> asyncio.Task:
+        """Запрос к Bot API — одна задача на пользователя, пока она не завершится."""
+        task = asyncio.create_task(self._fetch(bot, user_id, known_username))
+        self._inflight[user_id] = task
+        task.add_done_callback(lambda t: self._done(user_id, t))
+        return task
+
+    def _done(self, user_id: int, task: asyncio.Task):
+        # и при ошибке — следующий get начнёт новый запрос
+        self._inflight.pop(user_id, None)
+        if not task.cancelled() and task.exception():
+            logger.warning(f"profile: fetch for {user_id} failed: {task.exception()}")
+
+    async def drain(self):
+        """Дождаться фоновых обновлений (при остановке бота)."""
+        if self._inflight:
+            await asyncio.gather(*self._inflight.values(), return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            **self._cache.stats(),
+            "fetches": self.fetches,
+            "background_refreshes": self.background_refreshes,
+            "username_updates": self.username_updates,
+            "inflight": len(self._inflight),
+        }
+
+
+profiles = ProfileCache()
@@ -0,0 +1,419 @@
+# utils/repository.py
+# Интерфейс хранилища (пользователи, язык, баланс, платежи) и in-memory реализация.
+# SQLite-реализация — utils/sqlite_repository.py, выбор бэкенда — config.DB_BACKEND.
+import uuid
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+from typing import List, Optional, Tuple
+
+
+def to_cents(amount) -> int:
+    return int((Decimal(str(amount)) * 100).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+def from_cents(cents: int) -> float:
+    return (cents or 0) / 100
+
+
+def _utc_timestamp() -> str:
+    # тот же формат, что у CURRENT_TIMESTAMP в SQLite
+    return datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+
+
+class Repository(ABC):
+    """
+    Все операции над данными бота. Реализации обязаны вести себя одинаково
+    (см. benchmarks/storage_backends.py — общий прогон соответствия).
+
+    Пользователь отдаётся словарём:
+    {"user_id", "balance", "registration_date", "username", "language"},
+    суммы — в EUR (float), внутри хранятся целые центы.
+    """
+
+    backend = "abstract"
+
+    # ---------- жизненный цикл ----------
+
+    async def open(self) -> dict:
+        """Подготовка хранилища при старте; возвращает действующие настройки."""
+        return {"backend": self.backend}
+
+    async def migrate(self) -> Tuple[int, int]:
+        """Доводит схему до последней версии; (версия_до, версия_после)."""
+        return 0, 0
+
+    async def flush(self):
+        """Дожидается фиксации всех уже отправленных записей."""
+
+    async def close(self):
+        """Освобождает ресурсы при остановке."""
+
+    def stats(self) -> dict:
+        return {"backend": self.backend}
+
+    # ---------- пользователи ----------
+
+    @abstractmethod
+    async def get_user(self, user_id: int) -> Optional[dict]:
+        """Запись пользователя или None."""
+
+    @abstractmethod
+    async def user_exists(self, user_id: int) -> bool:
+        ...
+
+    @abstractmethod
+    async def get_user_language(self, user_id: int) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    async def register_user(self, user_id: int, username: Optional[str] = None, language: Optional[str] = None):
+        """Создаёт запись, если её нет (существующую не трогает); язык по умолчанию 'ru'."""
+
+    @abstractmethod
+    async def set_user_language(self, user_id: int, lang: str):
+        """Ставит язык; если пользователя нет — создаёт запись."""
+
+    @abstractmethod
+    async def set_username(self, user_id: int, username: Optional[str]) -> bool:
+        """Обновляет username существующего пользователя; False — такого нет."""
+
+    # ---------- баланс ----------
+
+    @abstractmethod
+    async def update_balance(self, user_id: int, amount: float, kind: str = "adjustment",
+                             ref: Optional[str] = None):
+        """Проводка на amount EUR; для несуществующего пользователя — ничего."""
+
+    @abstractmethod
+    async def purchase(self, user_id: int, product_id: str, quantity: int, total: float):
+        """
+        Атомарная проверка и списание + заказ. (ok, balance, order_id):
+        при нехватке средств ok=False, balance — текущий, order_id=None.
+        """
+
+    @abstractmethod
+    async def get_balance_history(self, user_id: int, limit: int = 20) -> list:
+        """Проводки пользователя, новые первыми."""
+
+    @abstractmethod
+    async def rebuild_balances(self, dry_run: bool = False) -> Tuple[int, int]:
+        """Пересчёт снимков баланса из журнала; (пользователей, расхождений)."""
+
+    # ---------- платежи ----------
+
+    @abstractmethod
+    async def record_payment_request(self, user_id: int, method: str, amount: float,
+                                     crypto: str = None, crypto_amount: float = None,
+                                     network: str = None) -> str:
+        """Новая заявка в статусе pending; возвращает payment_id."""
+
+    @abstractmethod
+    async def confirm_payment(self, payment_id: str):
+        """(user_id, amount, new_balance) или (None, None, None), если заявка не pending."""
+
+    @abstractmethod
+    async def reject_payment(self, payment_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def get_pending_payments(self, limit: int = 50, older_than: Optional[str] = None) -> list:
+        """Ожидающие заявки, старые первыми; older_than — верхняя граница created_at."""
+
+    @abstractmethod
+    async def get_user_payments(self, user_id: int, limit: int = 20) -> list:
+        """Заявки пользователя, новые первыми."""
+
+    # ---------- медиа ----------
+
+    @abstractmethod
+    async def get_media_file_id(self, path: str, content_hash: str) -> Optional[str]:
+        """file_id картинки, загруженной с этим содержимым, или None."""
+
+    @abstractmethod
+    async def set_media_file_id(self, path: str, content_hash: str, file_id: str):
+        """Запоминает file_id для пути (предыдущая запись пути заменяется)."""
+
+    @abstractmethod
+    async def forget_media_file_id(self, path: str):
+        """Сбрасывает file_id пути (Telegram его отверг)."""
+
+    # ---------- рассылки ----------
+
+    @abstractmethod
+    async def set_user_blocked(self, user_id: int, blocked: bool) -> bool:
+        """Пометка «заблокировал бота» (или её снятие); False — такого пользователя нет."""
+
+    @abstractmethod
+    async def count_broadcast_recipients(self) -> int:
+        """Сколько пользователей получат рассылку (не заблокировавшие бота)."""
+
+    @abstractmethod
+    async def get_broadcast_recipients(self, after_user_id: int, limit: int) -> List[int]:
+        """Следующая порция получателей: user_id > after_user_id по возрастанию (keyset)."""
+
+    @abstractmethod
+    async def create_broadcast(self, admin_id: int, text: str, total: int) -> str:
+        """Новая рассылка в статусе running; возвращает broadcast_id."""
+
+    @abstractmethod
+    async def get_broadcast(self, broadcast_id: str) -> Optional[dict]:
+        """
+        {"broadcast_id", "admin_id", "text", "status", "last_user_id", "total",
+         "sent", "failed", "blocked", "created_at", "finished_at"} или None.
+        """
+
+    @abstractmethod
+    async def get_running_broadcasts(self) -> list:
+        """Незавершённые рассылки (status = running), старые первыми."""
+
+    @abstractmethod
+    async def save_broadcast_progress(self, broadcast_id: str, last_user_id: int, sent: int,
+                                      failed: int, blocked: int, status: Optional[str] = None):
+        """Курсор и счётчики; status (done/cancelled) завершает рассылку."""
+
+
+class MemoryRepository(Repository):
+    """
+    Хранилище в памяти процесса с той же семантикой, что и SQLite.
+    Для тестов и бенчмарков слоя хендлеров без дискового ввода-вывода.
+    Каждая операция выполняется без await внутри — т.е. атомарно для event loop.
+    """
+
+    backend = "memory"
+
+    def __init__(self):
+        self._users = {}
+        self._ledger = defaultdict(list)
+        self._ledger_seq = 0
+        self._payments = {}
+        self._payment_seq = 0
+        self._orders = {}
+        self._media = {}
+        self._broadcasts = {}
+        self._broadcast_seq = 0
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend,
+            "users": len(self._users),
+            "payments": len(self._payments),
+            "orders": len(self._orders),
+        }
+
+    # ---------- пользователи ----------
+
+    def _public_user(self, user_id: int, u: dict) -> dict:
+        return {
+            "user_id": user_id,
+            "balance": from_cents(u["balance_cents"]),
+            "registration_date": u["registration_date"],
+            "username": u["username"],
+            "language": u["language"],
+        }
+
+    async def get_user(self, user_id: int) -> Optional[dict]:
+        u = self._users.get(user_id)
+        return self._public_user(user_id, u) if u else None
+
+    async def user_exists(self, user_id: int) -> bool:
+        return user_id in self._users
+
+    async def get_user_language(self, user_id: int) -> Optional[str]:
+        u = self._users.get(user_id)
+        return u["language"] if u else None
+
+    def _insert_user(self, user_id: int, username: Optional[str], language: str):
+        self._users[user_id] = {
+            "balance_cents": 0,
+            "registration_date": datetime.now().isoformat(),
+            "username": username,
+            "language": language,
+            "blocked_at": None,
+        }
+
+    async def register_user(self, user_id: int, username: Optional[str] = None, language: Optional[str] = None):
+        if user_id not in self._users:
+            self._insert_user(user_id, username, language or "ru")
+
+    async def set_username(self, user_id: int, username: Optional[str]) -> bool:
+        u = self._users.get(user_id)
+        if not u:
+            return False
+        u["username"] = username
+        return True
+
+    async def set_user_language(self, user_id: int, lang: str):
+        if user_id in self._users:
+            self._users[user_id]["language"] = lang
+        else:
+            self._insert_user(user_id, None, lang)
+
+    # ---------- баланс ----------
+
+    def _apply_delta(self, user_id: int, delta_cents: int, kind: str, ref: Optional[str] = None,
+                     require_funds: bool = False) -> Optional[int]:
+        u = self._users.get(user_id)
+        if u is None:
+            return None
+        if require_funds and u["balance_cents"] + delta_cents < 0:
+            return None
+        u["balance_cents"] += delta_cents
+        self._ledger_seq += 1
+        self._ledger[user_id].append({
+            "entry_id": self._ledger_seq, "delta_cents": delta_cents, "kind": kind,
+            "ref": ref, "created_at": _utc_timestamp(),
+        })
+        return u["balance_cents"]
+
+    async def update_balance(self, user_id: int, amount: float, kind: str = "adjustment",
+                             ref: Optional[str] = None):
+        self._apply_delta(user_id, to_cents(amount), kind, ref)
+
+    async def purchase(self, user_id: int, product_id: str, quantity: int, total: float):
+        order_id = str(uuid.uuid4())
+        new_cents = self._apply_delta(user_id, -to_cents(total), "purchase", order_id, require_funds=True)
+        if new_cents is None:
+            u = self._users.get(user_id)
+            return False, from_cents(u["balance_cents"] if u else 0), None
+        self._orders[order_id] = {
+            "user_id": user_id, "product_id": product_id, "quantity": quantity,
+            "total": total, "created_at": _utc_timestamp(),
+        }
+        return True, from_cents(new_cents), order_id
+
+    async def get_balance_history(self, user_id: int, limit: int = 20) -> list:
+        entries = self._ledger.get(user_id, [])[::-1][:limit]
+        return [
+            {"entry_id": e["entry_id"], "amount": from_cents(e["delta_cents"]), "kind": e["kind"],
+             "ref": e["ref"], "created_at": e["created_at"]}
+            for e in entries
+        ]
+
+    async def rebuild_balances(self, dry_run: bool = False) -> Tuple[int, int]:
+        drift = 0
+        for user_id, u in self._users.items():
+            expected = sum(e["delta_cents"] for e in self._ledger.get(user_id, ()))
+            if u["balance_cents"] != expected:
+                drift += 1
+                if not dry_run:
+                    u["balance_cents"] = expected
+        return len(self._users), drift
+
+    # ---------- платежи ----------
+
+    async def record_payment_request(self, user_id: int, method: str, amount: float,
+                                     crypto: str = None, crypto_amount: float = None,
+                                     network: str = None) -> str:
+        payment_id = str(uuid.uuid4())
+        self._payment_seq += 1
+        self._payments[payment_id] = {
+            "payment_id": payment_id, "user_id": user_id, "method": method, "amount": amount,
+            "crypto": crypto, "crypto_amount": crypto_amount, "network": network,
+            "status": "pending", "created_at": _utc_timestamp(), "seq": self._payment_seq,
+        }
+        return payment_id
+
+    async def confirm_payment(self, payment_id: str):
+        p = self._payments.get(payment_id)
+        if not p or p["status"] != "pending":
+            return None, None, None
+        p["status"] = "confirmed"
+        new_cents = self._apply_delta(p["user_id"], to_cents(p["amount"]), "topup", payment_id)
+        return p["user_id"], p["amount"], (from_cents(new_cents) if new_cents is not None else None)
+
+    async def reject_payment(self, payment_id: str) -> bool:
+        p = self._payments.get(payment_id)
+        if not p or p["status"] != "pending":
+            return False
+        p["status"] = "rejected"
+        return True
+
+    async def get_pending_payments(self, limit: int = 50, older_than: Optional[str] = None) -> list:
+        bound = older_than or "9999-12-31 23:59:59"
+        rows = sorted(
+            (p for p in self._payments.values() if p["status"] == "pending" and p["created_at"] < bound),
+            key=lambda p: (p["created_at"], p["seq"])
+        )[:limit]
+        return [
+            {"payment_id": p["payment_id"], "user_id": p["user_id"], "method": p["method"],
+             "amount": p["amount"], "created_at": p["created_at"]}
+            for p in rows
+        ]
+
+    async def get_user_payments(self, user_id: int, limit: int = 20) -> list:
+        rows = sorted(
+            (p for p in self._payments.values() if p["user_id"] == user_id),
+            key=lambda p: (p["created_at"], p["seq"]), reverse=True
+        )[:limit]
+        return [
+            {"payment_id": p["payment_id"], "method": p["method"], "amount": p["amount"],
+             "status": p["status"], "created_at": p["created_at"]}
+            for p in rows
+        ]
+
+    # ---------- медиа ----------
+
+    async def get_media_file_id(self, path: str, content_hash: str) -> Optional[str]:
+        row = self._media.get(path)
+        if row and row[0] == content_hash:
+            return row[1]
+        return None
+
+    async def set_media_file_id(self, path: str, content_hash: str, file_id: str):
+        self._media[path] = (content_hash, file_id)
+
+    async def forget_media_file_id(self, path: str):
+        self._media.pop(path, None)
+
+    # ---------- рассылки ----------
+
+    async def set_user_blocked(self, user_id: int, blocked: bool) -> bool:
+        u = self._users.get(user_id)
+        if not u:
+            return False
+        u["blocked_at"] = (u["blocked_at"] or _utc_timestamp()) if blocked else None
+        return True
+
+    async def count_broadcast_recipients(self) -> int:
+        return sum(1 for u in self._users.values() if u["blocked_at"] is None)
+
+    async def get_broadcast_recipients(self, after_user_id: int, limit: int) -> List[int]:
+        ids = sorted(uid for uid, u in self._users.items() if uid > after_user_id and u["blocked_at"] is None)
+        return ids[:limit]
+
+    async def create_broadcast(self, admin_id: int, text: str, total: int) -> str:
+        broadcast_id = str(uuid.uuid4())
+        self._broadcast_seq += 1
+        self._broadcasts[broadcast_id] = {
+            "broadcast_id": broadcast_id, "admin_id": admin_id, "text": text, "status": "running",
+            "last_user_id": 0, "total": total, "sent": 0, "failed": 0, "blocked": 0,
+            "created_at": _utc_timestamp(), "finished_at": None, "seq": self._broadcast_seq,
+        }
+        return broadcast_id
+
+    @staticmethod
+    def _public_broadcast(b: dict) -> dict:
+        return {k: v for k, v in b.items() if k != "seq"}
+
+    async def get_broadcast(self, broadcast_id: str) -> Optional[dict]:
+        b = self._broadcasts.get(broadcast_id)
+        return self._public_broadcast(b) if b else None
+
+    async def get_running_broadcasts(self) -> list:
+        rows = sorted(
+            (b for b in self._broadcasts.values() if b["status"] == "running"),
+            key=lambda b: (b["created_at"], b["seq"])
+        )
+        return [self._public_broadcast(b) for b in rows]
+
+    async def save_broadcast_progress(self, broadcast_id: str, last_user_id: int, sent: int,
+                                      failed: int, blocked: int, status: Optional[str] = None):
+        b = self._broadcasts.get(broadcast_id)
+        if not b:
+            return
+        b.update(last_user_id=last_user_id, sent=sent, failed=failed, blocked=blocked)
+        if status:
+            b["status"] = status
+            b["finished_at"] = _utc_timestamp()
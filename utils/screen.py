@@ -0,0 +1,177 @@
+# utils/screen.py
+# Экран = сообщение с картинкой (или текстом), подписью и inline-клавиатурой,
+# которое хендлеры перерисовывают на месте (раньше — edit_photo_or_text в products/topup).
+#   - по (chat_id, message_id) помним, что показано: картинку (путь + хэш содержимого),
+#     хэш подписи и хэш клавиатуры;
+#   - ничего не изменилось — запроса к Bot API нет;
+#   - поменялись только подпись/клавиатура — edit_caption (edit_text) или edit_reply_markup,
+#     edit_media — только если сменилась картинка;
+#   - внутри async with screens.batch(): несколько правок одного сообщения сливаются
+#     в одну — уходит только последняя;
+#   - «message is not modified» — не ошибка (экран уже такой), новое сообщение не шлём.
+import contextlib
+import logging
+from contextvars import ContextVar
+from typing import NamedTuple, Optional, Tuple
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import Message
+
+from config import SCREEN_CACHE_SIZE, SCREEN_CACHE_TTL
+from utils.assets import Asset, assets
+from utils.cache import TTLCache, MISSING
+from utils.media import media
+
+logger = logging.getLogger(__name__)
+
+_NOT_MODIFIED = "message is not modified"
+
+
+class ScreenState(NamedTuple):
+    media: Optional[Tuple[str, str]]    # (путь, хэш) показанной картинки; None — нет/неизвестна
+    text: int
+    markup: int
+
+
+def _text_hash(text: Optional[str]) -> int:
+    return hash(text or "")
+
+
+def _markup_hash(markup) -> int:
+    return hash(markup.model_dump_json(exclude_none=True)) if markup is not None else 0
+
+
+_batch: ContextVar[Optional[dict]] = ContextVar("screen_batch", default=None)
+
+
+class ScreenRenderer:
+    def __init__(self, maxsize: int = SCREEN_CACHE_SIZE, ttl: float = SCREEN_CACHE_TTL):
+        self._states = TTLCache(maxsize, ttl)
+        self.skipped = 0
+        self.merged = 0
+        self.caption_edits = 0
+        self.media_edits = 0
+        self.markup_edits = 0
+        self.fallbacks = 0
+
+    @staticmethod
+    def _key(msg: Message) -> Tuple[int, int]:
+        return msg.chat.id, msg.message_id
+
+    async def _current(self, msg: Message, asset: Optional[Asset]) -> ScreenState:
+        """Что показано сейчас: из памяти, иначе — по самому сообщению (из callback'а)."""
+        state = self._states.get(self._key(msg))
+        if state is not MISSING:
+            return state
+        shown = None
+        if msg.photo and asset is not None:
+            # file_id совпал с загруженным нами — это та же картинка
+            file_id = await media.file_id(asset)
+            if file_id and msg.photo[-1].file_id == file_id:
+                shown = (asset.path, asset.content_hash)
+        text = msg.html_text if (msg.text or msg.caption) else ""
+        return ScreenState(shown, _text_hash(text), _markup_hash(msg.reply_markup))
+
+    def remember(self, msg: Message, image_path: Optional[str], caption: str, reply_markup=None):
+        """Новый экран отправлен хендлером сам (answer_photo/answer) — запоминаем, что в нём."""
+        if not isinstance(msg, Message):
+            return
+        asset = assets.get(image_path) if (image_path and msg.photo) else None
+        self._states.set(self._key(msg), ScreenState(
+            (asset.path, asset.content_hash) if asset else None,
+            _text_hash(caption), _markup_hash(reply_markup),
+        ))
+
+    # ---------- правка ----------
+
+    async def update(self, msg: Message, image_path: str, caption: str, reply_markup=None):
+        """
+        Показать в сообщении картинку image_path с подписью caption и клавиатурой reply_markup.
+        Не вышло отредактировать — отправляет новое сообщение (как раньше edit_photo_or_text).
+        """
+        pending = _batch.get()
+        if pending is not None:
+            key = self._key(msg)
+            if key in pending:
+                self.merged += 1
+            pending[key] = (msg, image_path, caption, reply_markup)
+            return
+        await self._apply(msg, image_path, caption, reply_markup)
+
+    @contextlib.asynccontextmanager
+    async def batch(self):
+        """Правки экранов внутри блока применяются при выходе — по одной на сообщение."""
+        pending = {}
+        token = _batch.set(pending)
+        try:
+            yield
+        finally:
+            _batch.reset(token)
+        for args in pending.values():
+            await self._apply(*args)
+
+    async def _apply(self, msg: Message, image_path: str, caption: str, reply_markup=None):
+        asset = assets.get(image_path)
+        media_key = (asset.path, asset.content_hash) if asset else None
+        current = await self._current(msg, asset)
+        text_hash, markup_hash = _text_hash(caption), _markup_hash(reply_markup)
+
+        if msg.photo:
+            # картинки нет на диске — меняем только подпись, старое фото остаётся
+            media_changed = media_key is not None and current.media != media_key
+            new_media = media_key if media_key is not None else current.media
+        else:
+            media_changed = False
+            new_media = None
+        text_changed = current.text != text_hash
+        if not (media_changed or text_changed or current.markup != markup_hash):
+            self.skipped += 1
+            return
+
+        try:
+            if media_changed:
+                await media.edit_photo(msg, image_path, caption, reply_markup)
+                self.media_edits += 1
+            elif text_changed:
+                if msg.photo:
+                    await msg.edit_caption(caption=caption, reply_markup=reply_markup)
+                else:
+                    await msg.edit_text(text=caption, reply_markup=reply_markup)
+                self.caption_edits += 1
+            else:
+                await msg.edit_reply_markup(reply_markup=reply_markup)
+                self.markup_edits += 1
+        except TelegramBadRequest as e:
+            if _NOT_MODIFIED not in str(e).lower():
+                return await self._fallback(msg, image_path, caption, reply_markup, e)
+        except Exception as e:
+            return await self._fallback(msg, image_path, caption, reply_markup, e)
+        self._states.set(self._key(msg), ScreenState(new_media, text_hash, markup_hash))
+
+    async def _fallback(self, msg: Message, image_path: str, caption: str, reply_markup, error: Exception):
+        """Отредактировать не удалось — новое сообщение с тем же экраном."""
+        logger.debug(f"screen: edit failed, sending new message: {error}")
+        self.fallbacks += 1
+        self._states.pop(self._key(msg))
+        try:
+            if assets.exists(image_path):
+                sent = await media.answer_photo(msg, image_path, caption=caption, reply_markup=reply_markup)
+            else:
+                sent = await msg.answer(caption, reply_markup=reply_markup)
+            self.remember(sent, image_path, caption, reply_markup)
+        except Exception as e2:
+            logger.error(f"Unable to send fallback message: {e2}")
+
+    def stats(self) -> dict:
+        return {
+            **self._states.stats(),
+            "skipped": self.skipped,
+            "merged": self.merged,
+            "caption_edits": self.caption_edits,
+            "media_edits": self.media_edits,
+            "markup_edits": self.markup_edits,
+            "fallbacks": self.fallbacks,
+        }
+
+
+screens = ScreenRenderer()
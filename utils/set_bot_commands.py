@@ -11,7 +11,7 @@ _CAPTIONS = {
 _FALLBACK = "Start the bot"
 
 
-async def set_only_start_everywhere(dp):
+async def set_only_start_everywhere(bot):
     """
     Глобально (для всех пользователей) ставит ТОЛЬКО /start
     во всех локалях + fallback без language_code.
@@ -19,12 +19,12 @@ async def set_only_start_everywhere(dp):
     try:
         # локализованные наборы
         for lc, title in _CAPTIONS.items():
-            await dp.bot.set_my_commands(
-                [types.BotCommand("start", title)],
+            await bot.set_my_commands(
+                [types.BotCommand(command="start", description=title)],
                 language_code=lc,
             )
         # fallback без языка
-        await dp.bot.set_my_commands([types.BotCommand("start", _FALLBACK)])
+        await bot.set_my_commands([types.BotCommand(command="start", description=_FALLBACK)])
     except Exception as e:
         print(f"[set_bot_commands] set_only_start_everywhere error: {e}")
 
@@ -36,8 +36,8 @@ async def set_only_start_for_user(bot, user_id: int, lang: str | None = None):
     title = _CAPTIONS.get((lang or "").lower(), _FALLBACK)
     try:
         await bot.set_my_commands(
-            [types.BotCommand("start", title)],
-            scope=types.BotCommandScopeChat(user_id),
+            [types.BotCommand(command="start", description=title)],
+            scope=types.BotCommandScopeChat(chat_id=user_id),
         )
     except Exception as e:
         print(f"[set_bot_commands] set_only_start_for_user error: {e}")
@@ -48,15 +48,15 @@ async def clear_user_commands(bot, user_id: int):
     На всякий: сброс персонального набора команд для пользователя.
     """
     try:
-        await bot.delete_my_commands(scope=types.BotCommandScopeChat(user_id))
+        await bot.delete_my_commands(scope=types.BotCommandScopeChat(chat_id=user_id))
     except Exception as e:
         print(f"[set_bot_commands] clear_user_commands error: {e}")
 
 
 # -------- обратная совместимость (чтобы старые импорты не падали) --------
 # старое имя, которое у тебя импортируется в app.py
-async def set_global_minimal_commands(dp):
-    await set_only_start_everywhere(dp)
+async def set_global_minimal_commands(bot):
+    await set_only_start_everywhere(bot)
 
 # если где-то ещё вызывалось set_user_commands — сведём к одному поведению
 async def set_user_commands(bot, user_id: int, lang: str = "en"):
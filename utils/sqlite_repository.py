@@ -0,0 +1,412 @@
+# utils/sqlite_repository.py
+# Хранилище на SQLite поверх DBEngine (один поток-писатель + читатели в WAL)
+import uuid
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from utils import migrations
+from utils.db_engine import DBEngine
+from utils.repository import Repository, to_cents, from_cents
+
+# Запросы по индексам idx_payment_requests_status_created / _user_created
+# (их же гоняет benchmarks/payment_indexes.py)
+PENDING_PAYMENTS_SQL = """
+    SELECT payment_id, user_id, method, amount, created_at
+    FROM payment_requests
+    WHERE status = 'pending' AND created_at < ?
+    ORDER BY created_at, rowid
+    LIMIT ?
+"""
+
+# Получатели рассылки порциями по первичному ключу: каждая порция — поиск по индексу
+# от курсора, без OFFSET и без выборки всех id в память
+BROADCAST_RECIPIENTS_SQL = """
+    SELECT user_id
+    FROM users
+    WHERE user_id > ? AND blocked_at IS NULL
+    ORDER BY user_id
+    LIMIT ?
+"""
+
+_BROADCAST_COLUMNS = (
+    "broadcast_id", "admin_id", "text", "status", "last_user_id", "total",
+    "sent", "failed", "blocked", "created_at", "finished_at",
+)
+
+# Сверка снимков баланса с журналом порциями по user_id: сумма по каждому пользователю
+# считается один раз (GROUP BY по индексу idx_balance_ledger_user), наружу — только расхождения
+REBUILD_BALANCES_CHUNK = 1000
+BALANCE_DRIFT_SQL = """
+    WITH chunk AS (
+        SELECT user_id, balance_cents FROM users
+        WHERE user_id > ?
+        ORDER BY user_id
+        LIMIT ?
+    )
+    SELECT c.user_id, c.balance_cents, COALESCE(SUM(l.delta_cents), 0)
+    FROM chunk c LEFT JOIN balance_ledger l ON l.user_id = c.user_id
+    GROUP BY c.user_id
+    ORDER BY c.user_id
+"""
+
+USER_PAYMENTS_SQL = """
+    SELECT payment_id, method, amount, status, created_at
+    FROM payment_requests
+    WHERE user_id = ?
+    ORDER BY created_at DESC, rowid DESC
+    LIMIT ?
+"""
+
+
+def _apply_balance_delta(conn, user_id: int, delta_cents: int, kind: str,
+                         ref: Optional[str] = None, require_funds: bool = False) -> Optional[int]:
+    """
+    Меняет снимок баланса и пишет проводку (вызывать внутри транзакции движка).
+    require_funds=True — не даёт балансу уйти в минус.
+    Возвращает новый баланс в центах или None, если пользователя нет / не хватило средств.
+    """
+    row = conn.execute(f"""
+        UPDATE users
+        SET balance_cents = balance_cents + ?, balance = (balance_cents + ?) / 100.0
+        WHERE user_id = ?{" AND balance_cents + ? >= 0" if require_funds else ""}
+        RETURNING balance_cents
+    """, (delta_cents, delta_cents, user_id) + ((delta_cents,) if require_funds else ())).fetchone()
+    if row is None:
+        return None
+    conn.execute(
+        "INSERT INTO balance_ledger (user_id, delta_cents, kind, ref) VALUES (?, ?, ?, ?)",
+        (user_id, delta_cents, kind, ref)
+    )
+    return row[0]
+
+
+class SQLiteRepository(Repository):
+    """
+    Все операции — синхронные «единицы работы» fn(conn), которые выполняет DBEngine.
+    Частые мелкие записи идут через engine.batched — при batch_max_ops > 1
+    они делят один COMMIT (group commit), иначе это обычная транзакция.
+    """
+
+    backend = "sqlite"
+
+    def __init__(self, path: str, **engine_options):
+        self.path = path
+        self.engine = DBEngine(path, **engine_options)
+
+    # ---------- жизненный цикл ----------
+
+    async def open(self) -> dict:
+        # профиль PRAGMA (WAL, synchronous, кэш, mmap, ...) и читающие соединения
+        return await self.engine.apply_profile()
+
+    async def active_pragmas(self) -> dict:
+        return await self.engine.active_pragmas()
+
+    async def migrate(self) -> Tuple[int, int]:
+        return await self.engine.transaction(migrations.migrate)
+
+    async def flush(self):
+        await self.engine.flush()
+
+    async def close(self):
+        await self.engine.close()
+
+    def stats(self) -> dict:
+        return self.engine.stats()
+
+    # ---------- пользователи ----------
+
+    async def get_user(self, user_id: int) -> Optional[dict]:
+        def sync_get(conn):
+            row = conn.execute("""
+                SELECT balance_cents, registration_date, username, language
+                FROM users
+                WHERE user_id = ?
+            """, (user_id,)).fetchone()
+            if not row:
+                return None
+            return {
+                "user_id": user_id,
+                "balance": from_cents(row[0]),
+                "registration_date": row[1],
+                "username": row[2],
+                "language": row[3],
+            }
+
+        return await self.engine.read(sync_get)
+
+    async def user_exists(self, user_id: int) -> bool:
+        def sync_check(conn):
+            return conn.execute("SELECT 1 FROM users WHERE user_id = ?", (user_id,)).fetchone() is not None
+
+        return await self.engine.read(sync_check)
+
+    async def get_user_language(self, user_id: int) -> Optional[str]:
+        def sync_get(conn):
+            row = conn.execute("SELECT language FROM users WHERE user_id = ?", (user_id,)).fetchone()
+            return row[0] if row else None
+
+        return await self.engine.read(sync_get)
+
+    async def register_user(self, user_id: int, username: Optional[str] = None, language: Optional[str] = None):
+        def sync_register(conn):
+            conn.execute("""
+                INSERT INTO users (user_id, balance, registration_date, username, language)
+                VALUES (?, 0.0, ?, ?, ?)
+                ON CONFLICT(user_id) DO NOTHING
+            """, (user_id, datetime.now().isoformat(), username, language or 'ru'))
+
+        await self.engine.batched(sync_register)
+
+    async def set_user_language(self, user_id: int, lang: str):
+        def sync_set(conn):
+            conn.execute("""
+                INSERT INTO users (user_id, balance, registration_date, username, language)
+                VALUES (?, 0.0, ?, NULL, ?)
+                ON CONFLICT(user_id) DO UPDATE SET language = excluded.language
+            """, (user_id, datetime.now().isoformat(), lang))
+
+        await self.engine.batched(sync_set)
+
+    async def set_username(self, user_id: int, username: Optional[str]) -> bool:
+        def sync_set(conn):
+            cur = conn.execute("UPDATE users SET username = ? WHERE user_id = ?", (username, user_id))
+            return cur.rowcount > 0
+
+        return await self.engine.batched(sync_set)
+
+    # ---------- баланс ----------
+
+    async def update_balance(self, user_id: int, amount: float, kind: str = "adjustment",
+                             ref: Optional[str] = None):
+        def sync_update(conn):
+            _apply_balance_delta(conn, user_id, to_cents(amount), kind, ref)
+
+        await self.engine.batched(sync_update)
+
+    async def purchase(self, user_id: int, product_id: str, quantity: int, total: float):
+        # проверка баланса и списание — один условный UPDATE, заказ — в той же транзакции
+        def sync_purchase(conn):
+            order_id = str(uuid.uuid4())
+            new_cents = _apply_balance_delta(conn, user_id, -to_cents(total), "purchase", order_id,
+                                             require_funds=True)
+            if new_cents is None:
+                cur = conn.execute("SELECT balance_cents FROM users WHERE user_id = ?", (user_id,)).fetchone()
+                return False, from_cents(cur[0] if cur else 0), None
+
+            conn.execute("""
+                INSERT INTO orders (order_id, user_id, product_id, quantity, total)
+                VALUES (?, ?, ?, ?, ?)
+            """, (order_id, user_id, product_id, quantity, total))
+            return True, from_cents(new_cents), order_id
+
+        return await self.engine.transaction(sync_purchase)
+
+    async def get_balance_history(self, user_id: int, limit: int = 20) -> list:
+        def sync_get(conn):
+            rows = conn.execute("""
+                SELECT entry_id, delta_cents, kind, ref, created_at
+                FROM balance_ledger
+                WHERE user_id = ?
+                ORDER BY entry_id DESC
+                LIMIT ?
+            """, (user_id, limit)).fetchall()
+            return [
+                {"entry_id": r[0], "amount": from_cents(r[1]), "kind": r[2], "ref": r[3], "created_at": r[4]}
+                for r in rows
+            ]
+
+        return await self.engine.read(sync_get)
+
+    async def rebuild_balances(self, dry_run: bool = False) -> Tuple[int, int]:
+        # порция = короткая транзакция писателя: между порциями проходят остальные записи,
+        # а внутри сверка и исправление видят один и тот же журнал
+        def sync_chunk(conn, after: int):
+            rows = conn.execute(BALANCE_DRIFT_SQL, (after, REBUILD_BALANCES_CHUNK)).fetchall()
+            drifted = [(expected, expected, user_id) for user_id, current, expected in rows if current != expected]
+            if drifted and not dry_run:
+                conn.executemany(
+                    "UPDATE users SET balance_cents = ?, balance = ? / 100.0 WHERE user_id = ?", drifted
+                )
+            return len(rows), len(drifted), (rows[-1][0] if rows else None)
+
+        total = drift = 0
+        after = -1 << 63
+        while True:
+            if dry_run:
+                count, found, last = await self.engine.read(sync_chunk, after)
+            else:
+                count, found, last = await self.engine.transaction(sync_chunk, after)
+            total += count
+            drift += found
+            if count < REBUILD_BALANCES_CHUNK:
+                return total, drift
+            after = last
+
+    # ---------- платежи ----------
+
+    async def record_payment_request(self, user_id: int, method: str, amount: float,
+                                     crypto: str = None, crypto_amount: float = None,
+                                     network: str = None) -> str:
+        def sync_record(conn):
+            payment_id = str(uuid.uuid4())
+            conn.execute("""
+                INSERT INTO payment_requests
+                    (payment_id, user_id, method, amount, crypto, crypto_amount, network, status)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 'pending')
+            """, (payment_id, user_id, method, amount, crypto, crypto_amount, network))
+            return payment_id
+
+        return await self.engine.batched(sync_record)
+
+    async def confirm_payment(self, payment_id: str):
+        def sync_confirm(conn):
+            payment = conn.execute("""
+                SELECT user_id, amount
+                FROM payment_requests
+                WHERE payment_id = ? AND status = 'pending'
+            """, (payment_id,)).fetchone()
+            if not payment:
+                return None, None, None
+
+            user_id, amount = payment
+            conn.execute("UPDATE payment_requests SET status = 'confirmed' WHERE payment_id = ?", (payment_id,))
+            # новый баланс возвращает тот же UPDATE снимка
+            new_cents = _apply_balance_delta(conn, user_id, to_cents(amount), "topup", payment_id)
+            new_balance = from_cents(new_cents) if new_cents is not None else None
+            return user_id, amount, new_balance
+
+        return await self.engine.transaction(sync_confirm)
+
+    async def reject_payment(self, payment_id: str) -> bool:
+        def sync_reject(conn):
+            cur = conn.execute(
+                "UPDATE payment_requests SET status = 'rejected' WHERE payment_id = ? AND status = 'pending'",
+                (payment_id,)
+            )
+            return cur.rowcount > 0
+
+        return await self.engine.transaction(sync_reject)
+
+    async def get_pending_payments(self, limit: int = 50, older_than: Optional[str] = None) -> list:
+        bound = older_than or "9999-12-31 23:59:59"
+
+        def sync_get(conn):
+            rows = conn.execute(PENDING_PAYMENTS_SQL, (bound, limit)).fetchall()
+            return [
+                {"payment_id": r[0], "user_id": r[1], "method": r[2], "amount": r[3], "created_at": r[4]}
+                for r in rows
+            ]
+
+        return await self.engine.read(sync_get)
+
+    async def get_user_payments(self, user_id: int, limit: int = 20) -> list:
+        def sync_get(conn):
+            rows = conn.execute(USER_PAYMENTS_SQL, (user_id, limit)).fetchall()
+            return [
+                {"payment_id": r[0], "method": r[1], "amount": r[2], "status": r[3], "created_at": r[4]}
+                for r in rows
+            ]
+
+        return await self.engine.read(sync_get)
+
+    # ---------- медиа ----------
+
+    async def get_media_file_id(self, path: str, content_hash: str) -> Optional[str]:
+        def sync_get(conn):
+            row = conn.execute(
+                "SELECT file_id FROM media_files WHERE path = ? AND content_hash = ?",
+                (path, content_hash)
+            ).fetchone()
+            return row[0] if row else None
+
+        return await self.engine.read(sync_get)
+
+    async def set_media_file_id(self, path: str, content_hash: str, file_id: str):
+        def sync_set(conn):
+            conn.execute("""
+                INSERT INTO media_files (path, content_hash, file_id, updated_at)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(path) DO UPDATE SET
+                    content_hash = excluded.content_hash,
+                    file_id = excluded.file_id,
+                    updated_at = excluded.updated_at
+            """, (path, content_hash, file_id))
+
+        await self.engine.batched(sync_set)
+
+    async def forget_media_file_id(self, path: str):
+        def sync_forget(conn):
+            conn.execute("DELETE FROM media_files WHERE path = ?", (path,))
+
+        await self.engine.batched(sync_forget)
+
+    # ---------- рассылки ----------
+
+    async def set_user_blocked(self, user_id: int, blocked: bool) -> bool:
+        def sync_set(conn):
+            if blocked:
+                cur = conn.execute(
+                    "UPDATE users SET blocked_at = COALESCE(blocked_at, CURRENT_TIMESTAMP) WHERE user_id = ?",
+                    (user_id,)
+                )
+            else:
+                cur = conn.execute("UPDATE users SET blocked_at = NULL WHERE user_id = ?", (user_id,))
+            return cur.rowcount > 0
+
+        return await self.engine.batched(sync_set)
+
+    async def count_broadcast_recipients(self) -> int:
+        def sync_count(conn):
+            return conn.execute("SELECT COUNT(*) FROM users WHERE blocked_at IS NULL").fetchone()[0]
+
+        return await self.engine.read(sync_count)
+
+    async def get_broadcast_recipients(self, after_user_id: int, limit: int) -> List[int]:
+        def sync_get(conn):
+            return [r[0] for r in conn.execute(BROADCAST_RECIPIENTS_SQL, (after_user_id, limit))]
+
+        return await self.engine.read(sync_get)
+
+    async def create_broadcast(self, admin_id: int, text: str, total: int) -> str:
+        def sync_create(conn):
+            broadcast_id = str(uuid.uuid4())
+            conn.execute(
+                "INSERT INTO broadcasts (broadcast_id, admin_id, text, total) VALUES (?, ?, ?, ?)",
+                (broadcast_id, admin_id, text, total)
+            )
+            return broadcast_id
+
+        return await self.engine.transaction(sync_create)
+
+    async def get_broadcast(self, broadcast_id: str) -> Optional[dict]:
+        def sync_get(conn):
+            row = conn.execute(
+                f"SELECT {', '.join(_BROADCAST_COLUMNS)} FROM broadcasts WHERE broadcast_id = ?",
+                (broadcast_id,)
+            ).fetchone()
+            return dict(zip(_BROADCAST_COLUMNS, row)) if row else None
+
+        return await self.engine.read(sync_get)
+
+    async def get_running_broadcasts(self) -> list:
+        def sync_get(conn):
+            rows = conn.execute(
+                f"SELECT {', '.join(_BROADCAST_COLUMNS)} FROM broadcasts "
+                "WHERE status = 'running' ORDER BY created_at, rowid"
+            ).fetchall()
+            return [dict(zip(_BROADCAST_COLUMNS, r)) for r in rows]
+
+        return await self.engine.read(sync_get)
+
+    async def save_broadcast_progress(self, broadcast_id: str, last_user_id: int, sent: int,
+                                      failed: int, blocked: int, status: Optional[str] = None):
+        def sync_save(conn):
+            conn.execute(f"""
+                UPDATE broadcasts
+                SET last_user_id = ?, sent = ?, failed = ?, blocked = ?
+                    {", status = ?, finished_at = CURRENT_TIMESTAMP" if status else ""}
+                WHERE broadcast_id = ?
+            """, (last_user_id, sent, failed, blocked) + ((status,) if status else ()) + (broadcast_id,))
+
+        await self.engine.batched(sync_save)
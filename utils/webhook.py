@@ -0,0 +1,188 @@
+# utils/webhook.py
+# Режим webhook (BOT_MODE=webhook): встроенный aiohttp-сервер вместо long polling.
+#   - запрос без верного X-Telegram-Bot-Api-Secret-Token — 401;
+#   - апдейт сразу кладётся в очередь и Telegram получает 200, обработка идёт отдельно;
+#   - WEBHOOK_WORKERS обработчиков; апдейты одного пользователя попадают к одному
+#     обработчику, поэтому идут строго по порядку (FSM не видит гонок);
+#   - очередь переполнена — 503, Telegram повторит доставку позже;
+#   - апдейт неизвестного aiogram типа — в обработчик 0 и 200 (иначе Telegram слал бы его вечно);
+#   - при старте webhook регистрируется (накопившиеся апдейты не сбрасываются),
+#     при остановке снимается, очереди дорабатываются до конца.
+# Проверка против локального фейкового Bot API (BOT_API_SERVER): python -m benchmarks.webhook --check-only
+import asyncio
+import hashlib
+import hmac
+import logging
+import signal
+from typing import Awaitable, Callable, List, Optional
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiogram.types.update import UpdateTypeLookupError
+
+from config import (
+    BOT_TOKEN, WEBHOOK_URL, WEBHOOK_PATH, WEBHOOK_SECRET, WEBAPP_HOST, WEBAPP_PORT,
+    WEBHOOK_WORKERS, WEBHOOK_QUEUE_SIZE, WEBHOOK_MAX_CONNECTIONS,
+)
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+DRAIN_TIMEOUT = 30
+
+
+def default_secret(token: str = BOT_TOKEN) -> str:
+    """Стабильный между перезапусками секрет (Telegram допускает A-Z, a-z, 0-9, _ и -)."""
+    return hashlib.sha256(f"webhook:{token}".encode()).hexdigest()
+
+
+def _shard_key(update: Update) -> int:
+    """Кому принадлежит апдейт: пользователь, иначе чат, иначе сам update_id; неизвестный тип — 0."""
+    try:
+        event = update.event
+    except UpdateTypeLookupError:
+        return 0
+    user = getattr(event, "from_user", None)
+    if user is not None:
+        return user.id
+    chat = getattr(event, "chat", None)
+    if chat is not None:
+        return chat.id
+    return update.update_id
+
+
+class WebhookServer:
+    def __init__(self, dp: Dispatcher, bot: Bot, *, url: str = WEBHOOK_URL, path: str = WEBHOOK_PATH,
+                 secret: str = WEBHOOK_SECRET, host: str = WEBAPP_HOST, port: int = WEBAPP_PORT,
+                 workers: int = WEBHOOK_WORKERS, queue_size: int = WEBHOOK_QUEUE_SIZE,
+                 max_connections: int = WEBHOOK_MAX_CONNECTIONS):
+        self.dp = dp
+        self.bot = bot
+        self.url = url
+        self.path = path
+        self.secret = secret or default_secret(bot.token)
+        self.host = host
+        self.port = port
+        self.max_connections = max_connections
+        self._queues: List[asyncio.Queue] = [asyncio.Queue(maxsize=queue_size) for _ in range(max(1, workers))]
+        self._workers: List[asyncio.Task] = []
+        self._runner: Optional[web.AppRunner] = None
+        self.received = 0
+        self.rejected = 0
+        self.overloaded = 0
+        self.processed = 0
+        self.failed = 0
+
+    # ---------- HTTP ----------
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if not hmac.compare_digest(request.headers.get(SECRET_HEADER, ""), self.secret):
+            self.rejected += 1
+            return web.Response(status=401)
+        try:
+            update = Update.model_validate(await request.json(), context={"bot": self.bot})
+        except Exception as e:
+            # повтор не поможет — подтверждаем, чтобы Telegram не слал его снова
+            logger.warning(f"webhook: битый апдейт отброшен: {e}")
+            return web.Response()
+        queue = self._queues[_shard_key(update) % len(self._queues)]
+        try:
+            queue.put_nowait(update)
+        except asyncio.QueueFull:
+            self.overloaded += 1
+            return web.Response(status=503)
+        self.received += 1
+        return web.Response()
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(self.path, self.handle)
+        return app
+
+    # ---------- обработка ----------
+
+    async def _work(self, queue: asyncio.Queue):
+        while True:
+            update = await queue.get()
+            try:
+                await self.dp.feed_update(self.bot, update)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.exception(f"webhook: ошибка обработки апдейта {update.update_id}: {e}")
+            finally:
+                queue.task_done()
+
+    async def start(self):
+        self._workers = [asyncio.create_task(self._work(q)) for q in self._queues]
+        self._runner = web.AppRunner(self.app())
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"webhook: слушаю {self.host}:{self.port}{self.path}, обработчиков: {len(self._queues)}")
+        if self.url:
+            await self.bot.set_webhook(
+                f"{self.url}{self.path}",
+                secret_token=self.secret,
+                allowed_updates=self.dp.resolve_used_update_types(),
+                max_connections=self.max_connections,
+                drop_pending_updates=False,
+            )
+            logger.info(f"webhook: зарегистрирован {self.url}{self.path}")
+        else:
+            logger.warning("webhook: WEBHOOK_URL не задан — webhook не регистрируется")
+
+    async def stop(self):
+        # сначала просим Telegram больше не слать, потом закрываем сервер и дорабатываем очередь
+        if self.url:
+            try:
+                await self.bot.delete_webhook(drop_pending_updates=False)
+            except Exception as e:
+                logger.error(f"webhook: не удалось снять webhook: {e}")
+        if self._runner is not None:
+            await self._runner.cleanup()
+        try:
+            await asyncio.wait_for(asyncio.gather(*(q.join() for q in self._queues)), DRAIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(f"webhook: очередь не разобрана за {DRAIN_TIMEOUT}с, остаток: {self.pending()}")
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+
+    def pending(self) -> int:
+        return sum(q.qsize() for q in self._queues)
+
+    def stats(self) -> dict:
+        return {
+            "received": self.received,
+            "processed": self.processed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "overloaded": self.overloaded,
+            "pending": self.pending(),
+        }
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot,
+                      on_startup: Callable[[], Awaitable[None]],
+                      on_shutdown: Callable[[], Awaitable[None]],
+                      **kwargs):
+    """Аналог dp.start_polling для webhook: работает до SIGINT/SIGTERM."""
+    server = WebhookServer(dp, bot, **kwargs)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):   # Windows / не главный поток
+            pass
+
+    await on_startup()
+    try:
+        await server.start()
+        await stop.wait()
+    finally:
+        await server.stop()
+        logger.info(f"webhook: статистика {server.stats()}")
+        # сессию бота не закрываем: это общий пул utils/http.py, его закрывает on_shutdown
+        await on_shutdown()